@@ -0,0 +1,109 @@
+"""
+Memory and throughput of the networkx-backed graph versus CompactGraph.
+
+    python -m benchmarks.bench_graph_store --sizes 100000 1000000 --dim 384
+
+networkx keeps every embedding as a list of Python floats, so at 1M nodes and
+384 dimensions it needs well over 10 GB; use --networkx-limit to skip it there.
+"""
+import argparse
+import time
+import tracemalloc
+
+import networkx as nx
+import numpy as np
+
+from server.services.graph_store import CompactGraph
+
+
+def build(graph, n: int, dim: int, edges_per_node: int, rng: np.random.Generator) -> dict:
+    ids = [f"m{i:08x}" for i in range(n)]
+    embeddings = rng.standard_normal((min(n, 4096), dim)).astype(np.float32)
+    clusters = ["spiritual", "ai", "cultural", "political", "default"]
+
+    start = time.perf_counter()
+    for i, node_id in enumerate(ids):
+        graph.add_node(
+            node_id,
+            label=f"meme {i}",
+            cluster=clusters[i % len(clusters)],
+            embedding=embeddings[i % len(embeddings)].tolist(),
+            x=float(rng.uniform(5, 95)),
+            y=float(rng.uniform(5, 95)),
+            size=1.0,
+            pulse=True
+        )
+    node_time = time.perf_counter() - start
+
+    targets = rng.integers(0, n, size=(n, edges_per_node))
+    start = time.perf_counter()
+    for i, node_id in enumerate(ids):
+        for j in targets[i].tolist():
+            if j != i:
+                graph.add_edge(node_id, ids[j], weight=0.6, edge_type="semantic")
+    edge_time = time.perf_counter() - start
+
+    sample = [ids[i] for i in rng.integers(0, n, size=min(n, 100_000)).tolist()]
+    start = time.perf_counter()
+    for node_id in sample:
+        for _ in graph[node_id]:
+            pass
+    neighbor_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for node_id in sample:
+        graph.degree(node_id)
+    degree_time = time.perf_counter() - start
+
+    return {
+        "node_inserts_per_s": n / node_time,
+        "edge_inserts_per_s": graph.number_of_edges() / edge_time,
+        "neighbor_scans_per_s": len(sample) / neighbor_time,
+        "degree_lookups_per_s": len(sample) / degree_time,
+    }
+
+
+def run(store: str, n: int, dim: int, edges_per_node: int, seed: int) -> dict:
+    rng = np.random.default_rng(seed)
+    tracemalloc.start()
+    graph = CompactGraph() if store == "compact" else nx.Graph()
+    result = build(graph, n, dim, edges_per_node, rng)
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    result.update({
+        "store": store,
+        "nodes": n,
+        "edges": graph.number_of_edges(),
+        "memory_mb": current / 1e6,
+        "peak_mb": peak / 1e6,
+        "bytes_per_node": current / n,
+    })
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100_000, 1_000_000])
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--edges-per-node", type=int, default=3)
+    parser.add_argument("--networkx-limit", type=int, default=1_000_000,
+                        help="skip networkx above this many nodes")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    header = f"{'store':<9}{'nodes':>10}{'edges':>10}{'MB':>10}{'peak MB':>10}{'B/node':>10}" \
+             f"{'node/s':>12}{'edge/s':>12}{'nbr/s':>12}{'deg/s':>12}"
+    print(header)
+    for n in args.sizes:
+        for store in ("networkx", "compact"):
+            if store == "networkx" and n > args.networkx_limit:
+                print(f"{store:<9}{n:>10}   skipped (--networkx-limit)")
+                continue
+            r = run(store, n, args.dim, args.edges_per_node, args.seed)
+            print(f"{r['store']:<9}{r['nodes']:>10}{r['edges']:>10}{r['memory_mb']:>10.1f}{r['peak_mb']:>10.1f}"
+                  f"{r['bytes_per_node']:>10.0f}{r['node_inserts_per_s']:>12.0f}{r['edge_inserts_per_s']:>12.0f}"
+                  f"{r['neighbor_scans_per_s']:>12.0f}{r['degree_lookups_per_s']:>12.0f}")
+
+
+if __name__ == "__main__":
+    main()
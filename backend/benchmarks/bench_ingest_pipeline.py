@@ -0,0 +1,90 @@
+"""
+Ingest pipeline throughput per stage, against the local fake Groq server.
+
+    python -m benchmarks.bench_ingest_pipeline --items 2000 --embed-workers 2 --analyze-workers 32
+
+Starts server.utils.fake_groq in-process, pushes --items distinct texts through a fresh
+MemeProcessor in bulk batches, waits for every LLM analysis to land, and prints each
+stage's throughput, utilisation and queue wait / service latency. The stage with the
+highest utilisation is the one to give more workers. The analysis cache and the
+cluster cascade are off so every item reaches the LLM stage.
+"""
+import argparse
+import asyncio
+import os
+import random
+import time
+
+import uvicorn
+
+WORDS = "noosphere meme consciousness algorithm election divine startup viral neural sacred cloud policy".split()
+
+
+async def run(args) -> dict:
+    # The LLM client and cascade read their settings at import
+    os.environ.update(
+        GROQ_API_KEY="fake",
+        WITNESS_GROQ_BASE_URL=f"http://127.0.0.1:{args.port}",
+        WITNESS_LLM_CACHE="0",
+        WITNESS_CASCADE="0",
+        WITNESS_LLM_RPM="0",
+        WITNESS_LLM_TPM="0"
+    )
+    from server.services.meme_processor import MemeProcessor
+    from server.utils.fake_groq import create_app
+
+    server = uvicorn.Server(uvicorn.Config(create_app(args.latency, args.latency / 4), host="127.0.0.1", port=args.port, log_level="warning"))
+    serve = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.01)
+
+    processor = MemeProcessor(
+        queue_size=args.batch * 2,
+        embed_workers=args.embed_workers,
+        embed_batch_size=args.embed_batch_size,
+        analyze_workers=args.analyze_workers
+    )
+    tasks = processor.start_workers()
+    random.seed(1)
+    items = [{"content": " ".join(random.sample(WORDS, 5)) + f" #{i}", "source": "Web"} for i in range(args.items)]
+
+    start = time.perf_counter()
+    for offset in range(0, len(items), args.batch):
+        await processor.process_batch(items[offset:offset + args.batch])
+    placed = time.perf_counter() - start
+    while processor.get_stats()["enrichment_pending"]:
+        await asyncio.sleep(0.05)
+    elapsed = time.perf_counter() - start
+
+    stats = processor.pipeline.get_stats()
+    for task in tasks:
+        task.cancel()
+    server.should_exit = True
+    await serve
+    return {"placed_s": placed, "elapsed_s": elapsed, **stats}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--items", type=int, default=2000)
+    parser.add_argument("--batch", type=int, default=64, help="Items per process_batch call")
+    parser.add_argument("--port", type=int, default=8090)
+    parser.add_argument("--latency", type=float, default=0.2, help="Fake completion latency, seconds")
+    parser.add_argument("--embed-workers", type=int, default=2)
+    parser.add_argument("--embed-batch-size", type=int, default=32)
+    parser.add_argument("--analyze-workers", type=int, default=32)
+    args = parser.parse_args()
+
+    result = asyncio.run(run(args))
+    print(f"placed {args.items} items in {result['placed_s']:.2f}s ({args.items / result['placed_s']:.1f}/s), "
+          f"analysed in {result['elapsed_s']:.2f}s ({args.items / result['elapsed_s']:.1f}/s)")
+    print(f"{'stage':>8} {'workers':>7} {'util':>6} {'items/s':>8} {'batch':>6} {'wait p50':>9} {'wait p95':>9} {'svc p50':>8} {'svc p95':>8}")
+    for name, stage in result["stages"].items():
+        print(f"{name:>8} {stage['concurrency']:>7} {stage['utilisation']:>6.3f} {stage['throughput_per_s']:>8.1f} "
+              f"{stage['mean_batch_size']:>6.1f} {stage['queue_wait']['p50_ms']:>9} {stage['queue_wait']['p95_ms']:>9} "
+              f"{stage['service']['p50_ms']:>8} {stage['service']['p95_ms']:>8}")
+    print(f"bottleneck: {result['bottleneck']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Time per layout iteration for the incremental force-directed engine.
+
+    python -m benchmarks.bench_layout --sizes 10000 100000
+
+"full" moves every node once (one global iteration, no CPU budget). "incremental"
+warms 1% of the nodes, as a burst of ingests would, and times budgeted ticks until
+the active set drains.
+"""
+import argparse
+import time
+
+import numpy as np
+
+from server.services.graph_service import GraphService, CLUSTER_CENTERS
+from server.services.layout_engine import LayoutEngine, LAYOUT_BUDGET_MS
+
+
+def build_graph(n: int, edges_per_node: int, rng: np.random.Generator) -> GraphService:
+    clusters = list(CLUSTER_CENTERS)
+    cluster_codes = rng.integers(0, len(clusters), size=n).astype(np.int16)
+    centers = np.array([CLUSTER_CENTERS[c] for c in clusters], dtype=np.float32)[cluster_codes]
+    positions = np.clip(centers + rng.normal(0, 12, size=(n, 2)), 5, 95).astype(np.float32)
+    # Communities of 50 consecutive ids so springs have local structure to find
+    source = np.repeat(np.arange(n), edges_per_node)
+    target = np.minimum((source // 50) * 50 + rng.integers(0, 50, size=len(source)), n - 1)
+    keep = source != target
+    m = int(keep.sum())
+
+    graph = GraphService("compact")
+    graph.import_state({
+        "version": 0,
+        "ids": [f"m{i:08x}" for i in range(n)],
+        "nodes": {
+            "x": positions[:, 0], "y": positions[:, 1],
+            "size": np.ones(n, dtype=np.float32), "pulse": np.zeros(n, dtype=np.bool_),
+            "cluster": cluster_codes,
+        },
+        "strings": {"label": [""] * n},
+        "categories": {"cluster": clusters, "edge_type": ["semantic"]},
+        "embeddings": np.zeros((n, 0), dtype=np.float32),
+        "has_embedding": np.zeros(n, dtype=np.bool_),
+        "edges": {
+            "source": source[keep].astype(np.int32), "target": target[keep].astype(np.int32),
+            "weight": np.full(m, 0.7, dtype=np.float32), "edge_type": np.zeros(m, dtype=np.int16),
+        },
+    })
+    return graph
+
+
+def bench(n: int, edges_per_node: int, seed: int):
+    rng = np.random.default_rng(seed)
+    graph = build_graph(n, edges_per_node, rng)
+    ids = list(graph.spatial_index.positions)
+
+    engine = LayoutEngine(graph, budget_ms=float("inf"))
+    for node_id in ids:
+        engine._warm(node_id, 1.0)
+    start = time.perf_counter()
+    engine.tick()
+    full = time.perf_counter() - start
+
+    engine = LayoutEngine(graph, budget_ms=LAYOUT_BUDGET_MS)
+    for i in rng.choice(n, size=max(1, n // 100), replace=False).tolist():
+        engine._warm(ids[i], 1.0)
+    ticks, tick_times = 0, []
+    while engine.active_count and ticks < 10_000:
+        start = time.perf_counter()
+        engine.tick()
+        tick_times.append(time.perf_counter() - start)
+        ticks += 1
+
+    print(f"{n:>9} nodes  full iteration {full * 1000:9.1f} ms ({full / n * 1e6:6.1f} us/node)  "
+          f"incremental: {ticks} ticks, mean {np.mean(tick_times) * 1000:.2f} ms, "
+          f"max {np.max(tick_times) * 1000:.2f} ms, {engine.nodes_moved} moves")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--edges-per-node", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=11)
+    args = parser.parse_args()
+    for n in args.sizes:
+        bench(n, args.edges_per_node, args.seed)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+LLM client throughput and backoff against the local fake Groq server.
+
+    python -m benchmarks.bench_llm_client --items 200 --server-rpm 120 --error-rate 0.05
+
+Starts server.utils.fake_groq in-process, pushes --items distinct analyses through a fresh
+LLMService concurrently, and reports items/s, calls, retries and 429s seen by both sides.
+Run once with --client-rpm 0 (no pacing) and once at or under --server-rpm to see the
+limiter trade 429s and retries for steady throughput. The analysis cache is bypassed.
+"""
+import argparse
+import asyncio
+import time
+
+import httpx
+import uvicorn
+
+from server.services.analysis_cache import analysis_cache
+from server.services.llm_service import LLMService, LLMUnavailableError
+from server.utils.fake_groq import create_app
+
+
+async def run(args) -> dict:
+    app = create_app(args.latency, args.latency / 4, args.server_rpm, args.error_rate, 0.5, args.window)
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=args.port, log_level="warning"))
+    serve = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.01)
+
+    analysis_cache.enabled = False
+    llm = LLMService(
+        api_key="fake",
+        base_url=f"http://127.0.0.1:{args.port}",
+        requests_per_minute=args.client_rpm,
+        tokens_per_minute=args.client_tpm,
+        max_in_flight=args.max_in_flight,
+        max_retries=args.max_retries,
+        batch_size=args.batch_size
+    )
+
+    async def analyze(i: int):
+        try:
+            await llm.analyze_content(f"Item {i}: the noosphere folds memes about machine consciousness #{i}", "Web")
+            return True
+        except LLMUnavailableError:
+            return False
+
+    start = time.perf_counter()
+    results = await asyncio.gather(*(analyze(i) for i in range(args.items)))
+    elapsed = time.perf_counter() - start
+
+    async with httpx.AsyncClient() as client:
+        server_stats = (await client.get(f"http://127.0.0.1:{args.port}/stats")).json()
+    server.should_exit = True
+    await serve
+
+    stats = llm.get_stats()
+    return {
+        "elapsed_s": round(elapsed, 2),
+        "items_per_s": round(args.items / elapsed, 1),
+        "succeeded": sum(results),
+        "failed": args.items - sum(results),
+        "calls": stats["calls"],
+        "retries": stats["retries"],
+        "client_429s": stats["rate_limited"],
+        "throttled_s": stats["throttled_seconds"],
+        "mean_batch_size": stats["mean_batch_size"],
+        "server_requests": server_stats["requests"],
+        "server_429s": server_stats["rate_limited"],
+        "server_5xx": server_stats["errors"],
+        "server_peak_in_flight": server_stats["peak_in_flight"]
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--items", type=int, default=200)
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--latency", type=float, default=0.2, help="Fake completion latency, seconds")
+    parser.add_argument("--server-rpm", type=int, default=120, help="Fake server limit (0: unlimited)")
+    parser.add_argument("--window", type=float, default=10.0, help="Fake server rate window, seconds")
+    parser.add_argument("--error-rate", type=float, default=0.05, help="Share of fake 5xx responses")
+    parser.add_argument("--client-rpm", type=float, default=110)
+    parser.add_argument("--client-tpm", type=float, default=0)
+    parser.add_argument("--max-in-flight", type=int, default=4)
+    parser.add_argument("--max-retries", type=int, default=4)
+    parser.add_argument("--batch-size", type=int, default=1)
+    args = parser.parse_args()
+
+    for name, value in asyncio.run(run(args)).items():
+        print(f"{name:>22}: {value}")
+
+
+if __name__ == "__main__":
+    main()
@@ -3,10 +3,23 @@ from fastapi.middleware.cors import CORSMiddleware
 import asyncio
 
 from server.api.routes import router
-from server.api.websockets import stream_endpoint, loom_endpoint, start_loom_broadcaster, manager
+from server.api.websockets import (
+    stream_endpoint, loom_endpoint, start_loom_broadcaster, start_position_broadcaster,
+    start_removal_broadcaster, start_owner_relay, trending_endpoint, start_trending_broadcaster, manager
+)
 from server.services.system_monitor import system_monitor
 from server.services.meme_processor import meme_processor
 from server.services.graph_service import graph_service
+from server.services.graph_persistence import graph_persistence, PERSISTENCE_ENABLED
+from server.services.layout_engine import layout_engine, LAYOUT_ENABLED
+from server.services.analytics_service import analytics_service
+from server.services.retention_service import retention_service
+from server.services.relink_service import relink_service
+from server.services.stream_clusterer import stream_clusterer
+from server.services.graph_owner import graph_owner, owner_client, GRAPH_ROLE
+from server.services.shared_embeddings import shared_embeddings
+from server.services.analysis_cache import analysis_cache
+from server.services.db_persister import db_persister
 
 from contextlib import asynccontextmanager
 
@@ -17,6 +30,11 @@ async def lifespan(app: FastAPI):
     # Startup
     system_monitor.log("WITNESS-CORE", "SUCCESS", "The Witness API is now ONLINE")
     
+    restored = graph_persistence.restore() if PERSISTENCE_ENABLED else 0
+    if PERSISTENCE_ENABLED:
+        stream_clusterer.restore()
+    shared_embeddings.start()
+    
     seed_content = [
         ("The intersection of AI consciousness and spiritual awakening creates new pathways for human evolution", "spiritual"),
         ("Machine learning models are beginning to exhibit emergent behaviors that mirror ancient wisdom traditions", "ai"),
@@ -25,30 +43,114 @@ async def lifespan(app: FastAPI):
         ("Digital spirituality movements are gaining traction as people seek meaning in technological landscapes", "spiritual"),
     ]
     
-    for content, cluster in seed_content:
-        await meme_processor.process_raw_content(
-            content=content,
-            source="Web",
-            metadata={"cluster_hint": cluster}
-        )
+    # Attached after the restore, which replays the graph without notifying listeners
+    await db_persister.start()
+    db_task = asyncio.create_task(db_persister.run()) if db_persister.enabled else None
     
-    system_monitor.log("SEED-LOADER", "SUCCESS", f"Loaded {len(seed_content)} initial seed nodes")
+    # The seeds below go through the ingest pipeline, so it has to be running first
+    ingest_tasks = meme_processor.start_workers()
+    system_monitor.log("INGEST-PIPELINE", "INFO", f"{len(ingest_tasks)} ingest stage workers started")
+    
+    # A warm restart already has its graph; only seed an empty one
+    if not restored:
+        for content, cluster in seed_content:
+            await meme_processor.process_raw_content(
+                content=content,
+                source="Web",
+                metadata={"cluster_hint": cluster}
+            )
+        
+        system_monitor.log("SEED-LOADER", "SUCCESS", f"Loaded {len(seed_content)} initial seed nodes")
     
     task = asyncio.create_task(start_loom_broadcaster())
+    trending_task = asyncio.create_task(start_trending_broadcaster())
     system_monitor.log("LOOM-BROADCASTER", "INFO", "Loom broadcast loop started")
     
+    # A graph owner publishes moves and evictions to its event ring instead of draining
+    # them straight to websockets, so every worker (and its own clients) sees them
+    owner_tasks = []
+    if GRAPH_ROLE == "owner":
+        graph_owner.serve()
+        owner_tasks = [asyncio.create_task(graph_owner.run()), asyncio.create_task(start_owner_relay())]
+    
+    layout_tasks = []
+    if LAYOUT_ENABLED:
+        layout_tasks = [asyncio.create_task(layout_engine.run())]
+        if GRAPH_ROLE == "standalone":
+            layout_tasks.append(asyncio.create_task(start_position_broadcaster()))
+        system_monitor.log("LAYOUT-ENGINE", "INFO", "Incremental layout engine started")
+    
+    analytics_task = asyncio.create_task(analytics_service.run())
+    cluster_task = asyncio.create_task(stream_clusterer.run()) if PERSISTENCE_ENABLED else None
+    
+    retention_tasks = []
+    if retention_service.enabled:
+        # Trim a restored graph to the current budget before serving traffic
+        await retention_service.enforce()
+        retention_tasks = [asyncio.create_task(retention_service.run())]
+        if GRAPH_ROLE == "standalone":
+            retention_tasks.append(asyncio.create_task(start_removal_broadcaster()))
+        system_monitor.log("RETENTION", "INFO", f"Graph retention enabled (policy={retention_service.policy})")
+    
+    persistence_task = None
+    if PERSISTENCE_ENABLED:
+        persistence_task = asyncio.create_task(graph_persistence.run())
+    
     yield
     
     # Shutdown (optional cleanup if needed)
     system_monitor.log("WITNESS-CORE", "INFO", "Shutting down services...")
     await crawler_service.cleanup()
+    for ingest_task in ingest_tasks:
+        ingest_task.cancel()
     task.cancel()
+    trending_task.cancel()
+    for layout_task in layout_tasks:
+        layout_task.cancel()
+    analytics_task.cancel()
+    for retention_task in retention_tasks:
+        retention_task.cancel()
+    for owner_task in owner_tasks:
+        owner_task.cancel()
+    graph_owner.shutdown()
+    analytics_service.shutdown()
+    relink_service.shutdown()
+    shared_embeddings.close()
+    analysis_cache.close()
+    if db_task:
+        db_task.cancel()
+        await db_persister.close()
+    if cluster_task:
+        cluster_task.cancel()
+        stream_clusterer.snapshot()
+    if persistence_task:
+        persistence_task.cancel()
+        await graph_persistence.checkpoint()
+        graph_persistence.close()
+
+
+@asynccontextmanager
+async def worker_lifespan(app: FastAPI):
+    # Shared-graph worker: no pipeline here, just handlers talking to the graph owner
+    await owner_client.connect()
+    system_monitor.log("WITNESS-CORE", "SUCCESS", "The Witness API worker is now ONLINE")
+    tasks = [
+        asyncio.create_task(start_owner_relay()),
+        asyncio.create_task(start_loom_broadcaster()),
+        asyncio.create_task(start_trending_broadcaster())
+    ]
+    
+    yield
+    
+    for task in tasks:
+        task.cancel()
+    owner_client.close()
 
 app = FastAPI(
     title="The Witness API",
     description="Autonomous Distributed API for Eternal Threads - Mapping the Noosphere",
     version="0.1.0",
-    lifespan=lifespan
+    lifespan=worker_lifespan if GRAPH_ROLE == "worker" else lifespan
 )
 
 app.add_middleware(
@@ -69,6 +171,10 @@ async def websocket_stream(websocket: WebSocket):
 async def websocket_loom(websocket: WebSocket):
     await loom_endpoint(websocket)
 
+@app.websocket("/ws/trending")
+async def websocket_trending(websocket: WebSocket):
+    await trending_endpoint(websocket)
+
 
 @app.get("/")
 async def root():
@@ -79,17 +185,29 @@ async def root():
         "description": "Autonomous Distributed API for Eternal Threads",
         "endpoints": {
             "status": "/api/v1/status",
+            "metrics": "/api/v1/metrics",
             "stream": "/api/v1/stream",
             "graph": "/api/v1/graph/nodes",
+            "graph_edges": "/api/v1/graph/edges",
+            "graph_viewport": "/api/v1/graph/viewport",
+            "graph_retention": "/api/v1/graph/retention",
+            "graph_export": "/api/v1/graph/export",
+            "search": "/api/v1/search",
+            "clusters": "/api/v1/clusters",
+            "trending": "/api/v1/trending",
+            "graph_relink": "/api/v1/graph/relink",
+            "analytics": "/api/v1/analytics/{centrality|pagerank|communities}",
             "seeds": "/api/v1/seeds",
             "config": "/api/v1/config",
             "workers": "/api/v1/workers",
             "logs": "/api/v1/logs",
-            "ingest": "/api/v1/ingest"
+            "ingest": "/api/v1/ingest",
+            "ingest_bulk": "/api/v1/ingest/ndjson"
         },
         "websockets": {
             "meme_stream": "/ws/stream",
-            "loom_topology": "/ws/loom"
+            "loom_topology": "/ws/loom",
+            "trending": "/ws/trending"
         }
     }
 
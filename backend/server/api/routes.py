@@ -1,44 +1,66 @@
-from fastapi import APIRouter, WebSocket, WebSocketDisconnect, Query, HTTPException
-from typing import List, Optional
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect, Query, HTTPException, Request
+from fastapi.responses import StreamingResponse
+from typing import AsyncIterator, List, Optional, Tuple
+from datetime import datetime
+from collections import deque
 import asyncio
 import json
+import time
 
 from server.models.schemas import (
     MemeEventSchema, LoomNodeSchema, WorkerNodeSchema, LogEntrySchema,
     CrawlSeedInput, SystemStatusSchema, GraphSnapshotSchema, ConfigSchema
 )
-from server.services.graph_service import graph_service
-from server.services.meme_processor import meme_processor
-from server.services.system_monitor import system_monitor
-from server.services.crawler_service import crawler_service
+from server.services.graph_owner import owner_client
+from server.services.graph_export import export_stream, EXPORT_CHUNK_ROWS
+from server.services.analytics_service import ANALYTICS_KINDS
+from server.services.trending_service import TRENDING_DIMENSIONS
+from server.services.relink_service import RELINK_DEFAULT_K, RELINK_DEFAULT_THRESHOLD, RELINK_WORKERS
+from server.services.meme_processor import IngestQueueFull
+from server.api.websockets import manager as stream_manager
 
 router = APIRouter(prefix="/api/v1")
 
 
 @router.get("/status", response_model=SystemStatusSchema)
 async def get_system_status():
-    status = system_monitor.get_status()
-    stats = meme_processor.get_stats()
+    status = await owner_client.monitor.get_status()
+    stats = await owner_client.processor.get_stats()
     status["memes_processed"] = stats["processed_count"]
-    status["queue_depth"] = stats["queue_depth"]
+    for key in (
+        "queue_depth", "queue_capacity", "queue_wait_ms", "queue_wait_p95_ms",
+        "ingest_workers", "workers_busy", "worker_utilisation"
+    ):
+        status[key] = stats[key]
     return status
 
 
+@router.get("/metrics")
+async def get_metrics():
+    return {
+        "llm": await owner_client.llm.get_stats(),
+        "processor": await owner_client.processor.get_stats(),
+        "search": await owner_client.search.get_stats(),
+        "db": await owner_client.db.get_stats(),
+        # This process's /ws/stream clients, not the owner's
+        "stream": stream_manager.stream.get_stats()
+    }
+
+
 @router.get("/stream")
 async def get_meme_stream(
     page: int = Query(1, ge=1),
     limit: int = Query(20, ge=1, le=100),
     source: Optional[str] = None
 ):
-    nodes = graph_service.get_all_nodes()
+    nodes = await owner_client.graph.get_all_nodes()
     
     events = []
     for node in nodes:
-        graph_node = graph_service.graph.nodes.get(node["id"], {})
         events.append({
             "id": node["id"],
             "source": "Web",
-            "content": graph_node.get("label", ""),
+            "content": node["metadata"].get("label", ""),
             "timestamp": "2024-01-01T00:00:00Z",
             "virality": node["size"] * 20,
             "tags": [node["metadata"].get("cluster", "default")]
@@ -56,18 +78,215 @@ async def get_meme_stream(
     }
 
 
+NDJSON_PAGE_SIZE = 1000
+# Bulk ingest: lines per processor batch, batches processed at once, longest accepted line
+BULK_BATCH_SIZE = 64
+BULK_BATCHES_IN_FLIGHT = 2
+BULK_MAX_LINE_BYTES = 1 << 20
+
+
+def _node_cursor(cursor: Optional[str]) -> int:
+    try:
+        return int(cursor) if cursor else 0
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def _edge_cursor(cursor: Optional[str]) -> Tuple[int, int]:
+    if not cursor:
+        return (0, 0)
+    try:
+        lo, hi = cursor.split("-")
+        return (int(lo), int(hi))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
 @router.get("/graph/nodes")
-async def get_graph_snapshot():
-    snapshot = graph_service.get_graph_snapshot()
-    return snapshot
+async def get_graph_snapshot(
+    cursor: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1, le=10000),
+    cluster: Optional[str] = None,
+    min_size: Optional[float] = None
+):
+    # Without paging parameters this stays the original whole-graph snapshot
+    if cursor is None and limit is None and cluster is None and min_size is None:
+        return await owner_client.graph.get_graph_snapshot()
+    nodes, next_cursor = await owner_client.graph.node_page(_node_cursor(cursor), limit or 1000, cluster, min_size)
+    return {
+        "nodes": nodes,
+        "next_cursor": str(next_cursor) if next_cursor is not None else None,
+        "has_more": next_cursor is not None
+    }
+
+
+@router.get("/graph/nodes/{node_id}/ego")
+async def get_ego_graph(
+    node_id: str,
+    hops: int = Query(2, ge=1, le=4),
+    max_nodes: int = Query(200, ge=1, le=5000),
+    min_weight: float = Query(0.0, ge=0.0)
+):
+    ego = await owner_client.graph.ego_graph(node_id, hops, max_nodes, min_weight)
+    if ego is None:
+        raise HTTPException(status_code=404, detail="Node not found")
+    return ego
+
+
+@router.get("/graph/edges")
+async def get_graph_edges(
+    cursor: Optional[str] = None,
+    limit: int = Query(1000, ge=1, le=10000),
+    cluster: Optional[str] = None,
+    min_size: Optional[float] = None
+):
+    edges, next_cursor = await owner_client.graph.edge_page(_edge_cursor(cursor), limit, cluster, min_size)
+    return {
+        "edges": edges,
+        "next_cursor": "%d-%d" % next_cursor if next_cursor is not None else None,
+        "has_more": next_cursor is not None
+    }
+
+
+@router.get("/graph/nodes/ndjson")
+async def stream_graph_nodes(cluster: Optional[str] = None, min_size: Optional[float] = None):
+    async def lines():
+        cursor = 0
+        while cursor is not None:
+            nodes, cursor = await owner_client.graph.node_page(cursor, NDJSON_PAGE_SIZE, cluster, min_size)
+            yield "".join(json.dumps(node) + "\n" for node in nodes)
+            # Let other requests run between pages
+            await asyncio.sleep(0)
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+
+@router.get("/graph/edges/ndjson")
+async def stream_graph_edges(cluster: Optional[str] = None, min_size: Optional[float] = None):
+    async def lines():
+        cursor = (0, 0)
+        while cursor is not None:
+            edges, cursor = await owner_client.graph.edge_page(cursor, NDJSON_PAGE_SIZE, cluster, min_size)
+            yield "".join(json.dumps(edge) + "\n" for edge in edges)
+            await asyncio.sleep(0)
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+
+@router.get("/graph/export")
+async def export_graph(
+    embeddings: bool = True,
+    compress: bool = True,
+    chunk_rows: int = Query(EXPORT_CHUNK_ROWS, ge=1, le=262144)
+):
+    filename = f"witness-graph-{datetime.utcnow().strftime('%Y%m%dT%H%M%SZ')}.tar"
+    return StreamingResponse(
+        export_stream(owner_client.graph, embeddings, compress, chunk_rows),
+        media_type="application/x-tar",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+
+@router.get("/graph/viewport")
+async def get_graph_viewport(
+    x_min: float = Query(0.0, ge=0, le=100),
+    y_min: float = Query(0.0, ge=0, le=100),
+    x_max: float = Query(100.0, ge=0, le=100),
+    y_max: float = Query(100.0, ge=0, le=100),
+    zoom: float = Query(1.0, gt=0),
+    max_nodes: int = Query(2000, ge=1, le=20000)
+):
+    if x_min > x_max or y_min > y_max:
+        raise HTTPException(status_code=400, detail="Viewport min must not exceed max")
+    return await owner_client.graph.get_viewport(x_min, y_min, x_max, y_max, zoom, max_nodes)
+
+
+@router.post("/graph/relink", status_code=202)
+async def start_relink(payload: dict = None):
+    payload = payload or {}
+    try:
+        k = int(payload.get("k", RELINK_DEFAULT_K))
+        threshold = float(payload.get("threshold", RELINK_DEFAULT_THRESHOLD))
+        workers = int(payload.get("workers", RELINK_WORKERS))
+    except (TypeError, ValueError):
+        raise HTTPException(status_code=400, detail="k, threshold and workers must be numbers")
+    if not 1 <= k <= 100 or not -1.0 <= threshold <= 1.0 or not 1 <= workers <= 32:
+        raise HTTPException(status_code=400, detail="k must be 1-100, threshold -1..1, workers 1-32")
+    job = await owner_client.relink.start(k, threshold, workers)
+    if job is None:
+        raise HTTPException(status_code=409, detail="A re-link job is already running")
+    await owner_client.monitor.log("RELINK", "ACTION", f"Re-link job {job['id']} started (k={k}, threshold={threshold})")
+    return job
+
+
+@router.get("/graph/relink")
+async def list_relink_jobs():
+    return await owner_client.relink.list_jobs()
+
+
+@router.get("/graph/relink/{job_id}")
+async def get_relink_job(job_id: str):
+    job = await owner_client.relink.get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+
+@router.get("/trending")
+async def get_trending(
+    dimension: str = Query("concept"),
+    limit: int = Query(20, ge=1, le=200),
+    sort: str = Query("rising")
+):
+    if dimension not in TRENDING_DIMENSIONS:
+        raise HTTPException(status_code=400, detail=f"dimension must be one of {', '.join(TRENDING_DIMENSIONS)}")
+    if sort not in ("rising", "volume", "decayed"):
+        raise HTTPException(status_code=400, detail="sort must be rising, volume or decayed")
+    return await owner_client.trending.get_trending(dimension, limit, sort)
+
+
+@router.get("/clusters")
+async def get_stream_clusters(members: int = Query(5, ge=0, le=50)):
+    return {
+        "clusters": await owner_client.clusters.summary(members),
+        "stats": await owner_client.clusters.get_stats()
+    }
+
+
+@router.get("/graph/retention")
+async def get_graph_retention():
+    return await owner_client.retention.get_stats()
+
+
+@router.get("/analytics/{kind}")
+async def get_analytics(kind: str, limit: int = Query(50, ge=1, le=1000)):
+    if kind not in ANALYTICS_KINDS:
+        raise HTTPException(status_code=404, detail=f"Unknown analytics kind: {kind}")
+    return await owner_client.analytics.get_result(kind, limit)
+
+
+@router.get("/search")
+async def search_graph(
+    q: str = Query(..., min_length=1, max_length=2000),
+    k: int = Query(10, ge=1, le=200),
+    cluster: Optional[str] = None,
+    source: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    min_score: float = Query(0.0, ge=-1.0, le=1.0)
+):
+    return await owner_client.search.search(
+        q, k, cluster, source,
+        since.timestamp() if since else None,
+        until.timestamp() if until else None,
+        min_score
+    )
 
 
 @router.post("/seeds")
 async def add_crawl_seed(seed: CrawlSeedInput):
-    system_monitor.log("SEED-INJECTOR", "ACTION", f"New seed added: {seed.url}")
+    await owner_client.monitor.log("SEED-INJECTOR", "ACTION", f"New seed added: {seed.url}")
     
     # Trigger the crawler service
-    job_id = await crawler_service.start_crawl(seed.url, seed.priority)
+    job_id = await owner_client.crawler.start_crawl(seed.url, seed.priority)
     
     return {
         "success": True,
@@ -89,21 +308,21 @@ async def get_config():
 
 @router.post("/config")
 async def update_config(config: dict):
-    system_monitor.log("CONFIG", "ACTION", f"Configuration updated: {list(config.keys())}")
+    await owner_client.monitor.log("CONFIG", "ACTION", f"Configuration updated: {list(config.keys())}")
     return {"success": True, "updated": list(config.keys())}
 
 
 @router.get("/workers")
 async def get_workers():
-    return crawler_service.get_workers()
+    return await owner_client.crawler.get_workers()
 
 
 @router.get("/logs")
 async def get_logs(limit: int = Query(50, ge=1, le=200)):
-    return system_monitor.get_logs(limit)
+    return await owner_client.monitor.get_logs(limit)
 
 
-@router.post("/ingest")
+@router.post("/ingest", status_code=202)
 async def ingest_content(payload: dict):
     content = payload.get("content", "")
     source = payload.get("source", "Web")
@@ -112,5 +331,135 @@ async def ingest_content(payload: dict):
     if not content:
         raise HTTPException(status_code=400, detail="Content is required")
     
-    meme = await meme_processor.process_raw_content(content, source, metadata)
-    return meme
+    try:
+        return await owner_client.processor.submit(content, source, metadata)
+    except IngestQueueFull as e:
+        raise HTTPException(
+            status_code=429,
+            detail="Ingest queue is full",
+            headers={"Retry-After": str(int(e.retry_after))}
+        )
+
+
+@router.get("/ingest/{job_id}")
+async def get_ingest_job(job_id: str):
+    job = await owner_client.processor.get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+
+class _DuplexStreamingResponse(StreamingResponse):
+    """
+    Streams while the request body is still being read. StreamingResponse otherwise
+    listens for a disconnect on the same receive channel and would swallow body chunks;
+    a dropped client still surfaces as ClientDisconnect from request.stream().
+    """
+
+    async def __call__(self, scope, receive, send):
+        await self.stream_response(send)
+
+
+async def _body_lines(request: Request) -> AsyncIterator[Optional[bytes]]:
+    """Lines of the request body as they arrive; None stands in for a line over BULK_MAX_LINE_BYTES."""
+    buffer = bytearray()
+    oversized = False
+    async for chunk in request.stream():
+        buffer.extend(chunk)
+        while True:
+            end = buffer.find(b"\n")
+            if end < 0:
+                break
+            yield None if oversized else bytes(buffer[:end])
+            del buffer[:end + 1]
+            oversized = False
+        if len(buffer) > BULK_MAX_LINE_BYTES:
+            # Drop the rest of this line as it streams in rather than buffering it
+            oversized = True
+            buffer.clear()
+    if oversized:
+        yield None
+    elif buffer.strip():
+        yield bytes(buffer)
+
+
+def _parse_bulk_line(raw: Optional[bytes]) -> Tuple[Optional[dict], Optional[str]]:
+    if raw is None:
+        return None, f"line exceeds {BULK_MAX_LINE_BYTES} bytes"
+    try:
+        payload = json.loads(raw)
+    except ValueError as e:
+        return None, f"invalid JSON: {e}"
+    if not isinstance(payload, dict):
+        return None, "expected a JSON object"
+    if not payload.get("content") or not isinstance(payload["content"], str):
+        return None, "content is required"
+    return {
+        "content": payload["content"],
+        "source": payload.get("source", "Web"),
+        "metadata": payload.get("metadata", {})
+    }, None
+
+
+async def _ingest_bulk_batch(batch: List[Tuple[int, Optional[dict], Optional[str]]]) -> List[dict]:
+    items = [item for _, item, _ in batch if item is not None]
+    try:
+        processed = iter(await owner_client.processor.process_batch(items) if items else [])
+    except Exception as e:
+        processed = iter([{"error": str(e)}] * len(items))
+    results = []
+    for line, item, error in batch:
+        outcome = next(processed) if item is not None else {"error": error}
+        results.append({"line": line, **outcome})
+    return results
+
+
+@router.post("/ingest/ndjson")
+async def ingest_ndjson(request: Request, report: str = Query("all")):
+    """
+    Bulk ingest: one {"content", "source", "metadata"} object per line. The body is read as
+    it arrives and fed to the processor in batches, with at most BULK_BATCHES_IN_FLIGHT
+    batches held at once, so memory stays flat however long the upload is. Streams back
+    {"line", "id"} or {"line", "error"} per non-blank line, in order, then a summary line.
+    report=errors leaves out the successes, for clients that only read the response once
+    they have sent the whole body.
+    """
+    if report not in ("all", "errors"):
+        raise HTTPException(status_code=400, detail="report must be all or errors")
+
+    async def results():
+        started = time.perf_counter()
+        in_flight: deque = deque()
+        batch = []
+        counts = {"lines": 0, "ingested": 0, "errors": 0}
+
+        def finished(outcomes: List[dict]) -> str:
+            for outcome in outcomes:
+                counts["ingested" if "id" in outcome else "errors"] += 1
+            if report == "errors":
+                outcomes = [outcome for outcome in outcomes if "error" in outcome]
+            return "".join(json.dumps(outcome) + "\n" for outcome in outcomes)
+
+        try:
+            async for raw in _body_lines(request):
+                counts["lines"] += 1
+                if raw is not None and not raw.strip():
+                    continue
+                item, error = _parse_bulk_line(raw)
+                batch.append((counts["lines"], item, error))
+                if len(batch) >= BULK_BATCH_SIZE:
+                    in_flight.append(asyncio.create_task(_ingest_bulk_batch(batch)))
+                    batch = []
+                    if len(in_flight) >= BULK_BATCHES_IN_FLIGHT:
+                        yield finished(await in_flight.popleft())
+            if batch:
+                in_flight.append(asyncio.create_task(_ingest_bulk_batch(batch)))
+            while in_flight:
+                yield finished(await in_flight.popleft())
+        finally:
+            # The client went away mid-stream: drop batches nobody will read
+            for task in in_flight:
+                task.cancel()
+        yield json.dumps({"done": True, **counts, "elapsed_s": round(time.perf_counter() - started, 3)}) + "\n"
+
+    return _DuplexStreamingResponse(results(), media_type="application/x-ndjson")
@@ -1,42 +1,44 @@
 from fastapi import WebSocket, WebSocketDisconnect
-from typing import Set, Dict, Callable
+from typing import Set, Dict, Hashable
 import asyncio
 import json
+import os
 
-from server.services.graph_service import graph_service
+from server.services.graph_service import LOD_ZOOM_THRESHOLD
+from server.services.graph_owner import owner_client
+from server.services.layout_engine import layout_engine
+from server.services.retention_service import retention_service
 from server.services.meme_processor import meme_processor
 from server.services.system_monitor import system_monitor
+from server.utils.fanout import Fanout
+
+# Outbound /ws/stream messages held per client, and what happens when a client falls that far behind
+STREAM_QUEUE_SIZE = int(os.getenv("WITNESS_STREAM_QUEUE_SIZE", "256"))
+STREAM_OVERFLOW = os.getenv("WITNESS_STREAM_OVERFLOW", "drop_oldest")
+PONG = json.dumps({"type": "pong"})
 
 
 class ConnectionManager:
     def __init__(self):
         self.stream_connections: Set[WebSocket] = set()
         self.loom_connections: Set[WebSocket] = set()
-        self.stream_callbacks: Dict[WebSocket, Callable] = {}
+        self.loom_viewports: Dict[WebSocket, Dict] = {}
+        self.trending_connections: Set[WebSocket] = set()
+        # Each stream client gets its own outbound queue and sender task
+        self.stream = Fanout(STREAM_QUEUE_SIZE, STREAM_OVERFLOW, on_remove=self._stream_dropped)
+        meme_processor.subscribe(self.broadcast_to_stream)
     
     async def connect_stream(self, websocket: WebSocket):
         await websocket.accept()
         self.stream_connections.add(websocket)
-        
-        async def broadcast_callback(meme_event: Dict):
-            if websocket in self.stream_connections:
-                try:
-                    await websocket.send_json({
-                        "type": "meme",
-                        "data": meme_event
-                    })
-                except Exception:
-                    pass
-        
-        self.stream_callbacks[websocket] = broadcast_callback
-        meme_processor.subscribe(broadcast_callback)
+        self.stream.add(websocket, websocket.send_text)
         system_monitor.log("WS-STREAM", "INFO", f"Client connected. Total: {len(self.stream_connections)}")
     
     async def connect_loom(self, websocket: WebSocket):
         await websocket.accept()
         self.loom_connections.add(websocket)
         
-        snapshot = graph_service.get_graph_snapshot()
+        snapshot = await owner_client.graph.get_graph_snapshot()
         await websocket.send_json({
             "type": "snapshot",
             "data": snapshot
@@ -44,31 +46,62 @@ class ConnectionManager:
         system_monitor.log("WS-LOOM", "INFO", f"Client connected. Total: {len(self.loom_connections)}")
     
     def disconnect_stream(self, websocket: WebSocket):
-        self.stream_connections.discard(websocket)
-        
-        callback = self.stream_callbacks.pop(websocket, None)
-        if callback:
-            meme_processor.unsubscribe(callback)
-        
-        system_monitor.log("WS-STREAM", "INFO", f"Client disconnected. Total: {len(self.stream_connections)}")
+        self.stream.remove(websocket)
+        if websocket in self.stream_connections:
+            self.stream_connections.discard(websocket)
+            system_monitor.log("WS-STREAM", "INFO", f"Client disconnected. Total: {len(self.stream_connections)}")
+    
+    def _stream_dropped(self, websocket: Hashable, reason: str):
+        system_monitor.log("WS-STREAM", "WARN", f"Dropping client: {reason}")
+        self.disconnect_stream(websocket)
+        if reason == "overflow":
+            asyncio.ensure_future(self._close_slow_client(websocket))
+    
+    async def _close_slow_client(self, websocket: WebSocket):
+        try:
+            # 1013: try again later
+            await websocket.close(code=1013)
+        except Exception:
+            pass
     
     def disconnect_loom(self, websocket: WebSocket):
         self.loom_connections.discard(websocket)
+        self.loom_viewports.pop(websocket, None)
         system_monitor.log("WS-LOOM", "INFO", f"Client disconnected. Total: {len(self.loom_connections)}")
     
-    async def broadcast_to_stream(self, message: Dict):
+    async def connect_trending(self, websocket: WebSocket):
+        await websocket.accept()
+        self.trending_connections.add(websocket)
+        await websocket.send_json({"type": "trending", "data": await owner_client.trending.snapshot()})
+        system_monitor.log("WS-TRENDING", "INFO", f"Client connected. Total: {len(self.trending_connections)}")
+    
+    def disconnect_trending(self, websocket: WebSocket):
+        self.trending_connections.discard(websocket)
+        system_monitor.log("WS-TRENDING", "INFO", f"Client disconnected. Total: {len(self.trending_connections)}")
+    
+    async def broadcast_trending(self):
+        message = {"type": "trending", "data": await owner_client.trending.snapshot()}
         disconnected = set()
-        for connection in self.stream_connections:
+        for connection in list(self.trending_connections):
             try:
-                await connection.send_json({
-                    "type": "meme",
-                    "data": message
-                })
+                await connection.send_json(message)
             except Exception:
                 disconnected.add(connection)
         
         for conn in disconnected:
-            self.disconnect_stream(conn)
+            self.disconnect_trending(conn)
+    
+    def broadcast_to_stream(self, message: Dict, kind: str = "meme"):
+        """Never waits on a client: the event is serialized once and queued for each one."""
+        if not len(self.stream):
+            return
+        try:
+            payload = json.dumps({"type": kind, "data": message}, separators=(",", ":"), ensure_ascii=False)
+        except (TypeError, ValueError) as e:
+            # One bad event must not cost the clients anything but that event
+            system_monitor.log("WS-STREAM", "WARN", f"Skipping unserializable {kind} event: {e}")
+            return
+        self.stream.publish(payload)
     
     async def broadcast_to_loom(self, message: Dict):
         disconnected = set()
@@ -81,6 +114,97 @@ class ConnectionManager:
         for conn in disconnected:
             self.disconnect_loom(conn)
     
+    def set_loom_viewport(self, websocket: WebSocket, viewport: Dict):
+        self.loom_viewports[websocket] = {
+            "x_min": float(viewport.get("x_min", 0.0)),
+            "y_min": float(viewport.get("y_min", 0.0)),
+            "x_max": float(viewport.get("x_max", 100.0)),
+            "y_max": float(viewport.get("y_max", 100.0)),
+            "zoom": float(viewport.get("zoom", 1.0)),
+            "max_nodes": int(viewport.get("max_nodes", 2000))
+        }
+    
+    async def get_loom_view(self, websocket: WebSocket) -> Dict:
+        viewport = self.loom_viewports.get(websocket)
+        if viewport is None:
+            return {"type": "snapshot", "data": await owner_client.graph.get_graph_snapshot()}
+        return {"type": "viewport_snapshot", "data": await owner_client.graph.get_viewport(**viewport)}
+    
+    async def broadcast_loom_views(self):
+        # Full-graph clients share one snapshot; viewport clients each get their own slice
+        snapshot_message = None
+        disconnected = set()
+        for connection in list(self.loom_connections):
+            if connection in self.loom_viewports:
+                message = await self.get_loom_view(connection)
+            else:
+                if snapshot_message is None:
+                    snapshot_message = {"type": "snapshot", "data": await owner_client.graph.get_graph_snapshot()}
+                message = snapshot_message
+            try:
+                await connection.send_json(message)
+            except Exception:
+                disconnected.add(connection)
+        
+        for conn in disconnected:
+            self.disconnect_loom(conn)
+    
+    async def broadcast_positions(self, moves: Dict):
+        everything = None
+        disconnected = set()
+        for connection in list(self.loom_connections):
+            viewport = self.loom_viewports.get(connection)
+            if viewport is None:
+                if everything is None:
+                    everything = [{"id": node_id, "x": x, "y": y} for node_id, (x, y) in moves.items()]
+                data = everything
+            elif viewport["zoom"] < LOD_ZOOM_THRESHOLD:
+                # Aggregated views are refreshed by the periodic viewport snapshot instead
+                continue
+            else:
+                data = [
+                    {"id": node_id, "x": x, "y": y}
+                    for node_id, (x, y) in moves.items()
+                    if viewport["x_min"] <= x <= viewport["x_max"] and viewport["y_min"] <= y <= viewport["y_max"]
+                ]
+            if not data:
+                continue
+            try:
+                await connection.send_json({"type": "positions", "data": data})
+            except Exception:
+                disconnected.add(connection)
+        
+        for conn in disconnected:
+            self.disconnect_loom(conn)
+    
+    async def broadcast_removals(self, removals: Dict):
+        # removals: id -> last (x, y), so viewport clients only hear about nodes they could see
+        everything = None
+        disconnected = set()
+        for connection in list(self.loom_connections):
+            viewport = self.loom_viewports.get(connection)
+            if viewport is None or viewport["zoom"] < LOD_ZOOM_THRESHOLD:
+                if everything is None:
+                    everything = list(removals)
+                data = everything
+            else:
+                data = [
+                    node_id for node_id, position in removals.items()
+                    if position is None or (
+                        viewport["x_min"] <= position[0] <= viewport["x_max"]
+                        and viewport["y_min"] <= position[1] <= viewport["y_max"]
+                    )
+                ]
+            if not data:
+                continue
+            try:
+                await connection.send_json({"type": "nodes_removed", "data": data})
+            except Exception:
+                disconnected.add(connection)
+        
+        for conn in disconnected:
+            self.disconnect_loom(conn)
+    
     async def broadcast_node_update(self, node: Dict):
         await self.broadcast_to_loom({
             "type": "node_update",
@@ -105,7 +229,8 @@ async def stream_endpoint(websocket: WebSocket):
             try:
                 message = json.loads(data)
                 if message.get("type") == "ping":
-                    await websocket.send_json({"type": "pong"})
+                    # Through the client's queue, so its sender task stays the only writer
+                    manager.stream.send(websocket, PONG)
             except json.JSONDecodeError:
                 pass
     except WebSocketDisconnect:
@@ -124,13 +249,17 @@ async def loom_endpoint(websocket: WebSocket):
                     await websocket.send_json({"type": "pong"})
                 
                 elif message.get("type") == "request_snapshot":
-                    snapshot = graph_service.get_graph_snapshot()
-                    await websocket.send_json({
-                        "type": "snapshot",
-                        "data": snapshot
-                    })
+                    await websocket.send_json(await manager.get_loom_view(websocket))
                 
-            except json.JSONDecodeError:
+                elif message.get("type") == "subscribe_viewport":
+                    manager.set_loom_viewport(websocket, message.get("viewport", {}))
+                    await websocket.send_json(await manager.get_loom_view(websocket))
+                
+                elif message.get("type") == "unsubscribe_viewport":
+                    manager.loom_viewports.pop(websocket, None)
+                    await websocket.send_json(await manager.get_loom_view(websocket))
+                
+            except (json.JSONDecodeError, AttributeError, TypeError, ValueError):
                 pass
     except WebSocketDisconnect:
         manager.disconnect_loom(websocket)
@@ -140,8 +269,71 @@ async def start_loom_broadcaster():
     while True:
         await asyncio.sleep(5)
         if manager.loom_connections:
-            snapshot = graph_service.get_graph_snapshot()
-            await manager.broadcast_to_loom({
-                "type": "snapshot",
-                "data": snapshot
-            })
+            await manager.broadcast_loom_views()
+
+
+async def start_position_broadcaster(interval: float = 0.5):
+    while True:
+        await asyncio.sleep(interval)
+        # Always drain so pending moves cannot pile up while nobody is watching
+        moves = layout_engine.drain_moves()
+        if moves and manager.loom_connections:
+            await manager.broadcast_positions(moves)
+
+
+async def start_removal_broadcaster(interval: float = 1.0):
+    while True:
+        await asyncio.sleep(interval)
+        removals = retention_service.drain_removals()
+        if removals and manager.loom_connections:
+            await manager.broadcast_removals(removals)
+
+
+async def start_owner_relay(interval: float = 0.25):
+    """
+    Shared-graph mode: replays the owner's meme / layout / eviction events to this
+    process's websocket clients. Memes only need relaying in workers; the owner's own
+    clients hear them straight from MemeProcessor.
+    """
+    cursor = None
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            latest, events = await owner_client.events_since(cursor)
+        except Exception as e:
+            system_monitor.log("WS-RELAY", "WARN", f"Owner event poll failed: {e}")
+            continue
+        # The owner restarted and its sequence began again
+        if cursor is not None and latest < cursor:
+            cursor = latest
+            continue
+        cursor = latest
+        for _, kind, data in events:
+            if kind in ("meme", "meme_update") and owner_client.remote and manager.stream_connections:
+                manager.broadcast_to_stream(data, kind)
+            elif kind == "positions" and manager.loom_connections:
+                await manager.broadcast_positions(data)
+            elif kind == "removals" and manager.loom_connections:
+                await manager.broadcast_removals(data)
+
+
+async def trending_endpoint(websocket: WebSocket):
+    await manager.connect_trending(websocket)
+    try:
+        while True:
+            data = await websocket.receive_text()
+            try:
+                message = json.loads(data)
+                if message.get("type") == "ping":
+                    await websocket.send_json({"type": "pong"})
+            except json.JSONDecodeError:
+                pass
+    except WebSocketDisconnect:
+        manager.disconnect_trending(websocket)
+
+
+async def start_trending_broadcaster(interval: float = 5.0):
+    while True:
+        await asyncio.sleep(interval)
+        if manager.trending_connections:
+            await manager.broadcast_trending()
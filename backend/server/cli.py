@@ -0,0 +1,102 @@
+"""
+Command-line tools.
+
+    python -m server.cli export graph.tar                       # from a running server
+    python -m server.cli export graph.tar --data-dir ./data     # offline, from checkpoints
+    python -m server.cli inspect graph.tar
+"""
+import argparse
+import asyncio
+import os
+import shutil
+import sys
+import time
+import urllib.parse
+import urllib.request
+
+from server.services.graph_export import EXPORT_CHUNK_ROWS, LocalChunks, export_stream, iter_export
+
+DEFAULT_URL = os.getenv("WITNESS_API_URL", "http://localhost:5000")
+
+
+def _download(url: str, out: str, embeddings: bool, compress: bool, chunk_rows: int):
+    query = urllib.parse.urlencode({
+        "embeddings": str(embeddings).lower(), "compress": str(compress).lower(), "chunk_rows": chunk_rows
+    })
+    with urllib.request.urlopen(f"{url.rstrip('/')}/api/v1/graph/export?{query}") as response, open(out, "wb") as f:
+        shutil.copyfileobj(response, f, length=1 << 20)
+
+
+async def _export_local(data_dir: str, out: str, embeddings: bool, compress: bool, chunk_rows: int):
+    # Imported here so a download does not load the graph stack
+    from server.services.graph_persistence import GraphPersistence
+    from server.services.graph_service import GraphService
+
+    graph = GraphService()
+    nodes = GraphPersistence(graph, data_dir).restore(attach=False)
+    print(f"Loaded {nodes} nodes from {data_dir}", file=sys.stderr)
+    with open(out, "wb") as f:
+        async for data in export_stream(LocalChunks(graph), embeddings, compress, chunk_rows):
+            f.write(data)
+
+
+def export(args) -> int:
+    start = time.perf_counter()
+    embeddings = not args.no_embeddings
+    compress = not args.no_compress
+    if args.data_dir:
+        asyncio.run(_export_local(args.data_dir, args.out, embeddings, compress, args.chunk_rows))
+    else:
+        _download(args.url, args.out, embeddings, compress, args.chunk_rows)
+    size = os.path.getsize(args.out)
+    print(f"Wrote {args.out} ({size / 1e6:.1f} MB) in {time.perf_counter() - start:.1f}s", file=sys.stderr)
+    return 0
+
+
+def inspect(args) -> int:
+    totals = {"nodes": 0, "edges": 0}
+    manifest = None
+    for kind, contents in iter_export(args.file):
+        if kind in totals:
+            totals[kind] += len(contents["id"] if kind == "nodes" else contents["source"])
+        elif kind == "schema":
+            print(f"format {contents['format']} v{contents['format_version']}, created {contents['created_at']}")
+            print("node columns: " + ", ".join(f"{name} ({kind})" for name, kind in contents["nodes"].items()))
+            print("edge columns: " + ", ".join(f"{name} ({kind})" for name, kind in contents["edges"].items()))
+        elif kind == "manifest":
+            manifest = contents
+            print(f"{contents['nodes']} nodes in {contents['node_chunks']} chunks, "
+                  f"{contents['edges']} edges in {contents['edge_chunks']} chunks")
+    if manifest is None:
+        print("No manifest: the export is truncated", file=sys.stderr)
+        return 1
+    if totals != {"nodes": manifest["nodes"], "edges": manifest["edges"]}:
+        print(f"Manifest does not match contents: read {totals}", file=sys.stderr)
+        return 1
+    return 0
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m server.cli", description="The Witness command-line tools")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    export_parser = commands.add_parser("export", help="Write the graph as a columnar tar export")
+    export_parser.add_argument("out", help="Output file (.tar)")
+    source = export_parser.add_mutually_exclusive_group()
+    source.add_argument("--url", default=DEFAULT_URL, help=f"Running server to export from (default {DEFAULT_URL})")
+    source.add_argument("--data-dir", help="Export offline from the checkpoints in this data directory instead")
+    export_parser.add_argument("--no-embeddings", action="store_true", help="Leave out the embedding matrix")
+    export_parser.add_argument("--no-compress", action="store_true", help="Store chunks uncompressed")
+    export_parser.add_argument("--chunk-rows", type=int, default=EXPORT_CHUNK_ROWS, help="Rows per chunk")
+    export_parser.set_defaults(handler=export)
+
+    inspect_parser = commands.add_parser("inspect", help="Summarise an export file")
+    inspect_parser.add_argument("file")
+    inspect_parser.set_defaults(handler=inspect)
+
+    args = parser.parse_args(argv)
+    return args.handler(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,14 +1,53 @@
-from sqlalchemy import create_engine, Column, Integer, String, Float, DateTime, Boolean, Text, JSON
+from sqlalchemy import create_engine, event, make_url, Column, Integer, String, Float, DateTime, Boolean, Text, JSON, Index
+from sqlalchemy.engine import Engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
 from datetime import datetime
+from typing import Optional
 import os
 
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite+aiosqlite:///./witness.db")
 
+# WAL lets readers carry on while the write-behind persister commits; NORMAL sync is
+# durable across application crashes (only an OS crash can lose the last commits)
+SQLITE_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-65536",
+    "PRAGMA mmap_size=268435456",
+    "PRAGMA busy_timeout=5000",
+)
+
 engine = create_async_engine(DATABASE_URL, echo=False)
 async_session = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+_sync_engine: Optional[Engine] = None
+
+
+def _apply_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    for pragma in SQLITE_PRAGMAS:
+        cursor.execute(pragma)
+    cursor.close()
+
+
+if engine.dialect.name == "sqlite":
+    event.listen(engine.sync_engine, "connect", _apply_sqlite_pragmas)
+
+
+def get_sync_engine() -> Engine:
+    """
+    A blocking engine on the same database (the async driver swapped for the default
+    one), for work done in a thread off the event loop.
+    """
+    global _sync_engine
+    if _sync_engine is None:
+        url = make_url(DATABASE_URL)
+        _sync_engine = create_engine(url.set(drivername=url.drivername.split("+")[0]), echo=False)
+        if _sync_engine.dialect.name == "sqlite":
+            event.listen(_sync_engine, "connect", _apply_sqlite_pragmas)
+    return _sync_engine
 
 Base = declarative_base()
 
@@ -39,6 +78,8 @@ class LoomNode(Base):
 
 class LoomEdge(Base):
     __tablename__ = "loom_edges"
+    # One row per node pair, so the persister can upsert edges
+    __table_args__ = (Index("ix_loom_edges_pair", "source_id", "target_id", unique=True),)
     
     id = Column(Integer, primary_key=True, autoincrement=True)
     source_id = Column(String, nullable=False)
@@ -30,7 +30,7 @@ class LoomNodeSchema(BaseModel):
 
 
 class LoomEdgeSchema(BaseModel):
-    id: int
+    id: str
     source_id: str
     target_id: str
     weight: float = 1.0
@@ -68,6 +68,12 @@ class SystemStatusSchema(BaseModel):
     active_workers: int
     queue_depth: int
     memes_processed: int
+    queue_capacity: int = 0
+    queue_wait_ms: float = 0.0
+    queue_wait_p95_ms: float = 0.0
+    ingest_workers: int = 0
+    workers_busy: int = 0
+    worker_utilisation: float = 0.0
 
 
 class GraphSnapshotSchema(BaseModel):
@@ -0,0 +1,212 @@
+from typing import Dict, Optional, Tuple
+from collections import OrderedDict
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import unicodedata
+
+from .graph_persistence import DATA_DIR
+
+LLM_CACHE_ENABLED = os.getenv("WITNESS_LLM_CACHE", "1") not in ("0", "false", "no")
+LLM_CACHE_PATH = os.getenv("WITNESS_LLM_CACHE_PATH", os.path.join(DATA_DIR, "llm_cache.sqlite3"))
+LLM_CACHE_MEMORY_ENTRIES = int(os.getenv("WITNESS_LLM_CACHE_MEMORY_ENTRIES", "2048"))
+LLM_CACHE_DISK_BYTES = int(os.getenv("WITNESS_LLM_CACHE_DISK_BYTES", str(64 * 1024 * 1024)))
+LLM_CACHE_TTL_SECONDS = float(os.getenv("WITNESS_LLM_CACHE_TTL", str(30 * 86400)))
+# Disk eviction scans the table, so it runs once per this many writes rather than on each
+EVICT_EVERY_WRITES = 256
+# Evict down to this fraction of the byte budget
+LOW_WATER_MARK = 0.9
+
+
+def normalize_content(text: str) -> str:
+    """Unicode NFC with runs of whitespace collapsed: re-posts that differ only in spacing share a key."""
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+
+def cache_key(text: str, source: str, prompt_version: str, model: str) -> str:
+    material = "\x1f".join((normalize_content(text), source.strip().lower(), prompt_version, model))
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+class AnalysisCache:
+    """
+    Two-tier cache of LLM analyses: an in-memory LRU in front of a SQLite table that
+    survives restarts. Entries expire after `ttl` seconds; the table is trimmed least
+    recently used first once it passes `disk_bytes`. Each entry remembers how long the
+    original call took, so hits can be reported as latency saved.
+    """
+
+    def __init__(
+        self,
+        path: str = LLM_CACHE_PATH,
+        memory_entries: int = LLM_CACHE_MEMORY_ENTRIES,
+        disk_bytes: int = LLM_CACHE_DISK_BYTES,
+        ttl: float = LLM_CACHE_TTL_SECONDS,
+        enabled: bool = LLM_CACHE_ENABLED
+    ):
+        self.path = path
+        self.memory_entries = memory_entries
+        self.disk_bytes = disk_bytes
+        self.ttl = ttl
+        self.enabled = enabled
+        # key -> (result json, expires_at, latency_ms)
+        self._memory: "OrderedDict[str, Tuple[str, float, float]]" = OrderedDict()
+        self._db: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self._writes = 0
+        # Running totals of the disk table, so stats never scan it
+        self._disk_entries = 0
+        self._disk_size = 0
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.disk_evictions = 0
+        self.saved_ms = 0.0
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._db is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            db = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            db.execute("""
+                CREATE TABLE IF NOT EXISTS analysis (
+                    key TEXT PRIMARY KEY,
+                    result TEXT NOT NULL,
+                    expires_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL,
+                    latency_ms REAL NOT NULL,
+                    size INTEGER NOT NULL
+                )
+            """)
+            db.execute("CREATE INDEX IF NOT EXISTS analysis_accessed ON analysis (accessed_at)")
+            self._db = db
+            self._count(db)
+        return self._db
+
+    def _count(self, db: sqlite3.Connection):
+        self._disk_entries, self._disk_size = db.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM analysis"
+        ).fetchone()
+
+    def _remember(self, key: str, result: str, expires_at: float, latency_ms: float):
+        self._memory[key] = (result, expires_at, latency_ms)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def _disk_get(self, key: str, now: float) -> Optional[Tuple[str, float, float]]:
+        with self._lock:
+            db = self._connect()
+            row = db.execute("SELECT result, expires_at, latency_ms, size FROM analysis WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            if row[1] <= now:
+                db.execute("DELETE FROM analysis WHERE key = ?", (key,))
+                self._disk_entries -= 1
+                self._disk_size -= row[3]
+                return None
+            db.execute("UPDATE analysis SET accessed_at = ? WHERE key = ?", (now, key))
+            return row[:3]
+
+    def _disk_put(self, key: str, result: str, expires_at: float, latency_ms: float, now: float):
+        with self._lock:
+            db = self._connect()
+            replaced = db.execute("SELECT size FROM analysis WHERE key = ?", (key,)).fetchone()
+            size = len(key) + len(result)
+            db.execute(
+                "INSERT OR REPLACE INTO analysis VALUES (?, ?, ?, ?, ?, ?)",
+                (key, result, expires_at, now, latency_ms, size)
+            )
+            if replaced is None:
+                self._disk_entries += 1
+            self._disk_size += size - (replaced[0] if replaced else 0)
+            self._writes += 1
+            if self._writes % EVICT_EVERY_WRITES == 0:
+                self._evict(db, now)
+
+    def _evict(self, db: sqlite3.Connection, now: float):
+        self.disk_evictions += db.execute("DELETE FROM analysis WHERE expires_at <= ?", (now,)).rowcount
+        # Eviction already scans the table, so the running totals are re-based here
+        self._count(db)
+        if self._disk_size <= self.disk_bytes:
+            return
+        excess = self._disk_size - int(self.disk_bytes * LOW_WATER_MARK)
+        cutoff, freed = None, 0
+        for accessed_at, size in db.execute("SELECT accessed_at, size FROM analysis ORDER BY accessed_at"):
+            cutoff, freed = accessed_at, freed + size
+            if freed >= excess:
+                break
+        if cutoff is not None:
+            self.disk_evictions += db.execute("DELETE FROM analysis WHERE accessed_at <= ?", (cutoff,)).rowcount
+            self._count(db)
+
+    async def get(self, key: str) -> Optional[Dict]:
+        if not self.enabled:
+            return None
+        now = time.time()
+        entry = self._memory.get(key)
+        if entry is not None and entry[1] <= now:
+            del self._memory[key]
+            self.expired += 1
+            entry = None
+        if entry is not None:
+            self._memory.move_to_end(key)
+            self.memory_hits += 1
+        else:
+            loop = asyncio.get_event_loop()
+            entry = await loop.run_in_executor(None, self._disk_get, key, now)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._remember(key, *entry)
+            self.disk_hits += 1
+        self.saved_ms += entry[2]
+        return json.loads(entry[0])
+
+    async def put(self, key: str, result: Dict, latency_ms: float):
+        if not self.enabled:
+            return
+        now = time.time()
+        encoded = json.dumps(result, separators=(",", ":"))
+        self._remember(key, encoded, now + self.ttl, latency_ms)
+        loop = asyncio.get_event_loop()
+        await loop.run_in_executor(None, self._disk_put, key, encoded, now + self.ttl, latency_ms, now)
+
+    def clear(self):
+        self._memory.clear()
+        with self._lock:
+            self._connect().execute("DELETE FROM analysis")
+            self._disk_entries, self._disk_size = 0, 0
+
+    def close(self):
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+    def get_stats(self) -> Dict:
+        if not self.enabled:
+            return {"enabled": False}
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        return {
+            "enabled": True,
+            "memory_entries": len(self._memory),
+            "disk_entries": self._disk_entries,
+            "disk_bytes": self._disk_size,
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": round((self.memory_hits + self.disk_hits) / lookups, 4) if lookups else 0.0,
+            "expired": self.expired,
+            "disk_evictions": self.disk_evictions,
+            "saved_latency_ms": round(self.saved_ms, 1)
+        }
+
+
+analysis_cache = AnalysisCache()
@@ -0,0 +1,189 @@
+from typing import Dict, List, Optional
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+import asyncio
+import multiprocessing
+import os
+import time
+
+import numpy as np
+
+from .graph_algorithms import run_analytics
+from .graph_service import graph_service, GraphService
+from .system_monitor import system_monitor
+
+ANALYTICS_KINDS = ("centrality", "pagerank", "communities")
+ANALYTICS_INTERVAL_SECONDS = float(os.getenv("WITNESS_ANALYTICS_INTERVAL", "30"))
+ANALYTICS_WORKERS = int(os.getenv("WITNESS_ANALYTICS_WORKERS", "1"))
+RESULT_HISTORY = 4
+
+
+class AnalyticsService:
+    """
+    Runs whole-graph analytics in a worker process against a topology snapshot and keeps
+    the results keyed by topology version, so layout moves never invalidate them. Readers
+    always get the freshest finished result immediately; a stale read schedules a
+    recompute instead of waiting for one.
+    """
+
+    def __init__(self, graph: GraphService, workers: int = ANALYTICS_WORKERS):
+        self.graph = graph
+        self.workers = workers
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._running: Dict[str, asyncio.Task] = {}
+        # kind -> OrderedDict(version -> result), newest last
+        self._results: Dict[str, "OrderedDict[int, Dict]"] = {kind: OrderedDict() for kind in ANALYTICS_KINDS}
+        self.runs = 0
+        self.failures = 0
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # spawn: never fork a process that owns a running event loop
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers, mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._executor
+
+    def latest(self, kind: str) -> Optional[Dict]:
+        results = self._results[kind]
+        return next(reversed(results.values())) if results else None
+
+    def cached(self, kind: str, version: int) -> Optional[Dict]:
+        return self._results[kind].get(version)
+
+    def is_running(self, kind: str) -> bool:
+        task = self._running.get(kind)
+        return task is not None and not task.done()
+
+    def request_refresh(self, kind: str):
+        """Schedules a recompute if the cached result is behind the graph and none is in flight."""
+        latest = self.latest(kind)
+        if self.is_running(kind) or (latest and latest["version"] == self.graph.topology_version):
+            return
+        self._running[kind] = asyncio.create_task(self.refresh(kind))
+
+    async def refresh(self, kind: str) -> Dict:
+        snapshot = self.graph.export_topology()
+        cached = self.cached(kind, snapshot["version"])
+        if cached:
+            return cached
+
+        prior = None
+        if kind == "pagerank":
+            latest = self.latest(kind)
+            if latest:
+                prior = {"ids": latest["ids"], "scores": latest["scores"]}
+
+        loop = asyncio.get_event_loop()
+        start = time.perf_counter()
+        try:
+            output = await loop.run_in_executor(self._get_executor(), run_analytics, kind, snapshot, prior)
+        except Exception as e:
+            self.failures += 1
+            if isinstance(e, BrokenProcessPool):
+                # A crashed worker poisons the pool; start a fresh one on the next run
+                self._executor = None
+            system_monitor.log("ANALYTICS", "WARN", f"{kind} failed: {e}")
+            raise
+        self.runs += 1
+
+        result = {
+            "kind": kind,
+            "version": snapshot["version"],
+            "ids": snapshot["ids"],
+            "computed_at": datetime.utcnow().isoformat() + "Z",
+            "duration_ms": (time.perf_counter() - start) * 1000,
+            **output
+        }
+        results = self._results[kind]
+        results[snapshot["version"]] = result
+        while len(results) > RESULT_HISTORY:
+            results.popitem(last=False)
+        return result
+
+    def get_result(self, kind: str, limit: int = 50) -> Dict:
+        """Freshest completed result, summarised for the API."""
+        self.request_refresh(kind)
+        result = self.latest(kind)
+        response = {
+            "kind": kind,
+            "graph_version": self.graph.topology_version,
+            "computing": self.is_running(kind)
+        }
+        if result is None:
+            response["status"] = "pending"
+            return response
+
+        response.update({
+            "status": "ready",
+            "version": result["version"],
+            "stale": result["version"] != self.graph.topology_version,
+            "computed_at": result["computed_at"],
+            "duration_ms": result["duration_ms"],
+            "node_count": len(result["ids"])
+        })
+        ids = result["ids"]
+        if kind == "communities":
+            labels = result["labels"]
+            sizes = np.bincount(labels) if len(labels) else np.zeros(0, dtype=np.int64)
+            members: Dict[int, List[str]] = {}
+            for node_id, label in zip(ids, labels.tolist()):
+                if label < limit and len(members.setdefault(label, [])) < 20:
+                    members[label].append(node_id)
+            response.update({
+                "modularity": result["modularity"],
+                "iterations": result["iterations"],
+                "community_count": len(sizes),
+                "communities": [
+                    {"id": c, "size": int(sizes[c]), "members": members.get(c, [])}
+                    for c in range(min(limit, len(sizes)))
+                ]
+            })
+        else:
+            scores = result["scores"]
+            top = np.argsort(-scores)[:limit] if len(scores) <= limit else np.argpartition(-scores, limit)[:limit]
+            top = top[np.argsort(-scores[top])]
+            response["top"] = [{"id": ids[i], "score": float(scores[i])} for i in top.tolist()]
+            if kind == "pagerank":
+                response["iterations"] = result["iterations"]
+                response["warm_start"] = result["warm_start"]
+        return response
+
+    def node_scores(self, node_id: str) -> Dict:
+        scores = {}
+        for kind in ANALYTICS_KINDS:
+            result = self.latest(kind)
+            if result is None:
+                continue
+            try:
+                i = result["ids"].index(node_id)
+            except ValueError:
+                continue
+            scores[kind] = int(result["labels"][i]) if kind == "communities" else float(result["scores"][i])
+        return scores
+
+    async def run(self, interval: float = ANALYTICS_INTERVAL_SECONDS):
+        while True:
+            await asyncio.sleep(interval)
+            for kind in ANALYTICS_KINDS:
+                self.request_refresh(kind)
+
+    def shutdown(self):
+        for task in self._running.values():
+            task.cancel()
+        if self._executor:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def get_stats(self) -> Dict:
+        return {
+            "runs": self.runs,
+            "failures": self.failures,
+            "versions": {kind: (self.latest(kind) or {}).get("version") for kind in ANALYTICS_KINDS},
+            "computing": [kind for kind in ANALYTICS_KINDS if self.is_running(kind)]
+        }
+
+
+analytics_service = AnalyticsService(graph_service)
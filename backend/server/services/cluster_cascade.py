@@ -0,0 +1,186 @@
+from typing import Dict, List, Optional, Tuple
+from collections import deque
+import asyncio
+import os
+import random
+import re
+
+import numpy as np
+
+from .embedding_service import embedding_service
+
+CASCADE_ENABLED = os.getenv("WITNESS_CASCADE", "1") not in ("0", "false", "no")
+KEYWORD_THRESHOLD = float(os.getenv("WITNESS_CASCADE_KEYWORD_THRESHOLD", "0.6"))
+CENTROID_THRESHOLD = float(os.getenv("WITNESS_CASCADE_CENTROID_THRESHOLD", "0.5"))
+# Share of locally resolved items still sent to the LLM to check the local answer
+AUDIT_RATE = float(os.getenv("WITNESS_CASCADE_AUDIT_RATE", "0.05"))
+TARGET_AGREEMENT = float(os.getenv("WITNESS_CASCADE_TARGET_AGREEMENT", "0.9"))
+# Audits per stage before its threshold is reconsidered, and how far it moves
+AUDIT_WINDOW = 40
+THRESHOLD_STEP = 0.05
+MAX_THRESHOLD = 0.95
+# Below this cosine similarity to every centroid the centroid stage abstains
+MIN_SIMILARITY = 0.1
+
+STAGES = ("keyword", "centroid")
+
+CLUSTER_KEYWORDS = {
+    "spiritual": ["soul", "spirit", "consciousness", "awakening", "meditation", "divine", "sacred", "mystical", "enlightenment"],
+    "ai": ["ai", "artificial intelligence", "machine learning", "gpt", "llm", "neural", "algorithm", "automation", "singularity"],
+    "cultural": ["meme", "viral", "trend", "culture", "society", "generation", "zeitgeist"],
+    "political": ["politics", "government", "election", "democracy", "policy", "vote"],
+    "tech": ["software", "hardware", "startup", "blockchain", "crypto", "chip", "cloud", "programming", "open source"],
+}
+
+ANCHOR_TEXTS = {
+    "spiritual": "soul spirit consciousness awakening meditation divine sacred mystical enlightenment god non-duality",
+    "ai": "artificial intelligence machine learning neural networks algorithm singularity automation llm gpt",
+    "cultural": "meme viral trend culture society generation zeitgeist social media internet",
+    "political": "politics government democracy policy election voting law rights",
+    "tech": "software hardware startup blockchain crypto chip cloud programming developer open source",
+    "abstract": "abstract philosophy theory metaphysics paradox concept idea meaning existence",
+}
+
+
+class ClusterCascade:
+    """
+    Cheap cluster guesses before the LLM: keyword hits first, then cosine similarity to
+    per-cluster centroids (seeded from anchor texts, refined by every LLM-labelled item).
+    A stage resolves an item when its confidence reaches that stage's threshold; the
+    rest go to the LLM. A sample of resolved items is checked against the LLM anyway, and
+    a stage agreeing less than TARGET_AGREEMENT of the time gets a stricter threshold
+    (relaxed back towards the configured one while it agrees comfortably).
+    """
+
+    def __init__(
+        self,
+        enabled: bool = CASCADE_ENABLED,
+        keyword_threshold: float = KEYWORD_THRESHOLD,
+        centroid_threshold: float = CENTROID_THRESHOLD,
+        audit_rate: float = AUDIT_RATE
+    ):
+        self.enabled = enabled
+        self.base_thresholds = {"keyword": keyword_threshold, "centroid": centroid_threshold}
+        self.thresholds = dict(self.base_thresholds)
+        self.audit_rate = audit_rate
+        self._patterns = {
+            cluster: re.compile(r"\b(" + "|".join(re.escape(word) for word in words) + r")\b")
+            for cluster, words in CLUSTER_KEYWORDS.items()
+        }
+        self._names = list(ANCHOR_TEXTS)
+        self._sums: Optional[np.ndarray] = None
+        self._centroids: Optional[np.ndarray] = None
+        self._audits = {stage: deque(maxlen=AUDIT_WINDOW) for stage in STAGES}
+        self.resolved = {"keyword": 0, "centroid": 0, "llm": 0, "fallback": 0, "unanalysed": 0}
+        self.audited = {stage: 0 for stage in STAGES}
+        self.agreed = {stage: 0 for stage in STAGES}
+        self.threshold_changes = 0
+
+    def keyword_scores(self, content: str) -> Dict[str, int]:
+        text = content.lower()
+        return {cluster: len(pattern.findall(text)) for cluster, pattern in self._patterns.items()}
+
+    def keyword_cluster(self, content: str) -> Tuple[str, float]:
+        """Best keyword cluster ("default" without hits) and a 0-1 confidence from the margin over the runner-up."""
+        scores = sorted(self.keyword_scores(content).items(), key=lambda item: item[1], reverse=True)
+        (best, top), (_, second) = scores[0], scores[1]
+        if top == 0:
+            return "default", 0.0
+        return best, (top - second) / (top + 1)
+
+    def _ensure_centroids(self):
+        if self._sums is None:
+            anchors = np.asarray([embedding_service.generate_embedding(ANCHOR_TEXTS[name]) for name in self._names], dtype=np.float32)
+            self._sums = anchors / np.maximum(np.linalg.norm(anchors, axis=1, keepdims=True), 1e-9)
+            self._centroids = self._sums.copy()
+
+    def centroid_cluster(self, embedding: List[float]) -> Tuple[str, float]:
+        """Nearest centroid and a 0-1 confidence from its similarity margin over the second nearest."""
+        self._ensure_centroids()
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        if norm == 0 or len(vector) != self._centroids.shape[1]:
+            return "default", 0.0
+        similarities = self._centroids @ (vector / norm)
+        order = np.argsort(-similarities)
+        best, second = float(similarities[order[0]]), float(similarities[order[1]])
+        if best < MIN_SIMILARITY:
+            return self._names[order[0]], 0.0
+        return self._names[order[0]], (best - max(second, 0.0)) / best
+
+    async def classify(self, content: str, embedding: List[float]) -> Dict:
+        """
+        {"cluster", "stage", "confidence", "resolved"}: the first stage that is confident
+        enough, or the best guess with stage "llm" when none is.
+        """
+        cluster, confidence = self.keyword_cluster(content)
+        if not self.enabled:
+            return {"cluster": cluster, "stage": "llm", "confidence": confidence, "resolved": False}
+        if confidence >= self.thresholds["keyword"]:
+            return {"cluster": cluster, "stage": "keyword", "confidence": confidence, "resolved": True}
+
+        if self._centroids is None:
+            # The anchors are embedded once, off the event loop
+            await asyncio.get_event_loop().run_in_executor(None, self._ensure_centroids)
+        centroid, centroid_confidence = self.centroid_cluster(embedding)
+        if centroid_confidence >= self.thresholds["centroid"]:
+            return {"cluster": centroid, "stage": "centroid", "confidence": centroid_confidence, "resolved": True}
+        if cluster == "default":
+            cluster, confidence = centroid, centroid_confidence
+        return {"cluster": cluster, "stage": "llm", "confidence": confidence, "resolved": False}
+
+    def should_audit(self) -> bool:
+        return random.random() < self.audit_rate
+
+    def learn(self, embedding: List[float], cluster: str):
+        """Folds an LLM-labelled embedding into its cluster's centroid."""
+        if cluster not in ANCHOR_TEXTS:
+            return
+        self._ensure_centroids()
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        if norm == 0 or len(vector) != self._sums.shape[1]:
+            return
+        row = self._names.index(cluster)
+        self._sums[row] += vector / norm
+        self._centroids[row] = self._sums[row] / max(np.linalg.norm(self._sums[row]), 1e-9)
+
+    def record_audit(self, stage: str, local_cluster: str, llm_cluster: str):
+        agreed = local_cluster == llm_cluster
+        window = self._audits[stage]
+        window.append(agreed)
+        self.audited[stage] += 1
+        self.agreed[stage] += agreed
+        if len(window) < AUDIT_WINDOW:
+            return
+        agreement = sum(window) / len(window)
+        threshold = self.thresholds[stage]
+        if agreement < TARGET_AGREEMENT:
+            self.thresholds[stage] = min(MAX_THRESHOLD, threshold + THRESHOLD_STEP)
+        elif agreement >= (1 + TARGET_AGREEMENT) / 2:
+            self.thresholds[stage] = max(self.base_thresholds[stage], threshold - THRESHOLD_STEP)
+        if self.thresholds[stage] != threshold:
+            self.threshold_changes += 1
+            # Judge the new threshold on fresh audits only
+            window.clear()
+
+    def get_stats(self) -> Dict:
+        return {
+            "enabled": self.enabled,
+            "resolved": dict(self.resolved),
+            "llm_share": round(self.resolved["llm"] / max(sum(self.resolved.values()), 1), 4),
+            "thresholds": {stage: round(value, 3) for stage, value in self.thresholds.items()},
+            "audit_rate": self.audit_rate,
+            "audits": {
+                stage: {
+                    "audited": self.audited[stage],
+                    "agreed": self.agreed[stage],
+                    "agreement": round(self.agreed[stage] / self.audited[stage], 4) if self.audited[stage] else None
+                }
+                for stage in STAGES
+            },
+            "threshold_changes": self.threshold_changes
+        }
+
+
+cluster_cascade = ClusterCascade()
@@ -151,7 +151,7 @@ class CrawlerService:
                      final_title = meta_content['title']
 
                 # Send to processor
-                await meme_processor.process_raw_content(
+                await meme_processor.enqueue(
                     content=f"{final_title}: {final_content[:3000]}", # Grab more context for LLM
                     source="Crawler V2",
                     metadata={"url": url, "worker": worker_id, "full_title": final_title, "length": len(final_content)}
@@ -168,7 +168,7 @@ class CrawlerService:
             print(f"Crawl Error: {e}")
             worker["status"] = "ERROR"
             worker["current_task"] = f"Error: {str(e)}"
-            await meme_processor.process_raw_content(
+            await meme_processor.enqueue(
                 content=f"Failed to crawl {url}: {str(e)}",
                 source="System",
                 metadata={"url": url, "type": "error"}
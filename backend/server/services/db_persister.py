@@ -0,0 +1,406 @@
+from typing import Dict, List, Optional, Set, Tuple
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+import asyncio
+import os
+import time
+
+from sqlalchemy import bindparam, column, delete, func, select, table, text, update
+from sqlalchemy.dialects import postgresql, sqlite
+
+from ..models.database import Base, LoomEdge, LoomNode, MemeEvent, get_sync_engine
+from ..utils.rate_limit import backoff_delay
+from .graph_service import GraphService, graph_service
+from .system_monitor import system_monitor
+
+DB_PERSIST_ENABLED = os.getenv("WITNESS_DB_PERSIST", "1") not in ("0", "false", "no")
+DB_FLUSH_INTERVAL_SECONDS = float(os.getenv("WITNESS_DB_FLUSH_INTERVAL", "1.0"))
+# Rows per multi-row statement; a buffer reaching this size also flushes early
+DB_BATCH_SIZE = int(os.getenv("WITNESS_DB_BATCH_SIZE", "500"))
+# While the database is failing: rows buffered beyond this are dropped, and a batch that
+# failed this many flushes in a row is dropped instead of retried
+DB_MAX_PENDING_ROWS = int(os.getenv("WITNESS_DB_MAX_PENDING", "200000"))
+DB_MAX_RETRIES = int(os.getenv("WITNESS_DB_MAX_RETRIES", "5"))
+DB_RETRY_MAX_SECONDS = 60.0
+# Embeddings are already in the graph checkpoints and cost ~8 KB a row as JSON
+DB_STORE_EMBEDDINGS = os.getenv("WITNESS_DB_EMBEDDINGS", "0") not in ("0", "false", "no")
+
+_INSERTS = {"sqlite": sqlite.insert, "postgresql": postgresql.insert}
+
+
+def _edge_key(source: str, target: str) -> Tuple[str, str]:
+    # The graph is undirected; one row per pair whichever way round it was linked
+    return (source, target) if source <= target else (target, source)
+
+
+class _Batch:
+    def __init__(self):
+        self.memes: Dict[str, Dict] = {}
+        self.meme_updates: Dict[str, Dict] = {}
+        self.nodes: Dict[str, Dict] = {}
+        self.node_updates: Dict[str, Dict] = {}
+        self.edges: Dict[Tuple[str, str], Dict] = {}
+        self.edge_replacements: List[Dict] = []
+        self.removed: Set[str] = set()
+
+    def __len__(self) -> int:
+        return (
+            len(self.memes) + len(self.meme_updates) + len(self.nodes) + len(self.node_updates)
+            + len(self.edges) + sum(len(r["rows"]) for r in self.edge_replacements) + len(self.removed)
+        )
+
+
+class DatabasePersister:
+    """
+    Write-behind copy of memes, loom nodes and loom edges in the SQL database. Graph
+    mutations and meme events only touch in-memory buffers on the event loop, where
+    repeated changes to the same row collapse into one; every `interval` seconds (or as
+    soon as `batch_size` rows are waiting) the buffers are swapped out and written in one
+    transaction of multi-row upserts on a dedicated thread. A failed write is put back
+    in front of newer changes and retried with jittered backoff; after `max_retries`
+    failures in a row, or once `max_pending` rows are waiting, rows are dropped (and
+    counted) rather than held forever. The graph checkpoints stay the source of truth.
+    """
+
+    def __init__(
+        self,
+        graph: GraphService,
+        interval: float = DB_FLUSH_INTERVAL_SECONDS,
+        batch_size: int = DB_BATCH_SIZE,
+        store_embeddings: bool = DB_STORE_EMBEDDINGS,
+        enabled: bool = DB_PERSIST_ENABLED,
+        max_pending: int = DB_MAX_PENDING_ROWS,
+        max_retries: int = DB_MAX_RETRIES
+    ):
+        self.graph = graph
+        self.interval = interval
+        self.batch_size = max(1, batch_size)
+        self.store_embeddings = store_embeddings
+        self.enabled = enabled
+        self.max_pending = max(self.batch_size, max_pending)
+        self.max_retries = max_retries
+        self.engine = None
+        self._insert = None
+        self._statements: Dict[Tuple, object] = {}
+        self._pending = _Batch()
+        self._wake: Optional[asyncio.Event] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._started = False
+        self.flushes = 0
+        self.rows_written = 0
+        self.flush_errors = 0
+        self.consecutive_failures = 0
+        self.rows_dropped = 0
+        self.last_flush_ms = 0.0
+        self.flush_ms = 0.0
+        self.buffer_ms = 0.0
+        self.buffered = 0
+
+    async def start(self):
+        from .meme_processor import meme_processor
+
+        if not self.enabled or self._started:
+            return
+        try:
+            self.engine = get_sync_engine()
+        except Exception as e:
+            # e.g. no blocking driver installed alongside the async one
+            system_monitor.log("DB-PERSIST", "WARN", f"No sync engine ({e}); persistence off")
+            self.enabled = False
+            return
+        self._insert = _INSERTS.get(self.engine.dialect.name)
+        if self._insert is None:
+            system_monitor.log("DB-PERSIST", "WARN", f"No upsert support for {self.engine.dialect.name}; persistence off")
+            self.enabled = False
+            return
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="db-persist")
+        self._wake = asyncio.Event()
+        try:
+            await asyncio.get_event_loop().run_in_executor(self._executor, self._create_schema)
+        except Exception as e:
+            system_monitor.log("DB-PERSIST", "WARN", f"Schema setup failed ({e}); persistence off")
+            self._executor.shutdown(wait=False)
+            self.enabled = False
+            return
+        self.graph.add_listener(self._on_mutation)
+        meme_processor.subscribe(self._on_meme)
+        self._started = True
+        system_monitor.log("DB-PERSIST", "INFO", f"Write-behind persistence to {self.engine.url.render_as_string()}")
+
+    def _create_schema(self):
+        Base.metadata.create_all(self.engine)
+        # create_all skips indexes of tables that already exist, and every upsert needs these
+        for model in (MemeEvent, LoomNode, LoomEdge):
+            for index in model.__table__.indexes:
+                index.create(self.engine, checkfirst=True)
+
+    # --- buffering (event loop, never blocks) -----------------------------------------
+
+    def _on_mutation(self, version: int, op: str, payload: Dict):
+        start = time.perf_counter()
+        pending = self._pending
+        if op == "add_node":
+            pending.removed.discard(payload["id"])
+            row = {
+                "id": payload["id"],
+                "x": payload["x"],
+                "y": payload["y"],
+                "label": payload["label"],
+                "cluster": payload["cluster"]
+            }
+            if self.store_embeddings:
+                row["embedding"] = payload["embedding"]
+            pending.nodes[payload["id"]] = row
+        elif op == "update_node" or op == "move_nodes":
+            changes = (
+                {payload["id"]: {k: payload[k] for k in ("label", "cluster") if k in payload}}
+                if op == "update_node"
+                else {node_id: {"x": x, "y": y} for node_id, (x, y) in payload["positions"].items()}
+            )
+            for node_id, values in changes.items():
+                if not values:
+                    continue
+                row = pending.nodes.get(node_id)
+                if row is not None:
+                    row.update(values)
+                else:
+                    pending.node_updates.setdefault(node_id, {}).update(values)
+        elif op == "add_edge":
+            source_id, target_id = _edge_key(payload["source"], payload["target"])
+            pending.edges[(source_id, target_id)] = {
+                "source_id": source_id,
+                "target_id": target_id,
+                "weight": payload["weight"],
+                "edge_type": payload["edge_type"]
+            }
+        elif op == "replace_edges":
+            scope = set(payload["scope"])
+            edge_type = payload["edge_type"]
+            for key in [k for k, row in pending.edges.items() if k[0] in scope and k[1] in scope and row["edge_type"] == edge_type]:
+                del pending.edges[key]
+            rows = {}
+            for source, target, weight in zip(payload["source"], payload["target"], payload["weight"]):
+                # The graph skips pairs whose nodes are gone; so must the table
+                if not self.graph.graph.has_edge(source, target):
+                    continue
+                source_id, target_id = _edge_key(source, target)
+                rows[(source_id, target_id)] = {"source_id": source_id, "target_id": target_id, "weight": weight, "edge_type": edge_type}
+            pending.edge_replacements.append({"scope": scope, "edge_type": edge_type, "rows": rows})
+        elif op == "remove_nodes":
+            ids = set(payload["ids"])
+            pending.removed |= ids
+            for node_id in ids:
+                pending.nodes.pop(node_id, None)
+                pending.node_updates.pop(node_id, None)
+            for edges in [pending.edges] + [r["rows"] for r in pending.edge_replacements]:
+                for key in [k for k in edges if k[0] in ids or k[1] in ids]:
+                    del edges[key]
+        else:
+            return
+        self._buffered(start)
+
+    def _on_meme(self, meme_event: Dict, kind: str = "meme"):
+        start = time.perf_counter()
+        pending = self._pending
+        if kind == "meme":
+            timestamp = meme_event.get("timestamp")
+            row = {
+                "id": meme_event["id"],
+                "source": meme_event["source"],
+                "content": meme_event.get("full_text") or meme_event["content"],
+                "timestamp": datetime.fromisoformat(timestamp.rstrip("Z")) if timestamp else datetime.utcnow(),
+                "virality": meme_event.get("virality", 0.0),
+                "tags": meme_event.get("tags") or [],
+                "processed": False
+            }
+            if self.store_embeddings:
+                row["embedding"] = meme_event.get("embedding")
+            pending.memes[meme_event["id"]] = row
+        elif kind == "meme_update" and meme_event.get("enrichment") == "done":
+            values = {"virality": meme_event["virality"], "tags": meme_event["tags"], "processed": True}
+            row = pending.memes.get(meme_event["id"])
+            if row is not None:
+                row.update(values)
+            else:
+                pending.meme_updates[meme_event["id"]] = values
+        else:
+            return
+        self._buffered(start)
+
+    def _buffered(self, start: float):
+        self.buffered += 1
+        pending = len(self._pending)
+        if pending > self.max_pending:
+            self.rows_dropped += pending
+            self._pending = _Batch()
+            system_monitor.log("DB-PERSIST", "WARN", f"Dropped {pending} buffered rows: over WITNESS_DB_MAX_PENDING")
+        elif self._wake is not None and pending >= self.batch_size:
+            self._wake.set()
+        self.buffer_ms += (time.perf_counter() - start) * 1000
+
+    # --- flushing (worker thread) -----------------------------------------------------
+
+    async def run(self):
+        while True:
+            if self.consecutive_failures:
+                # Backing off: a full buffer must not hammer a failing database
+                await asyncio.sleep(backoff_delay(self.consecutive_failures, self.interval, DB_RETRY_MAX_SECONDS))
+            else:
+                try:
+                    await asyncio.wait_for(self._wake.wait(), self.interval)
+                except asyncio.TimeoutError:
+                    pass
+            self._wake.clear()
+            await self.flush()
+
+    async def flush(self) -> int:
+        if not self._started or not len(self._pending):
+            return 0
+        batch, self._pending = self._pending, _Batch()
+        start = time.perf_counter()
+        try:
+            rows = await asyncio.get_event_loop().run_in_executor(self._executor, self._write, batch)
+        except Exception as e:
+            self.flush_errors += 1
+            self.consecutive_failures += 1
+            rows = len(batch)
+            if self.consecutive_failures > self.max_retries or rows + len(self._pending) > self.max_pending:
+                self.rows_dropped += rows
+                system_monitor.log(
+                    "DB-PERSIST", "WARN",
+                    f"Flush failed {self.consecutive_failures} times in a row, dropped {rows} rows: {e}"
+                )
+            else:
+                self._requeue(batch)
+                system_monitor.log("DB-PERSIST", "WARN", f"Flush failed, will retry: {e}")
+            return 0
+        self.consecutive_failures = 0
+        self.last_flush_ms = (time.perf_counter() - start) * 1000
+        self.flush_ms += self.last_flush_ms
+        self.flushes += 1
+        self.rows_written += rows
+        return rows
+
+    def _requeue(self, batch: _Batch):
+        # The failed batch is older than anything buffered since, so newer values win
+        newer = self._pending
+        for name in ("memes", "nodes", "edges"):
+            setattr(batch, name, {**getattr(batch, name), **getattr(newer, name)})
+        for name in ("meme_updates", "node_updates"):
+            merged = getattr(batch, name)
+            for key, values in getattr(newer, name).items():
+                merged.setdefault(key, {}).update(values)
+        for node_id in newer.nodes:
+            batch.removed.discard(node_id)
+        batch.removed |= newer.removed
+        batch.edge_replacements += newer.edge_replacements
+        self._pending = batch
+
+    def _upsert(self, conn, model, rows: List[Dict], keys: Tuple[str, ...]) -> int:
+        # One cached statement run as an executemany: the drivers batch it (sqlite3 in C,
+        # psycopg2 as multi-row VALUES pages) without recompiling a statement per chunk
+        columns = tuple(rows[0])
+        stmt = self._statements.get((model, columns))
+        if stmt is None:
+            stmt = self._insert(model.__table__)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=list(keys),
+                set_={name: stmt.excluded[name] for name in columns if name not in keys}
+            )
+            self._statements[(model, columns)] = stmt
+        for start in range(0, len(rows), self.batch_size):
+            conn.execute(stmt, rows[start:start + self.batch_size])
+        return len(rows)
+
+    def _write(self, batch: _Batch) -> int:
+        written = 0
+        with self.engine.begin() as conn:
+            if batch.removed:
+                ids = list(batch.removed)
+                for start in range(0, len(ids), self.batch_size):
+                    chunk = ids[start:start + self.batch_size]
+                    conn.execute(delete(LoomEdge).where(LoomEdge.source_id.in_(chunk) | LoomEdge.target_id.in_(chunk)))
+                    conn.execute(delete(LoomNode).where(LoomNode.id.in_(chunk)))
+                written += len(ids)
+            if batch.nodes:
+                written += self._upsert(conn, LoomNode, list(batch.nodes.values()), ("id",))
+            for replacement in batch.edge_replacements:
+                written += self._replace_edges(conn, replacement)
+            if batch.edges:
+                written += self._upsert(conn, LoomEdge, list(batch.edges.values()), ("source_id", "target_id"))
+            if batch.node_updates:
+                conn.execute(
+                    update(LoomNode).where(LoomNode.id == bindparam("b_id")).values(
+                        label=func.coalesce(bindparam("b_label"), LoomNode.label),
+                        cluster=func.coalesce(bindparam("b_cluster"), LoomNode.cluster),
+                        x=func.coalesce(bindparam("b_x"), LoomNode.x),
+                        y=func.coalesce(bindparam("b_y"), LoomNode.y)
+                    ),
+                    [
+                        {"b_id": node_id, **{f"b_{name}": values.get(name) for name in ("label", "cluster", "x", "y")}}
+                        for node_id, values in batch.node_updates.items()
+                    ]
+                )
+                written += len(batch.node_updates)
+            if batch.memes:
+                written += self._upsert(conn, MemeEvent, list(batch.memes.values()), ("id",))
+            if batch.meme_updates:
+                conn.execute(
+                    update(MemeEvent).where(MemeEvent.id == bindparam("b_id")).values(
+                        virality=bindparam("b_virality"), tags=bindparam("b_tags"), processed=bindparam("b_processed")
+                    ),
+                    [
+                        {"b_id": meme_id, "b_virality": values["virality"], "b_tags": values["tags"], "b_processed": values["processed"]}
+                        for meme_id, values in batch.meme_updates.items()
+                    ]
+                )
+                written += len(batch.meme_updates)
+        return written
+
+    def _replace_edges(self, conn, replacement: Dict) -> int:
+        # Scope ids go through a temporary table: the delete needs both ends in scope
+        conn.execute(text("CREATE TEMPORARY TABLE IF NOT EXISTS persist_scope (id VARCHAR PRIMARY KEY)"))
+        conn.execute(text("DELETE FROM persist_scope"))
+        scope = [{"id": node_id} for node_id in replacement["scope"]]
+        if scope:
+            conn.execute(text("INSERT INTO persist_scope (id) VALUES (:id)"), scope)
+        members = select(column("id")).select_from(table("persist_scope"))
+        conn.execute(
+            delete(LoomEdge).where(
+                LoomEdge.edge_type == replacement["edge_type"],
+                LoomEdge.source_id.in_(members),
+                LoomEdge.target_id.in_(members)
+            )
+        )
+        rows = list(replacement["rows"].values())
+        return self._upsert(conn, LoomEdge, rows, ("source_id", "target_id")) if rows else 0
+
+    async def close(self):
+        from .meme_processor import meme_processor
+
+        if not self._started:
+            return
+        self.graph.remove_listener(self._on_mutation)
+        meme_processor.unsubscribe(self._on_meme)
+        await self.flush()
+        self._started = False
+        self._executor.shutdown(wait=True)
+        self.engine.dispose()
+
+    def get_stats(self) -> Dict:
+        return {
+            "enabled": self.enabled,
+            "pending_rows": len(self._pending),
+            "flushes": self.flushes,
+            "rows_written": self.rows_written,
+            "flush_errors": self.flush_errors,
+            "consecutive_failures": self.consecutive_failures,
+            "rows_dropped": self.rows_dropped,
+            "last_flush_ms": round(self.last_flush_ms, 2),
+            "avg_flush_ms": round(self.flush_ms / self.flushes, 2) if self.flushes else 0.0,
+            # What ingest pays: buffering on the event loop, per mutation or event
+            "avg_buffer_us": round(1000 * self.buffer_ms / self.buffered, 2) if self.buffered else 0.0
+        }
+
+
+db_persister = DatabasePersister(graph_service)
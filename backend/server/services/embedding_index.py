@@ -0,0 +1,110 @@
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+
+class EmbeddingIndex:
+    """
+    L2-normalised node embeddings plus the columns search filters on (cluster and source
+    codes, created_at), so a query is one matrix-vector product instead of a rebuild from
+    per-node lists. Kept in step with graph mutations; built from the graph on first use
+    and again after a restore. Appends grow the arrays geometrically, removals only clear
+    the alive flag until dead rows are the majority. Rows must share one dimension (the
+    first seen); others are left out, as a query of that size could not score them.
+    """
+
+    def __init__(self, initial_capacity: int = 1024):
+        self.initial_capacity = initial_capacity
+        self.reset()
+
+    def reset(self):
+        self.built = False
+        self.dim: Optional[int] = None
+        self.ids: List[Optional[str]] = []
+        self.rows: Dict[str, int] = {}
+        self.codes: Dict[str, Dict[str, int]] = {"cluster": {}, "source": {}}
+        self._matrix = np.zeros((0, 0), dtype=np.float32)
+        self._alive = np.zeros(0, dtype=np.bool_)
+        self._cluster = np.zeros(0, dtype=np.int32)
+        self._source = np.zeros(0, dtype=np.int32)
+        self._created = np.zeros(0, dtype=np.float64)
+        self._dead = 0
+
+    def build(self, nodes: Iterable[Tuple[str, Dict]]):
+        self.reset()
+        self.built = True
+        for node_id, data in nodes:
+            self.add(node_id, data.get("embedding"), data.get("cluster", "default"),
+                     data.get("source", "unknown"), data.get("created_at", 0))
+
+    def code(self, name: str, value: str) -> int:
+        codes = self.codes[name]
+        return codes.setdefault(value, len(codes))
+
+    def _grow(self, capacity: int):
+        def grow(array: np.ndarray) -> np.ndarray:
+            grown = np.zeros((capacity,) + array.shape[1:], dtype=array.dtype)
+            grown[:len(array)] = array
+            return grown
+        self._matrix, self._alive = grow(self._matrix), grow(self._alive)
+        self._cluster, self._source, self._created = grow(self._cluster), grow(self._source), grow(self._created)
+
+    def add(self, node_id: str, embedding, cluster: str, source: str, created_at: float):
+        if not self.built or embedding is None or len(embedding) == 0:
+            return
+        if self.dim is None:
+            self.dim = len(embedding)
+            self._matrix = np.zeros((len(self._alive), self.dim), dtype=np.float32)
+        if len(embedding) != self.dim:
+            return
+        if node_id in self.rows:
+            self.remove([node_id])
+        row = len(self.ids)
+        if row >= len(self._alive):
+            self._grow(max(self.initial_capacity, 2 * row))
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = float(np.linalg.norm(vector))
+        self._matrix[row] = vector / norm if norm > 0 else 0.0
+        self._alive[row] = True
+        self._cluster[row] = self.code("cluster", cluster)
+        self._source[row] = self.code("source", source)
+        self._created[row] = created_at or 0
+        self.ids.append(node_id)
+        self.rows[node_id] = row
+
+    def remove(self, node_ids: Iterable[str]):
+        for node_id in node_ids:
+            row = self.rows.pop(node_id, None)
+            if row is not None:
+                self._alive[row] = False
+                self.ids[row] = None
+                self._dead += 1
+        if self._dead > max(self.initial_capacity, len(self.rows)):
+            self._compact()
+
+    def set_cluster(self, node_id: str, cluster: str):
+        row = self.rows.get(node_id)
+        if row is not None:
+            self._cluster[row] = self.code("cluster", cluster)
+
+    def _compact(self):
+        keep = np.nonzero(self._alive[:len(self.ids)])[0]
+        capacity = max(self.initial_capacity, 2 * len(keep))
+        arrays = {}
+        for name in ("_matrix", "_alive", "_cluster", "_source", "_created"):
+            array = getattr(self, name)
+            compacted = np.zeros((capacity,) + array.shape[1:], dtype=array.dtype)
+            compacted[:len(keep)] = array[keep]
+            arrays[name] = compacted
+        self.__dict__.update(arrays)
+        self.ids = [self.ids[row] for row in keep.tolist()]
+        self.rows = {node_id: row for row, node_id in enumerate(self.ids)}
+        self._dead = 0
+
+    def columns(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """(live rows, normalised matrix, cluster codes, source codes, created_at), as views."""
+        n = len(self.ids)
+        return (
+            np.nonzero(self._alive[:n])[0], self._matrix[:n],
+            self._cluster[:n], self._source[:n], self._created[:n]
+        )
@@ -45,7 +45,27 @@ class EmbeddingService:
         
         # TF-IDF fallback (works without PyTorch)
         return self._generate_tfidf_embedding(text)
-    
+
+    def generate_embeddings(self, texts: List[str], batch_size: int = 64) -> List[List[float]]:
+        """Embeds many texts in one model call, which is far cheaper per item than generate_embedding."""
+        embeddings = [[0.0] * self.embedding_dim for _ in texts]
+        filled = [i for i, text in enumerate(texts) if text and text.strip()]
+        if not filled:
+            return embeddings
+
+        if HAVE_SENTENCE_TRANSFORMERS and self.model:
+            try:
+                encoded = self.model.encode([texts[i] for i in filled], batch_size=batch_size)
+                for i, vector in zip(filled, encoded):
+                    embeddings[i] = vector.tolist()
+                return embeddings
+            except Exception as e:
+                print(f"Error generating batch embeddings with model: {e}")
+
+        for i in filled:
+            embeddings[i] = self._generate_tfidf_embedding(texts[i])
+        return embeddings
+
     def _generate_tfidf_embedding(self, text: str) -> List[float]:
         """Lightweight TF-IDF based embedding fallback"""
         tokens = self._tokenize(text)
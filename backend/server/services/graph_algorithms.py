@@ -0,0 +1,211 @@
+"""
+Whole-graph algorithms over a plain edge-list snapshot.
+
+Everything here takes and returns NumPy arrays and builtins only, so it can run in a
+worker process without importing the rest of the service layer.
+"""
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .shared_matrix import open_generation
+
+
+def _undirected(source: np.ndarray, target: np.ndarray, weight: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Both directions of every edge (self-loops once)."""
+    distinct = source != target
+    return (
+        np.concatenate([source, target[distinct]]),
+        np.concatenate([target, source[distinct]]),
+        np.concatenate([weight, weight[distinct]]),
+    )
+
+
+def degree_centrality(n: int, source: np.ndarray, target: np.ndarray) -> np.ndarray:
+    if n <= 1:
+        return np.ones(n, dtype=np.float64)
+    degree = np.bincount(source, minlength=n) + np.bincount(target, minlength=n)
+    return degree / (n - 1)
+
+
+def pagerank(
+    ids: Sequence[str],
+    source: np.ndarray,
+    target: np.ndarray,
+    weight: np.ndarray,
+    prior_ids: Optional[Sequence[str]] = None,
+    prior_scores: Optional[np.ndarray] = None,
+    damping: float = 0.85,
+    tol: float = 1e-6,
+    max_iter: int = 100
+) -> Tuple[np.ndarray, int]:
+    """
+    Weighted PageRank by power iteration. When a previous result is given, iteration starts
+    from it (new nodes get the uniform share), which usually converges in a few steps.
+    """
+    n = len(ids)
+    if n == 0:
+        return np.zeros(0), 0
+
+    src, dst, w = _undirected(source, target, weight.astype(np.float64))
+    strength = np.bincount(src, weights=w, minlength=n)
+    dangling = strength == 0
+    inv_strength = np.divide(1.0, strength, out=np.zeros(n), where=~dangling)
+
+    rank = np.full(n, 1.0 / n)
+    if prior_ids is not None and prior_scores is not None and len(prior_ids):
+        previous = dict(zip(prior_ids, prior_scores.tolist()))
+        rank = np.fromiter((previous.get(node_id, 1.0 / n) for node_id in ids), dtype=np.float64, count=n)
+        rank /= rank.sum()
+
+    iterations = 0
+    for iterations in range(1, max_iter + 1):
+        spread = np.bincount(dst, weights=w * (rank * inv_strength)[src], minlength=n)
+        updated = damping * (spread + rank[dangling].sum() / n) + (1.0 - damping) / n
+        error = np.abs(updated - rank).sum()
+        rank = updated
+        if error < n * tol:
+            break
+    return rank, iterations
+
+
+def label_propagation(
+    n: int,
+    source: np.ndarray,
+    target: np.ndarray,
+    weight: np.ndarray,
+    max_iter: int = 30,
+    seed: int = 0
+) -> Tuple[np.ndarray, int]:
+    """
+    Weighted label propagation, vectorised over edges. Each round a random half of the
+    nodes adopts the label with the largest incident weight, which avoids the two-colour
+    oscillation of fully synchronous updates on bipartite structure.
+    """
+    labels = np.arange(n, dtype=np.int64)
+    if n == 0 or len(source) == 0:
+        return labels, 0
+    rng = np.random.default_rng(seed)
+    src, dst, w = _undirected(source, target, weight.astype(np.float64))
+
+    iterations = 0
+    for iterations in range(1, max_iter + 1):
+        # Sum weight per (node, neighbour label), then keep the heaviest label per node
+        keys = src * n + labels[dst]
+        unique, inverse = np.unique(keys, return_inverse=True)
+        totals = np.bincount(inverse, weights=w)
+        # Tiny random jitter breaks ties without favouring low label ids
+        totals += rng.random(len(totals)) * 1e-9
+        nodes = unique // n
+        order = np.lexsort((-totals, nodes))
+        first = np.ones(len(order), dtype=np.bool_)
+        first[1:] = nodes[order][1:] != nodes[order][:-1]
+        best_nodes = nodes[order][first]
+        best_labels = (unique % n)[order][first]
+
+        proposal = labels.copy()
+        proposal[best_nodes] = best_labels
+        update = rng.random(n) < 0.5
+        changed = update & (proposal != labels)
+        labels = np.where(update, proposal, labels)
+        if changed.sum() <= max(1, n // 1000):
+            break
+
+    # Renumber communities 0..k-1, largest first
+    _, dense, sizes = np.unique(labels, return_inverse=True, return_counts=True)
+    rank = np.empty(len(sizes), dtype=np.int64)
+    rank[np.argsort(-sizes, kind="stable")] = np.arange(len(sizes))
+    return rank[dense], iterations
+
+
+def modularity(n: int, source: np.ndarray, target: np.ndarray, weight: np.ndarray, labels: np.ndarray) -> float:
+    total = float(weight.sum())
+    if total == 0:
+        return 0.0
+    strength = np.bincount(source, weights=weight, minlength=n) + np.bincount(target, weights=weight, minlength=n)
+    k = int(labels.max()) + 1 if n else 0
+    inside = np.bincount(labels[source], weights=np.where(labels[source] == labels[target], weight, 0.0), minlength=k)
+    community_strength = np.bincount(labels, weights=strength, minlength=k)
+    return float((inside / total - (community_strength / (2 * total)) ** 2).sum())
+
+
+def run_analytics(kind: str, snapshot: Dict, prior: Optional[Dict] = None) -> Dict:
+    """Worker-process entry point: computes one analytics kind over a topology snapshot."""
+    ids: List[str] = snapshot["ids"]
+    source = snapshot["source"]
+    target = snapshot["target"]
+    weight = snapshot["weight"]
+    n = len(ids)
+
+    if kind == "centrality":
+        return {"scores": degree_centrality(n, source, target)}
+    if kind == "pagerank":
+        scores, iterations = pagerank(
+            ids, source, target, weight,
+            prior_ids=prior["ids"] if prior else None,
+            prior_scores=prior["scores"] if prior else None
+        )
+        return {"scores": scores, "iterations": iterations, "warm_start": prior is not None}
+    if kind == "communities":
+        labels, iterations = label_propagation(n, source, target, weight)
+        return {
+            "labels": labels,
+            "iterations": iterations,
+            "modularity": modularity(n, source, target, weight, labels)
+        }
+    raise ValueError(f"Unknown analytics kind: {kind}")
+
+
+def similarity_topk_block(
+    matrix,
+    start: int,
+    end: int,
+    k: int,
+    threshold: float,
+    column_block: int = 8192
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Top-k most similar rows for rows [start, end) of an L2-normalised matrix. `matrix` may
+    also be the path of one saved with np.save, or a shared-matrix handle dict
+    (directory/generation/rows/dim); both are memory-mapped so worker processes share
+    the pages. Deleted shared rows are skipped.
+    Columns are scanned in blocks, so memory is O(block rows * column_block).
+    Returns (source, target, score) arrays, with pairs below `threshold` dropped.
+    """
+    alive = None
+    if isinstance(matrix, dict):
+        matrix, alive = open_generation(matrix["directory"], matrix["generation"], matrix["rows"], matrix["dim"])
+    elif isinstance(matrix, str):
+        matrix = np.load(matrix, mmap_mode="r")
+    n = len(matrix)
+    block = np.asarray(matrix[start:end], dtype=np.float32)
+    rows = end - start
+    k = min(k, max(n - 1, 0))
+    if rows <= 0 or k == 0:
+        empty = np.zeros(0, dtype=np.int64)
+        return empty, empty, np.zeros(0, dtype=np.float32)
+
+    best_scores = np.full((rows, k), -np.inf, dtype=np.float32)
+    best_index = np.full((rows, k), -1, dtype=np.int64)
+    local = np.arange(rows)
+    for c0 in range(0, n, column_block):
+        c1 = min(n, c0 + column_block)
+        scores = block @ np.asarray(matrix[c0:c1], dtype=np.float32).T
+        # A row is never its own neighbour
+        own = local + start
+        inside = (own >= c0) & (own < c1)
+        scores[local[inside], own[inside] - c0] = -np.inf
+        if alive is not None:
+            scores[:, alive[c0:c1] == 0] = -np.inf
+
+        merged_scores = np.concatenate([best_scores, scores], axis=1)
+        merged_index = np.concatenate([best_index, np.broadcast_to(np.arange(c0, c1), (rows, c1 - c0))], axis=1)
+        top = np.argpartition(-merged_scores, k - 1, axis=1)[:, :k]
+        best_scores = np.take_along_axis(merged_scores, top, axis=1)
+        best_index = np.take_along_axis(merged_index, top, axis=1)
+
+    keep = (best_scores >= threshold) & (best_index >= 0)
+    if alive is not None:
+        keep &= (alive[start:end] != 0)[:, None]
+    source = np.broadcast_to((local + start)[:, None], (rows, k))[keep]
+    return source, best_index[keep], best_scores[keep]
@@ -0,0 +1,190 @@
+"""
+Bulk graph export as a stream of columnar NumPy chunks.
+
+The export is an uncompressed tar stream (written incrementally, readable with the
+standard library) holding:
+
+    schema.json              format, column types and embedding width
+    nodes/000000.npz ...     one chunk of nodes each, in seq order
+    edges/000000.npz ...     one chunk of edges each, in edge-id order
+    manifest.json            chunk and row counts, written last
+
+Inside a chunk, numeric columns are plain arrays. String columns are stored Arrow-style
+as "<name>.offsets" (int64, n + 1) plus "<name>.data" (utf-8 bytes), and categorical
+columns as "<name>.codes" (int32) into a "<name>.dictionary" string column. Edges refer
+to nodes by seq. iter_export() reads a file back into dicts of arrays and string lists.
+"""
+from typing import Dict, Iterator, List, Optional, Tuple
+from datetime import datetime
+import asyncio
+import io
+import json
+import os
+import tarfile
+import time
+
+import numpy as np
+
+from .graph_store import EDGE_CATEGORICAL_COLUMNS, EDGE_NUMERIC_COLUMNS, NODE_CATEGORICAL_COLUMNS, NODE_NUMERIC_COLUMNS, NODE_STRING_COLUMNS
+
+EXPORT_CHUNK_ROWS = int(os.getenv("WITNESS_EXPORT_CHUNK_ROWS", "16384"))
+EXPORT_FORMAT = "witness-columnar"
+EXPORT_FORMAT_VERSION = 1
+
+STRING_COLUMNS = ("id",) + NODE_STRING_COLUMNS
+CATEGORICAL_COLUMNS = NODE_CATEGORICAL_COLUMNS + EDGE_CATEGORICAL_COLUMNS
+
+
+def _strings(prefix: str, values: List[str]) -> Dict[str, np.ndarray]:
+    encoded = [value.encode("utf-8") for value in values]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(value) for value in encoded], out=offsets[1:])
+    return {f"{prefix}.offsets": offsets, f"{prefix}.data": np.frombuffer(b"".join(encoded), dtype=np.uint8)}
+
+
+def _decode_strings(arrays, prefix: str) -> List[str]:
+    offsets = arrays[f"{prefix}.offsets"].tolist()
+    data = arrays[f"{prefix}.data"].tobytes()
+    return [data[offsets[i]:offsets[i + 1]].decode("utf-8") for i in range(len(offsets) - 1)]
+
+
+def encode_chunk(columns: Dict, compress: bool = True) -> bytes:
+    arrays = {}
+    for name, values in columns.items():
+        # Arrays are taken as-is: edge "source" is a seq column, node "source" a category
+        if isinstance(values, np.ndarray):
+            arrays[name] = values
+        elif name in CATEGORICAL_COLUMNS:
+            dictionary: Dict[str, int] = {}
+            codes = np.fromiter((dictionary.setdefault(value, len(dictionary)) for value in values), dtype=np.int32, count=len(values))
+            arrays[f"{name}.codes"] = codes
+            arrays.update(_strings(f"{name}.dictionary", list(dictionary)))
+        elif name in STRING_COLUMNS:
+            arrays.update(_strings(name, values))
+        else:
+            arrays[name] = np.asarray(values)
+    buffer = io.BytesIO()
+    (np.savez_compressed if compress else np.savez)(buffer, **arrays)
+    return buffer.getvalue()
+
+
+def decode_chunk(data: bytes) -> Dict:
+    with np.load(io.BytesIO(data)) as arrays:
+        names = set(arrays.files)
+        columns = {}
+        for name in names:
+            if name.endswith(".codes"):
+                column = name[:-len(".codes")]
+                dictionary = _decode_strings(arrays, f"{column}.dictionary")
+                columns[column] = [dictionary[code] for code in arrays[name].tolist()]
+            elif name.endswith(".offsets") and ".dictionary." not in name:
+                column = name[:-len(".offsets")]
+                columns[column] = _decode_strings(arrays, column)
+            elif not name.endswith(".data") and ".dictionary." not in name:
+                columns[name] = arrays[name]
+        return columns
+
+
+def tar_member(name: str, data: bytes) -> bytes:
+    info = tarfile.TarInfo(name)
+    info.size = len(data)
+    info.mtime = int(time.time())
+    padding = -len(data) % tarfile.BLOCKSIZE
+    return info.tobuf(format=tarfile.PAX_FORMAT) + data + b"\0" * padding
+
+
+def _json_member(name: str, value: Dict) -> bytes:
+    return tar_member(name, json.dumps(value, indent=2).encode("utf-8"))
+
+
+def schema(embedding_dim: Optional[int]) -> Dict:
+    return {
+        "format": EXPORT_FORMAT,
+        "format_version": EXPORT_FORMAT_VERSION,
+        "created_at": datetime.utcnow().isoformat() + "Z",
+        "nodes": {
+            **{name: np.dtype(dtype).name for name, dtype in NODE_NUMERIC_COLUMNS.items()},
+            **{name: "string" for name in STRING_COLUMNS},
+            **{name: "dictionary<string>" for name in NODE_CATEGORICAL_COLUMNS},
+            **({"embedding": f"float32[{embedding_dim}]", "has_embedding": "bool"} if embedding_dim is not None else {}),
+        },
+        "edges": {
+            "source": "int64 (node seq)",
+            "target": "int64 (node seq)",
+            **{name: np.dtype(dtype).name for name, dtype in EDGE_NUMERIC_COLUMNS.items()},
+            **{name: "dictionary<string>" for name in EDGE_CATEGORICAL_COLUMNS},
+        },
+    }
+
+
+async def export_stream(
+    graph,
+    embeddings: bool = True,
+    compress: bool = True,
+    chunk_rows: int = EXPORT_CHUNK_ROWS
+):
+    """
+    Async generator of tar bytes. `graph` needs awaitable node_chunk / edge_chunk (e.g.
+    owner_client.graph, which extracts each chunk on a thread). Chunks are encoded in a
+    thread too, so at most one chunk is in memory and the event loop never walks or
+    serialises the whole graph.
+    Like cursor pagination, nodes present for the whole export appear exactly once.
+    """
+    loop = asyncio.get_event_loop()
+    counts = {"nodes": 0, "edges": 0, "node_chunks": 0, "edge_chunks": 0}
+
+    cursor = 0
+    while cursor is not None:
+        chunk, cursor = await graph.node_chunk(cursor, chunk_rows, embeddings)
+        if counts["node_chunks"] == 0:
+            dim = chunk["embedding"].shape[1] if embeddings else None
+            yield _json_member("schema.json", schema(dim))
+        if len(chunk["id"]) == 0:
+            break
+        data = await loop.run_in_executor(None, encode_chunk, chunk, compress)
+        yield tar_member(f"nodes/{counts['node_chunks']:06d}.npz", data)
+        counts["nodes"] += len(chunk["id"])
+        counts["node_chunks"] += 1
+
+    cursor = 0
+    while cursor is not None:
+        chunk, cursor = await graph.edge_chunk(cursor, chunk_rows)
+        if len(chunk["source"]) == 0:
+            break
+        data = await loop.run_in_executor(None, encode_chunk, chunk, compress)
+        yield tar_member(f"edges/{counts['edge_chunks']:06d}.npz", data)
+        counts["edges"] += len(chunk["source"])
+        counts["edge_chunks"] += 1
+
+    yield _json_member("manifest.json", counts)
+    # End-of-archive marker: two empty blocks
+    yield b"\0" * (2 * tarfile.BLOCKSIZE)
+
+
+def iter_export(path_or_file) -> Iterator[Tuple[str, Dict]]:
+    """Yields ("schema" | "nodes" | "edges" | "manifest", contents) from an export, streaming."""
+    if isinstance(path_or_file, str):
+        archive = tarfile.open(path_or_file, mode="r|")
+    else:
+        archive = tarfile.open(fileobj=path_or_file, mode="r|")
+    with archive:
+        for member in archive:
+            data = archive.extractfile(member).read()
+            kind = member.name.split("/")[0].split(".")[0]
+            if member.name.endswith(".json"):
+                yield kind, json.loads(data)
+            else:
+                yield kind, decode_chunk(data)
+
+
+class LocalChunks:
+    """Awaitable node_chunk / edge_chunk over an in-process GraphService (for the CLI)."""
+
+    def __init__(self, graph):
+        self.graph = graph
+
+    async def node_chunk(self, *args):
+        return self.graph.node_chunk(*args)
+
+    async def edge_chunk(self, *args):
+        return self.graph.edge_chunk(*args)
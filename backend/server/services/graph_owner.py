@@ -0,0 +1,330 @@
+from typing import Any, Dict, List, Optional, Tuple
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from multiprocessing import AuthenticationError
+from multiprocessing.managers import BaseManager
+import asyncio
+import functools
+import getpass
+import inspect
+import os
+import secrets
+import tempfile
+import threading
+
+from .system_monitor import system_monitor
+
+# "standalone" keeps everything in this process (the default, single worker).
+# "owner" holds the graph and pipeline and serves them to "worker" processes, which only
+# run HTTP / websocket handlers and forward every graph call to the owner.
+GRAPH_ROLE = os.getenv("WITNESS_GRAPH_ROLE", "standalone")
+# Holds the owner's socket and generated authkey; must be accessible to this user only
+GRAPH_OWNER_DIR = os.getenv(
+    "WITNESS_GRAPH_OWNER_DIR", os.path.join(tempfile.gettempdir(), f"witness-{getpass.getuser()}")
+)
+# host:port, or a filesystem path for a Unix domain socket (the faster option on one box)
+GRAPH_OWNER_ADDRESS = os.getenv("WITNESS_GRAPH_OWNER_ADDRESS", os.path.join(GRAPH_OWNER_DIR, "graph.sock"))
+# Manager connections unpickle what clients send, so the key is all that stands between
+# the port and code execution. Required for host:port; on a Unix socket the owner
+# generates a random one into GRAPH_OWNER_DIR when unset.
+GRAPH_OWNER_AUTHKEY = os.getenv("WITNESS_GRAPH_OWNER_AUTHKEY", "").encode()
+AUTHKEY_FILE = "authkey"
+GRAPH_OWNER_TIMEOUT_SECONDS = float(os.getenv("WITNESS_GRAPH_OWNER_TIMEOUT", "30"))
+GRAPH_OWNER_CONNECTIONS = int(os.getenv("WITNESS_GRAPH_OWNER_CONNECTIONS", "8"))
+EVENT_BUFFER_SIZE = 4096
+
+GRAPH_ROLES = ("standalone", "owner", "worker")
+
+# What workers may call on the owner, by target name
+SHARED_METHODS = {
+    "graph": (
+        "get_graph_snapshot", "get_all_nodes", "node_page", "edge_page",
+        "get_viewport", "ego_graph", "get_node", "node_chunk", "edge_chunk"
+    ),
+    "processor": ("process_raw_content", "process_batch", "submit", "get_job", "get_stats"),
+    "crawler": ("start_crawl", "get_workers"),
+    "monitor": ("get_status", "get_logs", "log"),
+    "search": ("search", "get_stats"),
+    "llm": ("get_stats",),
+    "trending": ("get_trending", "snapshot"),
+    "clusters": ("summary", "get_stats"),
+    "analytics": ("get_result",),
+    "retention": ("get_stats",),
+    "db": ("get_stats",),
+    "relink": ("start", "get_job", "list_jobs"),
+}
+
+
+def parse_address(address: str):
+    if "/" in address or "\\" in address:
+        return address
+    host, _, port = address.rpartition(":")
+    return (host or "127.0.0.1", int(port))
+
+
+def _private_dir(path: str) -> str:
+    os.makedirs(path, mode=0o700, exist_ok=True)
+    info = os.stat(path)
+    if hasattr(os, "getuid") and (info.st_uid != os.getuid() or info.st_mode & 0o077):
+        raise PermissionError(f"{path} must be a directory only this user can access (chmod 700)")
+    return path
+
+
+def _require_authkey(address: str):
+    if not isinstance(parse_address(address), str):
+        raise RuntimeError("WITNESS_GRAPH_OWNER_AUTHKEY must be set when the graph owner listens on host:port")
+
+
+def create_authkey(address: str) -> bytes:
+    """Owner side: the configured key, or a fresh random one written 0600 next to the socket."""
+    if GRAPH_OWNER_AUTHKEY:
+        return GRAPH_OWNER_AUTHKEY
+    _require_authkey(address)
+    directory = _private_dir(os.path.dirname(address))
+    key = secrets.token_hex(32)
+    staging = os.path.join(directory, f".{AUTHKEY_FILE}.{os.getpid()}")
+    fd = os.open(staging, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, "w") as f:
+        f.write(key)
+    os.replace(staging, os.path.join(directory, AUTHKEY_FILE))
+    return key.encode()
+
+
+def read_authkey(address: str) -> bytes:
+    """Worker side: the configured key, or the one the owner generated."""
+    if GRAPH_OWNER_AUTHKEY:
+        return GRAPH_OWNER_AUTHKEY
+    _require_authkey(address)
+    with open(os.path.join(_private_dir(os.path.dirname(address)), AUTHKEY_FILE)) as f:
+        return f.read().strip().encode()
+
+
+def _targets() -> Dict[str, Any]:
+    # Imported lazily: these modules pull in the whole service layer
+    from .analytics_service import analytics_service
+    from .crawler_service import crawler_service
+    from .db_persister import db_persister
+    from .graph_service import graph_service
+    from .llm_service import llm_service
+    from .meme_processor import meme_processor
+    from .relink_service import relink_service
+    from .retention_service import retention_service
+    from .search_service import search_service
+    from .stream_clusterer import stream_clusterer
+    from .trending_service import trending_service
+    return {
+        "graph": graph_service,
+        "processor": meme_processor,
+        "crawler": crawler_service,
+        "monitor": system_monitor,
+        "search": search_service,
+        "llm": llm_service,
+        "trending": trending_service,
+        "clusters": stream_clusterer,
+        "analytics": analytics_service,
+        "retention": retention_service,
+        "db": db_persister,
+        "relink": relink_service,
+    }
+
+
+# Read-only calls heavy enough to stall the loop; they run on a thread and tolerate
+# mutations landing meanwhile
+THREADED_METHODS = {("graph", "node_chunk"), ("graph", "edge_chunk")}
+
+
+def _resolve(target: str, method: str):
+    if method not in SHARED_METHODS.get(target, ()):
+        raise AttributeError(f"{target}.{method} is not shared")
+    return getattr(_targets()[target], method)
+
+
+async def _invoke(target: str, method: str, args: tuple, kwargs: dict):
+    if (target, method) in THREADED_METHODS:
+        function = functools.partial(_resolve(target, method), *args, **kwargs)
+        return await asyncio.get_event_loop().run_in_executor(None, function)
+    result = _resolve(target, method)(*args, **kwargs)
+    if inspect.isawaitable(result):
+        result = await result
+    return result
+
+
+class GraphOwner:
+    """
+    Owner side. A multiprocessing manager server answers worker calls on its own threads;
+    each call is handed to the event loop, so it runs serialised with ingestion exactly as
+    a local call would. Meme events, layout moves and evictions go into a sequenced ring
+    that workers poll to feed their own websocket clients.
+    """
+
+    def __init__(self, address: str = GRAPH_OWNER_ADDRESS, authkey: bytes = GRAPH_OWNER_AUTHKEY):
+        self.address = address
+        # Empty until serve() when the key is generated
+        self.authkey = authkey
+        self.events: deque = deque(maxlen=EVENT_BUFFER_SIZE)
+        self.event_seq = 0
+        self.calls = 0
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._server = None
+
+    def publish(self, kind: str, data: Any):
+        self.event_seq += 1
+        self.events.append((self.event_seq, kind, data))
+
+    def dispatch(self, target: str, method: str, args: tuple = (), kwargs: Optional[dict] = None):
+        """Called on a manager thread; blocks it until the loop has run the call."""
+        self.calls += 1
+        future = asyncio.run_coroutine_threadsafe(_invoke(target, method, args, kwargs or {}), self._loop)
+        return future.result(GRAPH_OWNER_TIMEOUT_SECONDS)
+
+    def events_since(self, seq: Optional[int] = None) -> Tuple[int, List[Tuple[int, str, Any]]]:
+        """(latest seq, events after `seq`). None starts a new reader at the head."""
+        # list() copies the deque atomically with respect to the loop thread appending to it
+        events = list(self.events)
+        if not events:
+            return seq or 0, []
+        latest = events[-1][0]
+        if seq is None:
+            return latest, []
+        # Sequence numbers are contiguous, so the first unseen event is found by offset
+        return latest, events[max(seq + 1 - events[0][0], 0):]
+
+    def ping(self) -> int:
+        return os.getpid()
+
+    def serve(self):
+        from .meme_processor import meme_processor
+
+        self._loop = asyncio.get_event_loop()
+        self.authkey = self.authkey or create_authkey(self.address)
+        if isinstance(parse_address(self.address), str):
+            _private_dir(os.path.dirname(self.address))
+            # A socket file left behind by a crashed owner would make the bind fail
+            if os.path.exists(self.address):
+                os.unlink(self.address)
+        manager = GraphOwnerManager(address=parse_address(self.address), authkey=self.authkey)
+        self._server = manager.get_server()
+        threading.Thread(target=self._server.serve_forever, name="graph-owner", daemon=True).start()
+
+        def on_meme(meme_event: Dict, kind: str = "meme"):
+            self.publish(kind, meme_event)
+
+        meme_processor.subscribe(on_meme)
+        system_monitor.log("GRAPH-OWNER", "SUCCESS", f"Serving shared graph on {self.address}")
+
+    async def run(self, interval: float = 0.5):
+        """Moves layout updates and evictions into the event ring for workers."""
+        from .layout_engine import layout_engine
+        from .retention_service import retention_service
+
+        while True:
+            await asyncio.sleep(interval)
+            moves = layout_engine.drain_moves()
+            if moves:
+                self.publish("positions", moves)
+            removals = retention_service.drain_removals()
+            if removals:
+                self.publish("removals", removals)
+
+    def shutdown(self):
+        if self._server is not None:
+            self._server.stop_event.set()
+            self._server = None
+
+    def get_stats(self) -> Dict:
+        return {"address": self.address, "calls": self.calls, "event_seq": self.event_seq}
+
+
+class GraphOwnerManager(BaseManager):
+    pass
+
+
+graph_owner = GraphOwner()
+
+GraphOwnerManager.register(
+    "owner", callable=lambda: graph_owner, exposed=("dispatch", "events_since", "ping")
+)
+
+
+class _Target:
+    def __init__(self, client: "OwnerClient", name: str):
+        self._client = client
+        self._name = name
+
+    def __getattr__(self, method: str):
+        async def call(*args, **kwargs):
+            return await self._client.call(self._name, method, *args, **kwargs)
+        return call
+
+
+class OwnerClient:
+    """
+    What the API layer talks to. Outside worker mode calls run in-process; in worker mode
+    they are pickled over the manager connection (one per executor thread) to the owner.
+
+        await owner_client.graph.node_page(0, 100)
+    """
+
+    def __init__(self, role: str = GRAPH_ROLE, address: str = GRAPH_OWNER_ADDRESS, authkey: bytes = GRAPH_OWNER_AUTHKEY):
+        if role not in GRAPH_ROLES:
+            raise ValueError(f"Unknown graph role: {role}")
+        self.role = role
+        self.address = address
+        self.authkey = authkey
+        self._proxy = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self.remote_calls = 0
+        for target in SHARED_METHODS:
+            setattr(self, target, _Target(self, target))
+
+    @property
+    def remote(self) -> bool:
+        return self.role == "worker"
+
+    async def connect(self, attempts: int = 30, delay: float = 1.0):
+        """Waits for the owner to come up (workers may start first)."""
+        if not self.remote:
+            return
+        loop = asyncio.get_event_loop()
+        self._executor = ThreadPoolExecutor(GRAPH_OWNER_CONNECTIONS, thread_name_prefix="graph-owner")
+        for attempt in range(1, attempts + 1):
+            try:
+                self._proxy = await loop.run_in_executor(self._executor, self._connect)
+                pid = await loop.run_in_executor(self._executor, self._proxy.ping)
+                system_monitor.log("GRAPH-OWNER", "SUCCESS", f"Connected to graph owner (pid {pid}) at {self.address}")
+                return
+            # A missing or outdated key file just means the owner is not up (again) yet
+            except (OSError, EOFError, AuthenticationError) as e:
+                if attempt == attempts:
+                    raise ConnectionError(f"Graph owner unreachable at {self.address}: {e}")
+                await asyncio.sleep(delay)
+
+    def _connect(self):
+        authkey = self.authkey or read_authkey(self.address)
+        manager = GraphOwnerManager(address=parse_address(self.address), authkey=authkey)
+        manager.connect()
+        return manager.owner()
+
+    async def call(self, target: str, method: str, *args, **kwargs):
+        if not self.remote:
+            return await _invoke(target, method, args, kwargs)
+        if self._proxy is None:
+            raise ConnectionError("Not connected to the graph owner")
+        self.remote_calls += 1
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(self._executor, self._proxy.dispatch, target, method, args, kwargs)
+
+    async def events_since(self, seq: Optional[int]) -> Tuple[int, List[Tuple[int, str, Any]]]:
+        if not self.remote:
+            return graph_owner.events_since(seq)
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(self._executor, self._proxy.events_since, seq)
+
+    def close(self):
+        if self._executor:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+        self._proxy = None
+
+
+owner_client = OwnerClient()
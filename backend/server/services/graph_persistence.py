@@ -0,0 +1,274 @@
+from typing import Dict, List, Optional
+from datetime import datetime
+import asyncio
+import base64
+import json
+import os
+import shutil
+import time
+
+import numpy as np
+
+from .graph_service import graph_service, GraphService
+from .system_monitor import system_monitor
+
+DATA_DIR = os.getenv("WITNESS_DATA_DIR", "./data")
+PERSISTENCE_ENABLED = os.getenv("WITNESS_GRAPH_PERSIST", "1") not in ("0", "false", "no")
+CHECKPOINT_INTERVAL_SECONDS = float(os.getenv("WITNESS_CHECKPOINT_INTERVAL", "300"))
+LOG_FLUSH_INTERVAL_SECONDS = 1.0
+
+FORMAT_VERSION = 1
+
+
+def _encode_vector(vector) -> Optional[str]:
+    if vector is None or len(vector) == 0:
+        return None
+    return base64.b64encode(np.asarray(vector, dtype=np.float32).tobytes()).decode("ascii")
+
+
+def _decode_vector(data: Optional[str]) -> Optional[List[float]]:
+    if not data:
+        return None
+    return np.frombuffer(base64.b64decode(data), dtype=np.float32).tolist()
+
+
+class GraphPersistence:
+    """
+    Checkpoints + append-only mutation log for the in-memory graph.
+
+    Layout under <data_dir>/graph:
+        CURRENT                      name of the latest complete checkpoint directory
+        checkpoint-<version>/        meta.json, strings.json, nodes.npz, edges.npz, embeddings.npy
+        mutations-<first>.log        JSON lines {"v", "op", "p"} for versions after a checkpoint
+
+    A restart loads CURRENT (embeddings are memory-mapped) and replays newer log records.
+    """
+
+    def __init__(self, graph: GraphService, data_dir: str = DATA_DIR, interval: float = CHECKPOINT_INTERVAL_SECONDS):
+        self.graph = graph
+        self.root = os.path.join(data_dir, "graph")
+        self.interval = interval
+        self._log = None
+        self._log_path: Optional[str] = None
+        self._checkpoint_version = 0
+        self._checkpoint_lock = asyncio.Lock()
+        self._attached = False
+        self.last_checkpoint_seconds = 0.0
+        self.records_logged = 0
+
+    # --- restore ----------------------------------------------------------------------
+
+    def restore(self, attach: bool = True) -> int:
+        """
+        Loads the latest checkpoint and replays the log. Returns the number of nodes restored.
+        With attach=False nothing is logged afterwards (read-only use, e.g. offline export).
+        """
+        os.makedirs(self.root, exist_ok=True)
+        start = time.perf_counter()
+
+        checkpoint = self._current_checkpoint()
+        if checkpoint:
+            self.graph.import_state(self._read_checkpoint(checkpoint))
+            self._checkpoint_version = self.graph.version
+
+        replayed = 0
+        for path in self._log_segments():
+            replayed += self._replay(path)
+
+        if attach:
+            self._open_log()
+            self._attach()
+
+        nodes = self.graph.graph.number_of_nodes()
+        if nodes:
+            system_monitor.log(
+                "GRAPH-STORE", "SUCCESS",
+                f"Restored {nodes} nodes (version {self.graph.version}, {replayed} log records) "
+                f"in {time.perf_counter() - start:.2f}s"
+            )
+        return nodes
+
+    def _current_checkpoint(self) -> Optional[str]:
+        pointer = os.path.join(self.root, "CURRENT")
+        if not os.path.exists(pointer):
+            return None
+        with open(pointer) as f:
+            name = f.read().strip()
+        path = os.path.join(self.root, name)
+        return path if os.path.isdir(path) else None
+
+    def _read_checkpoint(self, path: str) -> Dict:
+        with open(os.path.join(path, "meta.json")) as f:
+            meta = json.load(f)
+        with open(os.path.join(path, "strings.json")) as f:
+            strings = json.load(f)
+        with np.load(os.path.join(path, "nodes.npz")) as data:
+            nodes = {name: data[name] for name in data.files}
+        with np.load(os.path.join(path, "edges.npz")) as data:
+            edges = {name: data[name] for name in data.files}
+        has_embedding = nodes.pop("__has_embedding")
+        return {
+            "version": meta["version"],
+            "ids": strings["ids"],
+            "strings": strings["strings"],
+            "categories": strings["categories"],
+            "nodes": nodes,
+            "edges": edges,
+            "embeddings": np.load(os.path.join(path, "embeddings.npy"), mmap_mode="r"),
+            "has_embedding": has_embedding,
+        }
+
+    def _log_segments(self) -> List[str]:
+        names = sorted(n for n in os.listdir(self.root) if n.startswith("mutations-") and n.endswith(".log"))
+        return [os.path.join(self.root, n) for n in names]
+
+    def _replay(self, path: str) -> int:
+        replayed = 0
+        with open(path) as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    # Torn write from a crash; nothing after it is trustworthy
+                    break
+                if record["v"] <= self.graph.version:
+                    continue
+                payload = record["p"]
+                if "embedding" in payload:
+                    payload["embedding"] = _decode_vector(payload["embedding"])
+                self.graph.apply_mutation(record["v"], record["op"], payload)
+                replayed += 1
+        return replayed
+
+    # --- mutation log -----------------------------------------------------------------
+
+    def _attach(self):
+        if not self._attached:
+            self.graph.add_listener(self._on_mutation)
+            self._attached = True
+
+    def _open_log(self):
+        if self._log:
+            self._log.flush()
+            os.fsync(self._log.fileno())
+            self._log.close()
+        self._log_path = os.path.join(self.root, f"mutations-{self.graph.version + 1:012d}.log")
+        self._log = open(self._log_path, "a", buffering=1 << 16)
+
+    def _on_mutation(self, version: int, op: str, payload: Dict):
+        if self._log is None:
+            return
+        if "embedding" in payload:
+            payload = dict(payload, embedding=_encode_vector(payload["embedding"]))
+        self._log.write(json.dumps({"v": version, "op": op, "p": payload}, separators=(",", ":")) + "\n")
+        self.records_logged += 1
+
+    def flush(self):
+        if self._log:
+            self._log.flush()
+
+    # --- checkpoints ------------------------------------------------------------------
+
+    async def checkpoint(self) -> Optional[str]:
+        async with self._checkpoint_lock:
+            if self.graph.version == self._checkpoint_version and self._current_checkpoint():
+                return None
+            start = time.perf_counter()
+            # Snapshot and log rotation happen together on the event loop, so the new
+            # segment holds exactly the mutations after the snapshot version
+            state = self.graph.export_state()
+            self._open_log()
+            loop = asyncio.get_event_loop()
+            path = await loop.run_in_executor(None, self._write_checkpoint, state)
+            self._checkpoint_version = state["version"]
+            self.last_checkpoint_seconds = time.perf_counter() - start
+            system_monitor.log(
+                "GRAPH-STORE", "INFO",
+                f"Checkpoint v{state['version']} ({len(state['ids'])} nodes) in {self.last_checkpoint_seconds:.2f}s"
+            )
+            return path
+
+    def _write_checkpoint(self, state: Dict) -> str:
+        name = f"checkpoint-{state['version']:012d}"
+        final = os.path.join(self.root, name)
+        tmp = final + ".tmp"
+        shutil.rmtree(tmp, ignore_errors=True)
+        os.makedirs(tmp)
+
+        embeddings = state["embeddings"]
+        matrix = np.lib.format.open_memmap(
+            os.path.join(tmp, "embeddings.npy"), mode="w+", dtype=np.float32, shape=embeddings.shape
+        )
+        # `embeddings` is already a private dense copy: export_state took it on the event
+        # loop, so this thread never reads store arrays that are still being mutated
+        for start in range(0, len(embeddings), 65536):
+            matrix[start:start + 65536] = embeddings[start:start + 65536]
+        matrix.flush()
+        del matrix
+
+        np.savez(os.path.join(tmp, "nodes.npz"), __has_embedding=state["has_embedding"], **state["nodes"])
+        np.savez(os.path.join(tmp, "edges.npz"), **state["edges"])
+        with open(os.path.join(tmp, "strings.json"), "w") as f:
+            json.dump({"ids": state["ids"], "strings": state["strings"], "categories": state["categories"]}, f)
+        with open(os.path.join(tmp, "meta.json"), "w") as f:
+            json.dump({
+                "format": FORMAT_VERSION,
+                "version": state["version"],
+                "nodes": len(state["ids"]),
+                "edges": int(len(state["edges"]["source"])),
+                "embedding_dim": int(embeddings.shape[1]),
+                "created_at": datetime.utcnow().isoformat() + "Z"
+            }, f)
+
+        shutil.rmtree(final, ignore_errors=True)
+        os.replace(tmp, final)
+        pointer_tmp = os.path.join(self.root, "CURRENT.tmp")
+        with open(pointer_tmp, "w") as f:
+            f.write(name)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(pointer_tmp, os.path.join(self.root, "CURRENT"))
+
+        self._prune(name, state["version"])
+        return final
+
+    def _prune(self, keep: str, version: int):
+        for entry in os.listdir(self.root):
+            path = os.path.join(self.root, entry)
+            if entry.startswith("checkpoint-") and entry != keep:
+                shutil.rmtree(path, ignore_errors=True)
+            elif entry.startswith("mutations-") and path != self._log_path:
+                # Older segments only hold versions already covered by the checkpoint
+                if int(entry[len("mutations-"):-len(".log")]) <= version:
+                    os.remove(path)
+
+    async def run(self):
+        last_checkpoint = time.monotonic()
+        while True:
+            await asyncio.sleep(LOG_FLUSH_INTERVAL_SECONDS)
+            self.flush()
+            if time.monotonic() - last_checkpoint >= self.interval:
+                last_checkpoint = time.monotonic()
+                try:
+                    await self.checkpoint()
+                except Exception as e:
+                    system_monitor.log("GRAPH-STORE", "WARN", f"Checkpoint failed: {e}")
+
+    def close(self):
+        if self._log:
+            self._log.flush()
+            os.fsync(self._log.fileno())
+            self._log.close()
+            self._log = None
+
+    def get_stats(self) -> Dict:
+        return {
+            "enabled": PERSISTENCE_ENABLED,
+            "checkpoint_version": self._checkpoint_version,
+            "graph_version": self.graph.version,
+            "records_logged": self.records_logged,
+            "last_checkpoint_seconds": self.last_checkpoint_seconds
+        }
+
+
+graph_persistence = GraphPersistence(graph_service)
@@ -1,44 +1,490 @@
 import networkx as nx
-from typing import List, Dict, Tuple, Optional
+import numpy as np
+from typing import Callable, Iterable, Iterator, List, Dict, Tuple, Optional
+from collections import OrderedDict
 import random
+import itertools
 import math
+import os
+import sys
+import time
+
+from .graph_store import (
+    CompactGraph, NODE_NUMERIC_COLUMNS, NODE_CATEGORICAL_COLUMNS, NODE_CATEGORICAL_DEFAULTS, NODE_STRING_COLUMNS,
+    EDGE_NUMERIC_COLUMNS, EDGE_CATEGORICAL_COLUMNS
+)
+from .embedding_index import EmbeddingIndex
+from .seq_index import SeqIndex
+from .spatial_index import SpatialGrid
+
+# "networkx" keeps attribute dicts per node/edge; "compact" uses the array-backed CompactGraph
+GRAPH_STORE = os.getenv("WITNESS_GRAPH_STORE", "networkx")
+
+CLUSTER_CENTERS = {
+    "spiritual": (25, 25),
+    "ai": (75, 25),
+    "cultural": (25, 75),
+    "political": (75, 75),
+    "default": (50, 50)
+}
+
+EGO_CACHE_SIZE = 256
+
+# Below this zoom level (1.0 = whole 0-100 canvas) viewport queries return cluster super-nodes
+LOD_ZOOM_THRESHOLD = 2.0
+VIEWPORT_MAX_NODES = 2000
+
 
 class GraphService:
-    def __init__(self):
-        self.graph = nx.Graph()
-        self._node_positions = {}
+    def __init__(self, store: str = GRAPH_STORE):
+        self.graph = CompactGraph() if store == "compact" else nx.Graph()
+        self.spatial_index = SpatialGrid(cell_size=5.0)
+        # Bumped on every mutation; listeners see (version, op, payload) in order
+        self.version = 0
+        self._listeners: List[Callable[[int, str, Dict], None]] = []
+        # Insertion sequence per node; orders pagination and makes up stable edge ids
+        self._next_seq = 1
+        self.seq_index = SeqIndex()
+        # Search matrix for the networkx store (CompactGraph keeps its own); built on first search
+        self.embedding_index = EmbeddingIndex()
+        # Canvas anchor per discovered topic (1-based; 0 = none), filled in by the stream clusterer
+        self.topic_centers: Dict[int, Tuple[float, float]] = {}
+        # Like version, but ignores position-only changes (layout moves)
+        self.topology_version = 0
+        self._ego_cache: "OrderedDict[Tuple, Tuple[int, List[str], List[Dict], bool]]" = OrderedDict()
+    
+    def add_listener(self, callback: Callable[[int, str, Dict], None]):
+        self._listeners.append(callback)
     
-    def add_node(self, node_id: str, label: str = "", cluster: str = "default", embedding: Optional[List[float]] = None):
+    def remove_listener(self, callback: Callable[[int, str, Dict], None]):
+        if callback in self._listeners:
+            self._listeners.remove(callback)
+    
+    def _emit(self, op: str, payload: Dict):
+        self.version += 1
+        if op != "move_nodes":
+            self.topology_version += 1
+        for listener in list(self._listeners):
+            try:
+                listener(self.version, op, payload)
+            except Exception as e:
+                print(f"Graph listener error ({op}): {e}")
+    
+    def add_node(
+        self,
+        node_id: str,
+        label: str = "",
+        cluster: str = "default",
+        embedding: Optional[List[float]] = None,
+        x: Optional[float] = None,
+        y: Optional[float] = None,
+        virality: float = 0.0,
+        created_at: Optional[float] = None,
+        seq: Optional[int] = None,
+        source: str = "unknown",
+        topic: int = 0
+    ):
         if not self.graph.has_node(node_id):
-            x, y = self._compute_position(node_id, cluster)
+            if x is None or y is None:
+                x, y = self._compute_position(node_id, cluster, topic)
+            if created_at is None:
+                created_at = time.time()
+            if seq is None:
+                seq = self._next_seq
+            self._next_seq = max(self._next_seq, seq + 1)
             self.graph.add_node(
                 node_id,
                 label=label,
                 cluster=cluster,
+                source=source,
                 embedding=embedding or [],
                 x=x,
                 y=y,
                 size=1.0,
-                pulse=True
+                pulse=True,
+                virality=virality,
+                created_at=created_at,
+                last_linked=created_at,
+                seq=seq,
+                topic=topic
             )
-            self._node_positions[node_id] = (x, y)
+            self.spatial_index.insert(node_id, x, y)
+            self.seq_index.add(node_id, seq)
+            self.embedding_index.add(node_id, embedding, cluster, source, created_at)
+            self._emit("add_node", {
+                "id": node_id, "label": label, "cluster": cluster, "source": source,
+                "embedding": embedding, "x": x, "y": y,
+                "virality": virality, "created_at": created_at, "seq": seq,
+                "topic": topic
+            })
         return self.get_node(node_id)
     
-    def add_edge(self, source_id: str, target_id: str, weight: float = 1.0, edge_type: str = "semantic"):
+    def add_edge(
+        self,
+        source_id: str,
+        target_id: str,
+        weight: float = 1.0,
+        edge_type: str = "semantic",
+        linked_at: Optional[float] = None
+    ):
         if self.graph.has_node(source_id) and self.graph.has_node(target_id):
+            if linked_at is None:
+                linked_at = time.time()
             self.graph.add_edge(source_id, target_id, weight=weight, edge_type=edge_type)
             self._update_node_size(source_id)
             self._update_node_size(target_id)
+            self.graph.nodes[source_id]["last_linked"] = linked_at
+            self.graph.nodes[target_id]["last_linked"] = linked_at
+            self._emit("add_edge", {
+                "source": source_id, "target": target_id,
+                "weight": weight, "edge_type": edge_type, "linked_at": linked_at
+            })
     
-    def _compute_position(self, node_id: str, cluster: str) -> Tuple[float, float]:
-        cluster_centers = {
-            "spiritual": (25, 25),
-            "ai": (75, 25),
-            "cultural": (25, 75),
-            "political": (75, 75),
-            "default": (50, 50)
+    def update_node(
+        self,
+        node_id: str,
+        label: Optional[str] = None,
+        cluster: Optional[str] = None,
+        virality: Optional[float] = None
+    ) -> Optional[Dict]:
+        """Changes a node's descriptive attributes in place; the layout moves it if its anchor changed."""
+        if not self.graph.has_node(node_id):
+            return None
+        changes = {
+            name: value for name, value in (("label", label), ("cluster", cluster), ("virality", virality))
+            if value is not None
         }
-        center = cluster_centers.get(cluster, (50, 50))
+        data = self.graph.nodes[node_id]
+        for name, value in changes.items():
+            data[name] = value
+        if cluster is not None:
+            self.embedding_index.set_cluster(node_id, cluster)
+        if changes:
+            self._emit("update_node", {"id": node_id, **changes})
+        return self.get_node(node_id)
+    
+    def remove_nodes(self, node_ids: List[str]) -> List[str]:
+        """Drops nodes and their edges; surviving neighbours are resized. Returns the ids removed."""
+        removed = []
+        touched = set()
+        for node_id in node_ids:
+            if not self.graph.has_node(node_id):
+                continue
+            touched.update(self.graph.neighbors(node_id))
+            self.graph.remove_node(node_id)
+            self.spatial_index.remove(node_id)
+            self.seq_index.discard(node_id)
+            removed.append(node_id)
+        self.embedding_index.remove(removed)
+        for node_id in touched:
+            self._update_node_size(node_id)
+        if removed:
+            self._emit("remove_nodes", {"ids": removed})
+        return removed
+    
+    def replace_edges(
+        self,
+        scope: List[str],
+        source: List[str],
+        target: List[str],
+        weight: List[float],
+        edge_type: str = "semantic"
+    ) -> Dict[str, int]:
+        """
+        Swaps every `edge_type` edge between two nodes of `scope` for the given edge list in
+        one step. Edges touching nodes outside the scope (e.g. added since the list was
+        computed) are left alone.
+        """
+        members = set(scope)
+        stale = [
+            (u, v) for u, v, data in self.graph.edges(data=True)
+            if u in members and v in members and data.get("edge_type", "semantic") == edge_type
+        ]
+        touched = set()
+        for u, v in stale:
+            self.graph.remove_edge(u, v)
+            touched.add(u)
+            touched.add(v)
+        added = 0
+        for u, v, w in zip(source, target, weight):
+            if not (self.graph.has_node(u) and self.graph.has_node(v)) or self.graph.has_edge(u, v):
+                continue
+            self.graph.add_edge(u, v, weight=w, edge_type=edge_type)
+            touched.add(u)
+            touched.add(v)
+            added += 1
+        for node_id in touched:
+            self._update_node_size(node_id)
+        self._emit("replace_edges", {
+            "scope": list(scope), "source": list(source), "target": list(target),
+            "weight": list(weight), "edge_type": edge_type
+        })
+        return {"removed": len(stale), "added": added}
+    
+    def move_nodes(self, positions: Dict[str, Tuple[float, float]]):
+        moved = {}
+        for node_id, (x, y) in positions.items():
+            if self.graph.has_node(node_id):
+                data = self.graph.nodes[node_id]
+                data["x"] = x
+                data["y"] = y
+                self.spatial_index.move(node_id, x, y)
+                moved[node_id] = (x, y)
+        if moved:
+            self._emit("move_nodes", {"positions": moved})
+    
+    def remap_topics(self, mapping: Dict[int, int]) -> int:
+        """
+        Renumbers node topics, e.g. after the clusterer drops centroids; topics missing
+        from `mapping` become unassigned (0). Returns the number of nodes changed.
+        """
+        if isinstance(self.graph, CompactGraph):
+            rows = self.graph.alive_rows()
+            topics = self.graph.column("topic")
+            current = topics[rows].astype(np.int64)
+            lookup = np.zeros(max(int(current.max(initial=0)), max(mapping, default=0)) + 1, dtype=np.int64)
+            for old, new in mapping.items():
+                lookup[old] = new
+            remapped = lookup[current]
+            changed = int(np.count_nonzero(remapped != current))
+            topics[rows] = remapped
+        else:
+            changed = 0
+            for _, data in self.graph.nodes(data=True):
+                topic = int(data.get("topic", 0))
+                if topic and mapping.get(topic, 0) != topic:
+                    data["topic"] = mapping.get(topic, 0)
+                    changed += 1
+        self._emit("remap_topics", {"old": list(mapping), "new": list(mapping.values())})
+        return changed
+    
+    def apply_mutation(self, version: int, op: str, payload: Dict):
+        """Replays a logged mutation without notifying listeners."""
+        listeners, self._listeners = self._listeners, []
+        try:
+            if op == "add_node":
+                self.add_node(
+                    payload["id"], payload.get("label", ""), payload.get("cluster", "default"),
+                    payload.get("embedding"), payload.get("x"), payload.get("y"),
+                    payload.get("virality", 0.0), payload.get("created_at"), payload.get("seq"),
+                    payload.get("source", "unknown"), payload.get("topic", 0)
+                )
+            elif op == "add_edge":
+                self.add_edge(
+                    payload["source"], payload["target"],
+                    payload.get("weight", 1.0), payload.get("edge_type", "semantic"),
+                    payload.get("linked_at")
+                )
+            elif op == "update_node":
+                self.update_node(payload["id"], payload.get("label"), payload.get("cluster"), payload.get("virality"))
+            elif op == "move_nodes":
+                self.move_nodes(payload["positions"])
+            elif op == "remove_nodes":
+                self.remove_nodes(payload["ids"])
+            elif op == "replace_edges":
+                self.replace_edges(
+                    payload["scope"], payload["source"], payload["target"],
+                    payload["weight"], payload.get("edge_type", "semantic")
+                )
+            elif op == "remap_topics":
+                self.remap_topics(dict(zip(payload["old"], payload["new"])))
+        finally:
+            self._listeners = listeners
+        self.version = version
+    
+    def export_state(self) -> Dict:
+        """Columnar copy of the whole graph; cheap for the compact store, one pass for networkx."""
+        if isinstance(self.graph, CompactGraph):
+            state = self.graph.export_columns()
+        else:
+            state = self._export_networkx()
+        state["version"] = self.version
+        return state
+    
+    def export_topology(self) -> Dict:
+        """Read-only snapshot of ids and weighted edges, stamped with the topology version."""
+        if isinstance(self.graph, CompactGraph):
+            topology = self.graph.export_topology()
+        else:
+            ids = list(self.graph.nodes())
+            position = {node_id: i for i, node_id in enumerate(ids)}
+            edge_list = list(self.graph.edges(data="weight", default=1.0))
+            m = len(edge_list)
+            topology = {
+                "ids": ids,
+                "source": np.fromiter((position[u] for u, _, _ in edge_list), dtype=np.int32, count=m),
+                "target": np.fromiter((position[v] for _, v, _ in edge_list), dtype=np.int32, count=m),
+                "weight": np.fromiter((w for _, _, w in edge_list), dtype=np.float64, count=m),
+            }
+        topology["version"] = self.topology_version
+        return topology
+    
+    def node_columns(self, names: List[str]) -> Tuple[List[str], Dict[str, np.ndarray]]:
+        """Ids plus the requested numeric node attributes as aligned arrays."""
+        if isinstance(self.graph, CompactGraph):
+            rows = self.graph.alive_rows()
+            ids = [self.graph.id_of(row) for row in rows.tolist()]
+            return ids, {name: self.graph.column(name)[rows] for name in names}
+        ids = list(self.graph.nodes())
+        n = len(ids)
+        attrs = [self.graph.nodes[node_id] for node_id in ids]
+        return ids, {
+            name: np.fromiter((data.get(name, 0) for data in attrs), dtype=NODE_NUMERIC_COLUMNS[name], count=n)
+            for name in names
+        }
+    
+    def memory_bytes(self) -> int:
+        if isinstance(self.graph, CompactGraph):
+            return self.graph.memory_bytes()
+        n = self.graph.number_of_nodes()
+        if n == 0:
+            return 0
+        # networkx has no cheap exact answer; extrapolate from a sample of nodes
+        sample = list(itertools.islice(self.graph.nodes(data=True), 256))
+        node_bytes = 0
+        for node_id, data in sample:
+            node_bytes += sys.getsizeof(data) + sum(sys.getsizeof(value) for value in data.values())
+            node_bytes += sum(sys.getsizeof(value) for value in data.get("embedding") or [])
+            node_bytes += sys.getsizeof(self.graph[node_id])
+        edge_bytes = sys.getsizeof({"weight": 1.0, "edge_type": "semantic"}) + 2 * 64
+        return int(node_bytes / len(sample) * n + edge_bytes * self.graph.number_of_edges())
+    
+    def bytes_per_node(self) -> float:
+        if isinstance(self.graph, CompactGraph):
+            # Freed rows are reused rather than released, so divide by allocated rows
+            return self.memory_bytes() / max(self.graph.allocated_rows(), 1)
+        return self.memory_bytes() / max(self.graph.number_of_nodes(), 1)
+    
+    def export_embeddings(self) -> Tuple[List[str], np.ndarray]:
+        """Ids of nodes that carry an embedding and a float32 copy of their vectors."""
+        if isinstance(self.graph, CompactGraph):
+            rows, matrix = self.graph.embedding_matrix()
+            return [self.graph.id_of(row) for row in rows.tolist()], matrix[rows]
+        ids, vectors = [], []
+        dim = None
+        for node_id, data in self.graph.nodes(data=True):
+            embedding = data.get("embedding")
+            if not embedding:
+                continue
+            if dim is None:
+                dim = len(embedding)
+            if len(embedding) == dim:
+                ids.append(node_id)
+                vectors.append(embedding)
+        return ids, np.asarray(vectors, dtype=np.float32).reshape(len(ids), dim or 0)
+    
+    def _export_networkx(self) -> Dict:
+        ids = list(self.graph.nodes())
+        n = len(ids)
+        position = {node_id: i for i, node_id in enumerate(ids)}
+        attrs = [self.graph.nodes[node_id] for node_id in ids]
+        categories: Dict[str, Dict[str, int]] = {
+            name: {} for name in NODE_CATEGORICAL_COLUMNS + EDGE_CATEGORICAL_COLUMNS
+        }
+        
+        def encode(name: str, value: str) -> int:
+            return categories[name].setdefault(value, len(categories[name]))
+        
+        nodes = {
+            name: np.fromiter((data.get(name, 0) for data in attrs), dtype=dtype, count=n)
+            for name, dtype in NODE_NUMERIC_COLUMNS.items()
+        }
+        for name in NODE_CATEGORICAL_COLUMNS:
+            default = NODE_CATEGORICAL_DEFAULTS[name]
+            nodes[name] = np.fromiter((encode(name, data.get(name, default)) for data in attrs), dtype=np.int16, count=n)
+        
+        dim = next((len(data["embedding"]) for data in attrs if data.get("embedding")), 0)
+        embeddings = np.zeros((n, dim), dtype=np.float32)
+        has_embedding = np.zeros(n, dtype=np.bool_)
+        for i, data in enumerate(attrs):
+            embedding = data.get("embedding")
+            if embedding is not None and len(embedding) == dim and dim:
+                embeddings[i] = embedding
+                has_embedding[i] = True
+        
+        edge_list = list(self.graph.edges(data=True))
+        m = len(edge_list)
+        edges = {
+            "source": np.fromiter((position[u] for u, _, _ in edge_list), dtype=np.int32, count=m),
+            "target": np.fromiter((position[v] for _, v, _ in edge_list), dtype=np.int32, count=m),
+        }
+        for name, dtype in EDGE_NUMERIC_COLUMNS.items():
+            edges[name] = np.fromiter((data.get(name, 0) for _, _, data in edge_list), dtype=dtype, count=m)
+        for name in EDGE_CATEGORICAL_COLUMNS:
+            edges[name] = np.fromiter((encode(name, data.get(name, "semantic")) for _, _, data in edge_list), dtype=np.int16, count=m)
+        
+        return {
+            "ids": ids,
+            "nodes": nodes,
+            "strings": {name: [data.get(name, "") for data in attrs] for name in NODE_STRING_COLUMNS},
+            "categories": {name: list(codes) for name, codes in categories.items()},
+            "embeddings": embeddings,
+            "has_embedding": has_embedding,
+            "edges": edges,
+        }
+    
+    def import_state(self, state: Dict):
+        """Replaces the graph with an export_state() snapshot (e.g. a loaded checkpoint)."""
+        ids = state["ids"]
+        self.embedding_index.reset()
+        if isinstance(self.graph, CompactGraph):
+            self.graph.load_columns(state)
+        else:
+            self.graph = nx.Graph()
+            nodes = state["nodes"]
+            categories = state["categories"]
+            columns = {name: nodes[name].tolist() for name in NODE_NUMERIC_COLUMNS if name in nodes}
+            for name in NODE_CATEGORICAL_COLUMNS:
+                if name not in nodes:
+                    columns[name] = [NODE_CATEGORICAL_DEFAULTS[name]] * len(ids)
+                    continue
+                names = categories.get(name, [])
+                columns[name] = [names[code] for code in nodes[name].tolist()]
+            for name in NODE_STRING_COLUMNS:
+                columns[name] = state["strings"].get(name, [""] * len(ids))
+            embeddings = state["embeddings"]
+            has_embedding = state["has_embedding"]
+            for i, node_id in enumerate(ids):
+                attrs = {name: values[i] for name, values in columns.items()}
+                attrs["embedding"] = embeddings[i].tolist() if has_embedding[i] else []
+                self.graph.add_node(node_id, **attrs)
+            
+            edges = state["edges"]
+            edge_columns = {name: edges[name].tolist() for name in EDGE_NUMERIC_COLUMNS}
+            for name in EDGE_CATEGORICAL_COLUMNS:
+                names = categories.get(name, [])
+                edge_columns[name] = [names[code] for code in edges[name].tolist()]
+            for j, (u, v) in enumerate(zip(edges["source"].tolist(), edges["target"].tolist())):
+                self.graph.add_edge(ids[u], ids[v], **{name: values[j] for name, values in edge_columns.items()})
+        
+        self.spatial_index = SpatialGrid(cell_size=self.spatial_index.cell_size)
+        for node_id, x, y in zip(ids, state["nodes"]["x"].tolist(), state["nodes"]["y"].tolist()):
+            self.spatial_index.insert(node_id, x, y)
+        self.version = state.get("version", 0)
+        self.topology_version += 1
+        self._restore_sequence()
+    
+    def _restore_sequence(self):
+        ids, columns = self.node_columns(["seq"])
+        seqs = columns["seq"]
+        self._next_seq = int(seqs.max()) + 1 if len(seqs) else 1
+        # Snapshots written before sequences existed: number those nodes now
+        for i in np.nonzero(seqs <= 0)[0].tolist():
+            self.graph.nodes[ids[i]]["seq"] = self._next_seq
+            seqs[i] = self._next_seq
+            self._next_seq += 1
+        self.seq_index.rebuild(zip(ids, seqs.tolist()))
+    
+    def cluster_center(self, cluster: str) -> Tuple[float, float]:
+        return CLUSTER_CENTERS.get(cluster, (50, 50))
+    
+    def node_center(self, data) -> Tuple[float, float]:
+        """Layout anchor for a node: its discovered topic if it has one, else its cluster label."""
+        center = self.topic_centers.get(int(data.get("topic", 0)))
+        return center if center is not None else self.cluster_center(data.get("cluster", "default"))
+    
+    def _compute_position(self, node_id: str, cluster: str, topic: int = 0) -> Tuple[float, float]:
+        center = self.topic_centers.get(topic) or self.cluster_center(cluster)
         angle = random.uniform(0, 2 * math.pi)
         radius = random.uniform(5, 20)
         x = max(5, min(95, center[0] + radius * math.cos(angle)))
@@ -63,7 +509,9 @@ class GraphService:
                 "pulse": data.get("pulse", False),
                 "metadata": {
                     "label": data.get("label", ""),
-                    "cluster": data.get("cluster", "default")
+                    "cluster": data.get("cluster", "default"),
+                    "source": data.get("source", "unknown"),
+                    "topic": int(data.get("topic", 0))
                 }
             }
         return None
@@ -88,9 +536,9 @@ class GraphService:
     
     def get_all_edges(self) -> List[Dict]:
         edges = []
-        for idx, (source, target, data) in enumerate(self.graph.edges(data=True)):
+        for source, target, data in self.graph.edges(data=True):
             edges.append({
-                "id": idx,
+                "id": self.edge_id(source, target),
                 "source_id": source,
                 "target_id": target,
                 "weight": data.get("weight", 1.0),
@@ -98,6 +546,284 @@ class GraphService:
             })
         return edges
     
+    def edge_id(self, source_id: str, target_id: str) -> str:
+        """Stable across calls and restarts: the endpoints' insertion sequences, low first."""
+        a = int(self.graph.nodes[source_id].get("seq", 0))
+        b = int(self.graph.nodes[target_id].get("seq", 0))
+        return f"{a}-{b}" if a <= b else f"{b}-{a}"
+    
+    def _passes(self, data, cluster: Optional[str], min_size: Optional[float]) -> bool:
+        return (cluster is None or data.get("cluster", "default") == cluster) and \
+            (min_size is None or data.get("size", 1.0) >= min_size)
+    
+    def _nodes_after(
+        self,
+        cursor: int,
+        limit: int,
+        cluster: Optional[str] = None,
+        min_size: Optional[float] = None
+    ) -> Tuple[List[Tuple[int, str]], bool]:
+        """Up to `limit` (seq, id) with seq > cursor in seq order, and whether more follow."""
+        nodes = self.graph.nodes
+        page = []
+        for seq, node_id in self.seq_index.after(cursor):
+            if cluster is not None or min_size is not None:
+                # .get: a reader thread may race a removal
+                data = nodes.get(node_id)
+                if data is None or not self._passes(data, cluster, min_size):
+                    continue
+            if len(page) == limit:
+                return page, True
+            page.append((seq, node_id))
+        return page, False
+    
+    def _edges_after(
+        self,
+        after: int,
+        cluster: Optional[str] = None,
+        min_size: Optional[float] = None
+    ) -> Iterator[Tuple[int, str, str, object]]:
+        """
+        (key, lo id, hi id, edge) with key > `after` in key order, where key packs the
+        endpoint seqs (lo << 32) | hi. One pass over the nodes in seq order, each node
+        giving its edges to higher-seq neighbours sorted by their seq. `edge` is the
+        CompactGraph edge row or the networkx attribute dict.
+        """
+        first, floor = after >> 32, after & 0xFFFFFFFF
+        seq_of = self.seq_index.seq_of
+        nodes = self.graph.nodes
+        filtered = cluster is not None or min_size is not None
+        compact = self.graph if isinstance(self.graph, CompactGraph) else None
+        for a, node_id in self.seq_index.after(first - 1):
+            if filtered:
+                data = nodes.get(node_id)
+                if data is None or not self._passes(data, cluster, min_size):
+                    continue
+            # A self-loop has b == a; the cursor's own node resumes past its hi seq
+            lowest = max(floor + 1, a) if a == first else a
+            try:
+                if compact is not None:
+                    # Copies, and the column re-read per node: the loop may grow or move them
+                    rows, edges = (view.copy() for view in compact.adjacency(node_id))
+                    seqs = compact.column("seq")[rows]
+                    keep = np.nonzero(seqs >= lowest)[0]
+                    keep = keep[np.argsort(seqs[keep], kind="stable")]
+                    higher = [
+                        (b, compact.id_of(row), edge)
+                        for b, row, edge in zip(seqs[keep].tolist(), rows[keep].tolist(), edges[keep].tolist())
+                    ]
+                    # Rows freed or reused since the copy no longer match the index
+                    higher = [item for item in higher if seq_of.get(item[1]) == item[0]]
+                else:
+                    higher = sorted(
+                        ((seq_of.get(neighbor, 0), neighbor, data) for neighbor, data in list(self.graph[node_id].items())
+                         if seq_of.get(neighbor, 0) >= lowest),
+                        key=lambda item: item[0]
+                    )
+            except (KeyError, IndexError):
+                continue
+            for b, neighbor, edge in higher:
+                if filtered:
+                    data = nodes.get(neighbor)
+                    if data is None or not self._passes(data, cluster, min_size):
+                        continue
+                yield (a << 32) | b, node_id, neighbor, edge
+    
+    def _edge_attrs(self, edge) -> Tuple[float, str]:
+        if isinstance(edge, dict):
+            return edge.get("weight", 1.0), edge.get("edge_type", "semantic")
+        return (
+            float(self.graph.edge_column("weight")[edge]),
+            self.graph.category_names("edge_type")[self.graph.edge_column("edge_type")[edge]]
+        )
+    
+    def node_page(
+        self,
+        cursor: int = 0,
+        limit: int = 1000,
+        cluster: Optional[str] = None,
+        min_size: Optional[float] = None
+    ) -> Tuple[List[Dict], Optional[int]]:
+        """Up to `limit` nodes with seq > cursor in seq order, plus the next cursor (None at the end)."""
+        page, has_more = self._nodes_after(cursor, limit, cluster, min_size)
+        nodes = [self.get_node(node_id) for _, node_id in page]
+        return nodes, (page[-1][0] if has_more else None)
+    
+    def edge_page(
+        self,
+        cursor: Tuple[int, int] = (0, 0),
+        limit: int = 1000,
+        cluster: Optional[str] = None,
+        min_size: Optional[float] = None
+    ) -> Tuple[List[Dict], Optional[Tuple[int, int]]]:
+        """
+        Up to `limit` edges after `cursor` in edge-id order. With filters, only edges whose
+        endpoints both pass them, so node and edge pages describe the same subgraph.
+        """
+        after = (cursor[0] << 32) | cursor[1]
+        page = list(itertools.islice(self._edges_after(after, cluster, min_size), limit + 1))
+        has_more = len(page) > limit
+        page = page[:limit]
+        edges_out = []
+        for key, source, target, edge in page:
+            weight, edge_type = self._edge_attrs(edge)
+            edges_out.append({
+                "id": f"{key >> 32}-{key & 0xFFFFFFFF}",
+                "source_id": source,
+                "target_id": target,
+                "weight": weight,
+                "edge_type": edge_type
+            })
+        last = page[-1][0] if has_more else None
+        return edges_out, ((last >> 32, last & 0xFFFFFFFF) if last is not None else None)
+
+    def node_chunk(self, cursor: int = 0, limit: int = 16384, embeddings: bool = True) -> Tuple[Dict, Optional[int]]:
+        """
+        Columnar node_page for bulk export: numeric columns as arrays, "id" / "label" /
+        categorical columns as string lists, plus "embedding" and "has_embedding". Only
+        reads the graph, so it may run on a thread (see graph_owner.THREADED_METHODS).
+        """
+        page, has_more = self._nodes_after(cursor, limit)
+        if isinstance(self.graph, CompactGraph):
+            graph = self.graph
+            ids, row_list = [], []
+            for _, node_id in page:
+                row = graph.row_index(node_id)
+                if row is not None:
+                    ids.append(node_id)
+                    row_list.append(row)
+            rows = np.array(row_list, dtype=np.int64)
+            chunk = {name: graph.column(name)[rows] for name in NODE_NUMERIC_COLUMNS}
+            chunk["id"] = ids
+            for name in NODE_STRING_COLUMNS:
+                chunk[name] = [graph.nodes[node_id].get(name, "") for node_id in ids]
+            for name in NODE_CATEGORICAL_COLUMNS:
+                names = graph.category_names(name)
+                chunk[name] = [names[code] for code in graph.category_column(name)[rows].tolist()]
+            if embeddings:
+                chunk["embedding"], chunk["has_embedding"] = graph.embeddings_of(rows)
+        else:
+            nodes = self.graph.nodes
+            ids, attrs = [], []
+            for _, node_id in page:
+                data = nodes.get(node_id)
+                if data is not None:
+                    ids.append(node_id)
+                    attrs.append(data)
+            n = len(ids)
+            chunk = {
+                name: np.fromiter((data.get(name, 0) for data in attrs), dtype=dtype, count=n)
+                for name, dtype in NODE_NUMERIC_COLUMNS.items()
+            }
+            chunk["id"] = ids
+            for name in NODE_STRING_COLUMNS:
+                chunk[name] = [data.get(name, "") for data in attrs]
+            for name in NODE_CATEGORICAL_COLUMNS:
+                chunk[name] = [data.get(name, NODE_CATEGORICAL_DEFAULTS[name]) for data in attrs]
+            if embeddings:
+                dim = next((len(data["embedding"]) for data in attrs if data.get("embedding")), 0)
+                chunk["embedding"] = np.zeros((n, dim), dtype=np.float32)
+                chunk["has_embedding"] = np.zeros(n, dtype=np.bool_)
+                for i, data in enumerate(attrs):
+                    embedding = data.get("embedding")
+                    if embedding and len(embedding) == dim:
+                        chunk["embedding"][i] = embedding
+                        chunk["has_embedding"][i] = True
+
+        return chunk, (page[-1][0] if has_more else None)
+
+    def edge_chunk(self, cursor: int = 0, limit: int = 16384) -> Tuple[Dict, Optional[int]]:
+        """
+        Columnar edge_page for bulk export. Endpoints are given as node seq numbers
+        ("source" < "target"), which join against the exported nodes' "seq" column; the
+        cursor is the packed edge key (lo << 32) | hi. Thread-safe like node_chunk.
+        """
+        page = list(itertools.islice(self._edges_after(cursor), limit + 1))
+        has_more = len(page) > limit
+        page = page[:limit]
+        keys = np.array([key for key, _, _, _ in page], dtype=np.int64)
+        if isinstance(self.graph, CompactGraph):
+            graph = self.graph
+            edges = np.array([edge for _, _, _, edge in page], dtype=np.int64)
+            type_names = graph.category_names("edge_type")
+            chunk = {
+                "weight": graph.edge_column("weight")[edges],
+                "edge_type": [type_names[code] for code in graph.edge_column("edge_type")[edges].tolist()]
+            }
+        else:
+            chunk = {
+                "weight": np.array([data.get("weight", 1.0) for _, _, _, data in page], dtype=np.float32),
+                "edge_type": [data.get("edge_type", "semantic") for _, _, _, data in page]
+            }
+
+        chunk["source"] = keys >> 32
+        chunk["target"] = keys & 0xFFFFFFFF
+        return chunk, (int(keys[-1]) if has_more else None)
+
+    def _weighted_neighbors(self, node_id: str) -> Iterable[Tuple[str, float]]:
+        if isinstance(self.graph, CompactGraph):
+            rows, edges = self.graph.adjacency(node_id)
+            weights = self.graph.edge_column("weight")[edges]
+            return zip([self.graph.id_of(row) for row in rows.tolist()], weights.tolist())
+        return ((neighbor, data.get("weight", 1.0)) for neighbor, data in self.graph[node_id].items())
+    
+    def ego_graph(self, node_id: str, hops: int = 2, max_nodes: int = 200, min_weight: float = 0.0) -> Optional[Dict]:
+        """
+        Breadth-first k-hop neighbourhood over the live adjacency, following edges with
+        weight >= min_weight. When a ring would exceed max_nodes the strongest links win.
+        Structure is cached per topology version; positions are read fresh each call.
+        """
+        if not self.graph.has_node(node_id):
+            return None
+        key = (node_id, hops, max_nodes, min_weight)
+        cached = self._ego_cache.get(key)
+        if cached is not None and cached[0] == self.topology_version:
+            self._ego_cache.move_to_end(key)
+            _, members, edges, truncated = cached
+        else:
+            members, edges, truncated = self._bfs(node_id, hops, max_nodes, min_weight)
+            self._ego_cache[key] = (self.topology_version, members, edges, truncated)
+            self._ego_cache.move_to_end(key)
+            while len(self._ego_cache) > EGO_CACHE_SIZE:
+                self._ego_cache.popitem(last=False)
+        
+        return {
+            "center": node_id,
+            "hops": hops,
+            "nodes": [self.get_node(member) for member in members],
+            "edges": edges,
+            "truncated": truncated,
+            "version": self.version,
+            "cached": cached is not None and cached[0] == self.topology_version
+        }
+    
+    def _bfs(self, node_id: str, hops: int, max_nodes: int, min_weight: float) -> Tuple[List[str], List[Dict], bool]:
+        members = [node_id]
+        seen = {node_id}
+        frontier = [node_id]
+        truncated = False
+        for _ in range(hops):
+            best: Dict[str, float] = {}
+            for current in frontier:
+                for neighbor, weight in self._weighted_neighbors(current):
+                    if weight >= min_weight and neighbor not in seen and weight > best.get(neighbor, -math.inf):
+                        best[neighbor] = weight
+            if not best:
+                break
+            room = max_nodes - len(members)
+            ring = sorted(best, key=best.__getitem__, reverse=True)
+            if len(ring) > room:
+                ring = ring[:room]
+                truncated = True
+            members.extend(ring)
+            seen.update(ring)
+            frontier = ring
+            if truncated:
+                break
+        
+        edges = [edge for edge in self._edges_within(seen) if edge["weight"] >= min_weight]
+        return members, edges, truncated
+    
     def get_graph_snapshot(self) -> Dict:
         nodes = self.get_all_nodes()
         edges = self.get_all_edges()
@@ -105,7 +831,7 @@ class GraphService:
         stats = {
             "node_count": self.graph.number_of_nodes(),
             "edge_count": self.graph.number_of_edges(),
-            "density": nx.density(self.graph) if self.graph.number_of_nodes() > 0 else 0,
+            "density": self._density(),
             "clusters": self._count_clusters()
         }
         
@@ -115,6 +841,112 @@ class GraphService:
             "stats": stats
         }
     
+    def get_viewport(
+        self,
+        x_min: float = 0.0,
+        y_min: float = 0.0,
+        x_max: float = 100.0,
+        y_max: float = 100.0,
+        zoom: float = 1.0,
+        max_nodes: int = VIEWPORT_MAX_NODES
+    ) -> Dict:
+        visible = self.spatial_index.query(x_min, y_min, x_max, y_max)
+        aggregated = zoom < LOD_ZOOM_THRESHOLD or len(visible) > max_nodes
+        
+        if aggregated:
+            nodes, edges = self._aggregate_viewport(visible, zoom)
+        else:
+            nodes = [self.get_node(node_id) for node_id in visible]
+            edges = self._edges_within(set(visible))
+        
+        return {
+            "nodes": nodes,
+            "edges": edges,
+            "viewport": {"x_min": x_min, "y_min": y_min, "x_max": x_max, "y_max": y_max, "zoom": zoom},
+            "aggregated": aggregated,
+            "stats": {
+                "visible_nodes": len(visible),
+                "node_count": self.graph.number_of_nodes(),
+                "edge_count": self.graph.number_of_edges()
+            }
+        }
+    
+    def _edges_within(self, node_ids: set) -> List[Dict]:
+        edges = []
+        for source in node_ids:
+            for target, data in self.graph[source].items():
+                # Each undirected edge is seen from both ends; keep one
+                if target in node_ids and source < target:
+                    edges.append({
+                        "id": self.edge_id(source, target),
+                        "source_id": source,
+                        "target_id": target,
+                        "weight": data.get("weight", 1.0),
+                        "edge_type": data.get("edge_type", "semantic")
+                    })
+        return edges
+    
+    def _aggregate_viewport(self, visible: List[str], zoom: float) -> Tuple[List[Dict], List[Dict]]:
+        # Super-node buckets shrink as the client zooms in
+        bucket_size = max(self.spatial_index.cell_size, 20.0 / max(zoom, 0.1))
+        groups: Dict[str, Dict] = {}
+        membership: Dict[str, str] = {}
+        
+        for node_id in visible:
+            data = self.graph.nodes[node_id]
+            x, y = self.spatial_index.positions[node_id]
+            cluster = data.get("cluster", "default")
+            key = f"cluster:{cluster}:{int(x // bucket_size)}:{int(y // bucket_size)}"
+            group = groups.get(key)
+            if group is None:
+                group = groups[key] = {"cluster": cluster, "count": 0, "sx": 0.0, "sy": 0.0}
+            group["count"] += 1
+            group["sx"] += x
+            group["sy"] += y
+            membership[node_id] = key
+        
+        nodes = []
+        for key, group in groups.items():
+            count = group["count"]
+            nodes.append({
+                "id": key,
+                "x": group["sx"] / count,
+                "y": group["sy"] / count,
+                "size": min(1.0 + math.log2(count), 10.0),
+                "color": self._cluster_to_color(group["cluster"]),
+                "pulse": False,
+                "metadata": {
+                    "label": f"{count} {group['cluster']} memes",
+                    "cluster": group["cluster"],
+                    "count": count,
+                    "aggregate": True
+                }
+            })
+        
+        weights: Dict[Tuple[str, str], List[float]] = {}
+        for source, source_key in membership.items():
+            for target, data in self.graph[source].items():
+                target_key = membership.get(target)
+                if target_key is None or target_key == source_key or source > target:
+                    continue
+                pair = (source_key, target_key) if source_key < target_key else (target_key, source_key)
+                agg = weights.setdefault(pair, [0.0, 0])
+                agg[0] += data.get("weight", 1.0)
+                agg[1] += 1
+        
+        edges = [
+            {
+                "id": f"{pair[0]}|{pair[1]}",
+                "source_id": pair[0],
+                "target_id": pair[1],
+                "weight": total / count,
+                "edge_type": "aggregate",
+                "count": count
+            }
+            for pair, (total, count) in weights.items()
+        ]
+        return nodes, edges
+    
     def _count_clusters(self) -> Dict[str, int]:
         clusters = {}
         for node_id in self.graph.nodes():
@@ -122,18 +954,28 @@ class GraphService:
             clusters[cluster] = clusters.get(cluster, 0) + 1
         return clusters
     
+    def _density(self) -> float:
+        n = self.graph.number_of_nodes()
+        if n <= 1:
+            return 0
+        return 2 * self.graph.number_of_edges() / (n * (n - 1))
+    
     def compute_centrality(self) -> Dict[str, float]:
-        if self.graph.number_of_nodes() == 0:
-            return {}
-        try:
-            return nx.degree_centrality(self.graph)
-        except:
+        n = self.graph.number_of_nodes()
+        if n == 0:
             return {}
+        if n == 1:
+            return {node_id: 1.0 for node_id in self.graph.nodes()}
+        scale = 1.0 / (n - 1)
+        return {node_id: self.graph.degree(node_id) * scale for node_id in self.graph.nodes()}
     
     def find_similar_nodes(self, node_id: str, threshold: float = 0.7) -> List[str]:
         if not self.graph.has_node(node_id):
             return []
         
+        if isinstance(self.graph, CompactGraph):
+            return self.graph.similar_nodes(node_id, threshold)
+        
         source_embedding = self.graph.nodes[node_id].get("embedding", [])
         if not source_embedding:
             return []
@@ -150,6 +992,77 @@ class GraphService:
         
         return similar
     
+    def search_embeddings(
+        self,
+        query: np.ndarray,
+        k: int = 10,
+        cluster: Optional[str] = None,
+        source: Optional[str] = None,
+        since: Optional[float] = None,
+        until: Optional[float] = None,
+        min_score: float = -1.0
+    ) -> Tuple[List[Tuple[str, float]], int]:
+        """
+        Top-k nodes by cosine similarity to `query`, filtering before scoring.
+        Returns (id, score) pairs best first and the number of candidates scored.
+        """
+        query = np.asarray(query, dtype=np.float32)
+        query_norm = float(np.linalg.norm(query))
+        if query_norm == 0 or k <= 0:
+            return [], 0
+        
+        if isinstance(self.graph, CompactGraph):
+            rows, matrix = self.graph.embedding_matrix()
+            if matrix.shape[1] != len(query):
+                return [], 0
+            mask = np.ones(len(rows), dtype=np.bool_)
+            if cluster is not None:
+                mask &= self.graph.category_column("cluster")[rows] == self.graph.category_code("cluster", cluster)
+            if source is not None:
+                mask &= self.graph.category_column("source")[rows] == self.graph.category_code("source", source)
+            if since is not None or until is not None:
+                created = self.graph.column("created_at")[rows]
+                if since is not None:
+                    mask &= created >= since
+                if until is not None:
+                    mask &= created <= until
+            rows = rows[mask]
+            # Gathering matrix[rows] would copy the candidates; a selective filter makes that worth it
+            dots = matrix[rows] @ query if len(rows) * 4 < len(matrix) else (matrix @ query)[rows]
+            norms = self.graph.embedding_norms()[rows] * query_norm
+            scores = np.divide(dots, norms, out=np.zeros(len(rows), dtype=np.float32), where=norms > 0)
+        else:
+            index = self.embedding_index
+            if not index.built:
+                index.build(self.graph.nodes(data=True))
+            if index.dim != len(query):
+                return [], 0
+            rows, matrix, clusters, sources, created = index.columns()
+            mask = np.ones(len(rows), dtype=np.bool_)
+            if cluster is not None:
+                mask &= clusters[rows] == index.codes["cluster"].get(cluster, -1)
+            if source is not None:
+                mask &= sources[rows] == index.codes["source"].get(source, -1)
+            if since is not None:
+                mask &= created[rows] >= since
+            if until is not None:
+                mask &= created[rows] <= until
+            rows = rows[mask]
+            # Rows are unit length already
+            query = query / query_norm
+            scores = matrix[rows] @ query if len(rows) * 4 < len(matrix) else (matrix @ query)[rows]
+        
+        candidates = len(scores)
+        if candidates > k:
+            top = np.argpartition(-scores, k)[:k]
+        else:
+            top = np.arange(candidates)
+        top = top[np.argsort(-scores[top], kind="stable")]
+        top = top[scores[top] >= min_score]
+        id_of = self.graph.id_of if isinstance(self.graph, CompactGraph) else self.embedding_index.ids.__getitem__
+        top_ids = [id_of(row) for row in rows[top].tolist()]
+        return list(zip(top_ids, scores[top].tolist())), candidates
+    
     def _cosine_similarity(self, vec1: List[float], vec2: List[float]) -> float:
         if len(vec1) != len(vec2) or len(vec1) == 0:
             return 0.0
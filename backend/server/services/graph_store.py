@@ -0,0 +1,691 @@
+from collections.abc import Mapping, MutableMapping
+from typing import Dict, Iterator, List, Optional, Tuple
+import sys
+
+import numpy as np
+
+# Node attributes stored as dense columns; anything else lands in a sparse per-row dict
+NODE_NUMERIC_COLUMNS = {
+    "x": np.float32,
+    "y": np.float32,
+    "size": np.float32,
+    "pulse": np.bool_,
+    "virality": np.float32,
+    "created_at": np.float64,
+    "last_linked": np.float64,
+    "seq": np.int64,
+    "topic": np.int16,
+}
+NODE_CATEGORICAL_COLUMNS = ("cluster", "source")
+# Value a categorical column takes when a snapshot predates it
+NODE_CATEGORICAL_DEFAULTS = {"cluster": "default", "source": "unknown"}
+NODE_STRING_COLUMNS = ("label",)
+
+EDGE_NUMERIC_COLUMNS = {
+    "weight": np.float32,
+}
+EDGE_CATEGORICAL_COLUMNS = ("edge_type",)
+
+_MIN_SEGMENT = 4
+
+
+class _Categories:
+    """Interns low-cardinality strings (clusters, edge types) as small integer codes."""
+
+    def __init__(self):
+        self.names: List[str] = []
+        self.codes: Dict[str, int] = {}
+
+    def encode(self, name: str) -> int:
+        code = self.codes.get(name)
+        if code is None:
+            code = len(self.names)
+            name = sys.intern(str(name))
+            self.names.append(name)
+            self.codes[name] = code
+        return code
+
+    def decode(self, code: int) -> str:
+        return self.names[code]
+
+
+def _grow(array: np.ndarray, capacity: int) -> np.ndarray:
+    grown = np.zeros((capacity,) + array.shape[1:], dtype=array.dtype)
+    grown[:len(array)] = array
+    return grown
+
+
+class _NodeAttrs(MutableMapping):
+    __slots__ = ("_g", "_row")
+
+    def __init__(self, graph: "CompactGraph", row: int):
+        self._g = graph
+        self._row = row
+
+    def __getitem__(self, key):
+        return self._g._get_node_attr(self._row, key)
+
+    def __setitem__(self, key, value):
+        self._g._set_node_attr(self._row, key, value)
+
+    def __delitem__(self, key):
+        extra = self._g._node_extra.get(self._row)
+        if not extra or key not in extra:
+            raise KeyError(key)
+        del extra[key]
+
+    def __iter__(self):
+        yield from NODE_NUMERIC_COLUMNS
+        yield from NODE_CATEGORICAL_COLUMNS
+        yield from NODE_STRING_COLUMNS
+        yield "embedding"
+        yield from self._g._node_extra.get(self._row, {})
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+
+class _NodeView(Mapping):
+    def __init__(self, graph: "CompactGraph"):
+        self._g = graph
+
+    def __getitem__(self, node_id: str) -> _NodeAttrs:
+        return _NodeAttrs(self._g, self._g._index[node_id])
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(list(self._g._index))
+
+    def __len__(self) -> int:
+        return len(self._g._index)
+
+    def __contains__(self, node_id) -> bool:
+        return node_id in self._g._index
+
+    def __call__(self) -> "_NodeView":
+        return self
+
+
+class _AdjView(Mapping):
+    """Neighbour -> edge attribute mapping for one node, read straight from the adjacency pool."""
+
+    def __init__(self, graph: "CompactGraph", row: int):
+        self._g = graph
+        self._row = row
+
+    def _segment(self) -> Tuple[np.ndarray, np.ndarray]:
+        return self._g._segment(self._row)
+
+    def __getitem__(self, neighbor_id: str) -> Dict:
+        edge = self._g._find_edge(self._row, self._g._index[neighbor_id])
+        if edge < 0:
+            raise KeyError(neighbor_id)
+        return self._g._edge_attrs(edge)
+
+    def __iter__(self) -> Iterator[str]:
+        nbrs, _ = self._segment()
+        ids = self._g._ids
+        return iter([ids[n] for n in nbrs.tolist()])
+
+    def __len__(self) -> int:
+        return int(self._g._adj_len[self._row])
+
+    def items(self):
+        nbrs, eids = self._segment()
+        ids = self._g._ids
+        for n, e in zip(nbrs.tolist(), eids.tolist()):
+            yield ids[n], self._g._edge_attrs(e)
+
+
+class CompactGraph:
+    """
+    Array-backed undirected graph exposing the subset of the networkx.Graph API
+    that GraphService relies on.
+
+    Node ids are interned and mapped to dense row numbers. Numeric attributes live
+    in NumPy columns, embeddings in one float32 matrix, and adjacency in a shared
+    pool of per-node segments (CSR-style) that double in place when full.
+    """
+
+    def __init__(self, initial_capacity: int = 1024, embedding_dim: Optional[int] = None):
+        self._index: Dict[str, int] = {}
+        self._ids: List[Optional[str]] = []
+        self._free_rows: List[int] = []
+        self._node_extra: Dict[int, Dict] = {}
+        self._capacity = initial_capacity
+
+        self._alive = np.zeros(initial_capacity, dtype=np.bool_)
+        self._node_cols = {name: np.zeros(initial_capacity, dtype=dtype) for name, dtype in NODE_NUMERIC_COLUMNS.items()}
+        self._node_cats = {name: np.zeros(initial_capacity, dtype=np.int16) for name in NODE_CATEGORICAL_COLUMNS}
+        self._node_strs: Dict[str, List[str]] = {name: [] for name in NODE_STRING_COLUMNS}
+        self._categories = {name: _Categories() for name in NODE_CATEGORICAL_COLUMNS + EDGE_CATEGORICAL_COLUMNS}
+
+        self._embedding_dim = embedding_dim
+        self._emb = np.zeros((initial_capacity, embedding_dim or 0), dtype=np.float32)
+        self._has_emb = np.zeros(initial_capacity, dtype=np.bool_)
+        self._emb_norm = np.zeros(initial_capacity, dtype=np.float32)
+
+        # Adjacency segments: [offset, offset + len) of the pool belong to a row, cap slots reserved
+        self._adj_off = np.zeros(initial_capacity, dtype=np.int64)
+        self._adj_len = np.zeros(initial_capacity, dtype=np.int32)
+        self._adj_cap = np.zeros(initial_capacity, dtype=np.int32)
+        self._pool_nbr = np.zeros(initial_capacity * _MIN_SEGMENT, dtype=np.int32)
+        self._pool_eid = np.zeros(initial_capacity * _MIN_SEGMENT, dtype=np.int32)
+        self._pool_used = 0
+        self._pool_garbage = 0
+
+        self._edge_capacity = initial_capacity
+        self._edge_count = 0
+        self._edge_rows = 0
+        self._free_edges: List[int] = []
+        self._esrc = np.zeros(initial_capacity, dtype=np.int32)
+        self._edst = np.zeros(initial_capacity, dtype=np.int32)
+        self._ealive = np.zeros(initial_capacity, dtype=np.bool_)
+        self._edge_cols = {name: np.zeros(initial_capacity, dtype=dtype) for name, dtype in EDGE_NUMERIC_COLUMNS.items()}
+        self._edge_cats = {name: np.zeros(initial_capacity, dtype=np.int16) for name in EDGE_CATEGORICAL_COLUMNS}
+        self._edge_extra: Dict[int, Dict] = {}
+        self._self_loops = set()
+
+        self.nodes = _NodeView(self)
+
+    # --- networkx-compatible surface -------------------------------------------------
+
+    def has_node(self, node_id: str) -> bool:
+        return node_id in self._index
+
+    def __contains__(self, node_id: str) -> bool:
+        return node_id in self._index
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def __getitem__(self, node_id: str) -> _AdjView:
+        return _AdjView(self, self._index[node_id])
+
+    def number_of_nodes(self) -> int:
+        return len(self._index)
+
+    def number_of_edges(self) -> int:
+        return self._edge_count
+
+    def degree(self, node_id: str) -> int:
+        row = self._index[node_id]
+        # networkx counts a self-loop twice
+        return int(self._adj_len[row]) + (row in self._self_loops)
+
+    def neighbors(self, node_id: str) -> Iterator[str]:
+        return iter(self[node_id])
+
+    def has_edge(self, source_id: str, target_id: str) -> bool:
+        u = self._index.get(source_id)
+        v = self._index.get(target_id)
+        if u is None or v is None:
+            return False
+        return self._find_edge(u, v) >= 0
+
+    def add_node(self, node_id: str, **attrs):
+        row = self._index.get(node_id)
+        if row is None:
+            row = self._allocate_row(node_id)
+        for key, value in attrs.items():
+            self._set_node_attr(row, key, value)
+
+    def remove_node(self, node_id: str):
+        row = self._index.pop(node_id)
+        nbrs, eids = self._segment(row)
+        for n, e in zip(nbrs.tolist(), eids.tolist()):
+            if n != row:
+                self._segment_remove(n, row)
+            self._release_edge(e)
+        self._pool_garbage += int(self._adj_cap[row])
+        self._adj_len[row] = 0
+        self._adj_cap[row] = 0
+        self._alive[row] = False
+        self._has_emb[row] = False
+        self._self_loops.discard(row)
+        self._node_extra.pop(row, None)
+        for name in NODE_STRING_COLUMNS:
+            self._node_strs[name][row] = ""
+        self._ids[row] = None
+        self._free_rows.append(row)
+
+    def add_edge(self, source_id: str, target_id: str, **attrs):
+        for node_id in (source_id, target_id):
+            if node_id not in self._index:
+                self.add_node(node_id)
+        u = self._index[source_id]
+        v = self._index[target_id]
+        edge = self._find_edge(u, v)
+        if edge < 0:
+            edge = self._allocate_edge(u, v)
+            self._segment_append(u, v, edge)
+            if u != v:
+                self._segment_append(v, u, edge)
+            else:
+                self._self_loops.add(u)
+        for key, value in attrs.items():
+            self._set_edge_attr(edge, key, value)
+
+    def remove_edge(self, source_id: str, target_id: str):
+        u = self._index[source_id]
+        v = self._index[target_id]
+        edge = self._find_edge(u, v)
+        if edge < 0:
+            raise KeyError((source_id, target_id))
+        self._segment_remove(u, v)
+        if u != v:
+            self._segment_remove(v, u)
+        else:
+            self._self_loops.discard(u)
+        self._release_edge(edge)
+
+    def edges(self, data: bool = False) -> Iterator:
+        rows = np.nonzero(self._ealive[:self._edge_rows])[0]
+        ids = self._ids
+        for e in rows.tolist():
+            u = ids[self._esrc[e]]
+            v = ids[self._edst[e]]
+            if data:
+                yield u, v, self._edge_attrs(e)
+            else:
+                yield u, v
+
+    # --- vectorised access ------------------------------------------------------------
+
+    def alive_rows(self) -> np.ndarray:
+        return np.nonzero(self._alive[:len(self._ids)])[0]
+
+    def allocated_rows(self) -> int:
+        """High-water row count; freed rows stay allocated and are reused."""
+        return len(self._ids)
+
+    def row_of(self, node_id: str) -> int:
+        return self._index[node_id]
+
+    def row_index(self, node_id: str) -> Optional[int]:
+        return self._index.get(node_id)
+
+    def id_of(self, row: int) -> Optional[str]:
+        return self._ids[row]
+
+    def column(self, name: str) -> np.ndarray:
+        return self._node_cols[name][:len(self._ids)]
+
+    def category_column(self, name: str) -> np.ndarray:
+        return self._node_cats[name][:len(self._ids)]
+
+    def category_code(self, name: str, value: str) -> int:
+        return self._categories[name].codes.get(value, -1)
+
+    def category_names(self, name: str) -> List[str]:
+        return self._categories[name].names
+
+    def edge_endpoints(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Live edge rows and their endpoint node rows."""
+        edges = np.nonzero(self._ealive[:self._edge_rows])[0]
+        return edges, self._esrc[edges], self._edst[edges]
+
+    def adjacency(self, node_id: str) -> Tuple[np.ndarray, np.ndarray]:
+        """Neighbour rows and edge ids of a node, as views into the adjacency pool."""
+        return self._segment(self._index[node_id])
+
+    def edge_column(self, name: str) -> np.ndarray:
+        if name in self._edge_cats:
+            return self._edge_cats[name][:self._edge_rows]
+        return self._edge_cols[name][:self._edge_rows]
+
+    def embedding_matrix(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Rows that carry an embedding, and a view of the matching matrix slice."""
+        n = len(self._ids)
+        rows = np.nonzero(self._alive[:n] & self._has_emb[:n])[0]
+        return rows, self._emb[:n]
+
+    def embeddings_of(self, rows: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Embedding rows (zeros where missing) and has-embedding flags for the given node rows."""
+        return self._emb[rows], self._has_emb[rows]
+
+    def embedding_norms(self) -> np.ndarray:
+        return self._emb_norm[:len(self._ids)]
+
+    def similar_nodes(self, node_id: str, threshold: float) -> List[str]:
+        row = self._index.get(node_id)
+        if row is None or not self._has_emb[row]:
+            return []
+        rows, matrix = self.embedding_matrix()
+        rows = rows[rows != row]
+        if len(rows) == 0:
+            return []
+        query = matrix[row]
+        candidates = matrix[rows]
+        norms = self._emb_norm[rows] * self._emb_norm[row]
+        scores = np.divide(candidates @ query, norms, out=np.zeros(len(rows), dtype=np.float32), where=norms > 0)
+        ids = self._ids
+        return [ids[r] for r in rows[scores >= threshold].tolist()]
+
+    def export_columns(self) -> Dict:
+        """Dense copy of every live node and edge, in the layout GraphService.export_state uses."""
+        rows = self.alive_rows()
+        position = np.full(len(self._ids), -1, dtype=np.int64)
+        position[rows] = np.arange(len(rows))
+        edges = np.nonzero(self._ealive[:self._edge_rows])[0]
+
+        nodes = {name: col[rows].copy() for name, col in self._node_cols.items()}
+        nodes.update({name: col[rows].copy() for name, col in self._node_cats.items()})
+        edge_columns = {
+            "source": position[self._esrc[edges]].astype(np.int32),
+            "target": position[self._edst[edges]].astype(np.int32),
+        }
+        edge_columns.update({name: col[edges].copy() for name, col in self._edge_cols.items()})
+        edge_columns.update({name: col[edges].copy() for name, col in self._edge_cats.items()})
+        row_list = rows.tolist()
+        return {
+            "ids": [self._ids[r] for r in row_list],
+            "nodes": nodes,
+            "strings": {name: [col[r] for r in row_list] for name, col in self._node_strs.items()},
+            "categories": {name: list(cat.names) for name, cat in self._categories.items()},
+            "embeddings": self._emb[rows] if self._embedding_dim else np.zeros((len(rows), 0), dtype=np.float32),
+            "has_embedding": self._has_emb[rows].copy(),
+            "edges": edge_columns,
+        }
+
+    def export_topology(self) -> Dict:
+        """Ids plus edge endpoints/weights only; the cheap snapshot analytics jobs need."""
+        rows = self.alive_rows()
+        position = np.full(len(self._ids), -1, dtype=np.int64)
+        position[rows] = np.arange(len(rows))
+        edges = np.nonzero(self._ealive[:self._edge_rows])[0]
+        return {
+            "ids": [self._ids[r] for r in rows.tolist()],
+            "source": position[self._esrc[edges]].astype(np.int32),
+            "target": position[self._edst[edges]].astype(np.int32),
+            "weight": self._edge_cols["weight"][edges].astype(np.float64),
+        }
+
+    def load_columns(self, state: Dict):
+        """Replace the graph contents with export_columns() output, building adjacency in bulk."""
+        ids = state["ids"]
+        n = len(ids)
+        edges = state["edges"]
+        src = np.asarray(edges["source"], dtype=np.int32)
+        dst = np.asarray(edges["target"], dtype=np.int32)
+        m = len(src)
+
+        self.__init__(initial_capacity=max(1024, int(n * 1.25) + 1))
+        self._ids = [sys.intern(node_id) for node_id in ids]
+        self._index = {node_id: row for row, node_id in enumerate(self._ids)}
+        self._alive[:n] = True
+        for name, col in self._node_cols.items():
+            if name in state["nodes"]:
+                col[:n] = state["nodes"][name]
+        for name, names in state["categories"].items():
+            cat = self._categories.setdefault(name, _Categories())
+            for value in names:
+                cat.encode(value)
+        for name, col in self._node_cats.items():
+            if name in state["nodes"]:
+                col[:n] = state["nodes"][name]
+            else:
+                col[:n] = self._categories[name].encode(NODE_CATEGORICAL_DEFAULTS[name])
+        for name in NODE_STRING_COLUMNS:
+            self._node_strs[name] = list(state["strings"].get(name, [""] * n))
+
+        embeddings = state["embeddings"]
+        if embeddings.shape[1]:
+            self._embedding_dim = embeddings.shape[1]
+            self._emb = np.zeros((self._capacity, self._embedding_dim), dtype=np.float32)
+            self._emb[:n] = embeddings
+            self._has_emb[:n] = state["has_embedding"]
+            self._emb_norm[:n] = np.linalg.norm(embeddings, axis=1)
+
+        edge_capacity = max(1024, int(m * 1.25) + 1)
+        self._edge_capacity = edge_capacity
+        self._edge_rows = m
+        self._edge_count = m
+        self._esrc = _grow(src, edge_capacity)
+        self._edst = _grow(dst, edge_capacity)
+        self._ealive = np.zeros(edge_capacity, dtype=np.bool_)
+        self._ealive[:m] = True
+        self._edge_cols = {
+            name: _grow(np.asarray(edges[name], dtype=dtype), edge_capacity)
+            for name, dtype in EDGE_NUMERIC_COLUMNS.items()
+        }
+        self._edge_cats = {
+            name: _grow(np.asarray(edges[name], dtype=np.int16), edge_capacity)
+            for name in EDGE_CATEGORICAL_COLUMNS
+        }
+
+        # Each undirected edge appears in both endpoint segments (self-loops once)
+        distinct = src != dst
+        edge_ids = np.arange(m, dtype=np.int32)
+        owners = np.concatenate([src, dst[distinct]])
+        neighbors = np.concatenate([dst, src[distinct]])
+        owner_edges = np.concatenate([edge_ids, edge_ids[distinct]])
+        order = np.argsort(owners, kind="stable")
+        degree = np.bincount(owners, minlength=n).astype(np.int32)
+        offsets = np.zeros(n, dtype=np.int64)
+        if n:
+            offsets[1:] = np.cumsum(degree)[:-1]
+        pool_size = max(1024, int(len(owners) * 1.25) + 1)
+        self._pool_nbr = _grow(neighbors[order], pool_size)
+        self._pool_eid = _grow(owner_edges[order], pool_size)
+        self._pool_used = len(owners)
+        self._adj_off[:n] = offsets
+        self._adj_len[:n] = degree
+        self._adj_cap[:n] = degree
+        self._self_loops = set(src[~distinct].tolist())
+
+    def memory_bytes(self) -> int:
+        arrays = [self._alive, self._emb, self._has_emb, self._emb_norm, self._adj_off, self._adj_len, self._adj_cap,
+                  self._pool_nbr, self._pool_eid, self._esrc, self._edst, self._ealive]
+        arrays += list(self._node_cols.values()) + list(self._node_cats.values())
+        arrays += list(self._edge_cols.values()) + list(self._edge_cats.values())
+        total = sum(a.nbytes for a in arrays)
+        total += sys.getsizeof(self._index) + sys.getsizeof(self._ids)
+        total += sum(sys.getsizeof(node_id) for node_id in self._index)
+        for column in self._node_strs.values():
+            total += sys.getsizeof(column) + sum(sys.getsizeof(s) for s in column)
+        return total
+
+    # --- node rows --------------------------------------------------------------------
+
+    def _allocate_row(self, node_id: str) -> int:
+        node_id = sys.intern(node_id) if isinstance(node_id, str) else node_id
+        if self._free_rows:
+            row = self._free_rows.pop()
+            self._ids[row] = node_id
+        else:
+            row = len(self._ids)
+            if row >= self._capacity:
+                self._grow_nodes(self._capacity * 2)
+            self._ids.append(node_id)
+            for name in NODE_STRING_COLUMNS:
+                self._node_strs[name].append("")
+        self._index[node_id] = row
+        self._alive[row] = True
+        for column in self._node_cols.values():
+            column[row] = 0
+        for column in self._node_cats.values():
+            column[row] = 0
+        self._has_emb[row] = False
+        self._adj_len[row] = 0
+        self._adj_cap[row] = 0
+        return row
+
+    def _grow_nodes(self, capacity: int):
+        self._alive = _grow(self._alive, capacity)
+        self._node_cols = {name: _grow(col, capacity) for name, col in self._node_cols.items()}
+        self._node_cats = {name: _grow(col, capacity) for name, col in self._node_cats.items()}
+        self._emb = _grow(self._emb, capacity)
+        self._has_emb = _grow(self._has_emb, capacity)
+        self._emb_norm = _grow(self._emb_norm, capacity)
+        self._adj_off = _grow(self._adj_off, capacity)
+        self._adj_len = _grow(self._adj_len, capacity)
+        self._adj_cap = _grow(self._adj_cap, capacity)
+        self._capacity = capacity
+
+    def _get_node_attr(self, row: int, key: str):
+        if key in self._node_cols:
+            return self._node_cols[key][row].item()
+        if key in self._node_cats:
+            return self._categories[key].decode(int(self._node_cats[key][row]))
+        if key in self._node_strs:
+            return self._node_strs[key][row]
+        if key == "embedding":
+            return self._emb[row].tolist() if self._has_emb[row] else []
+        extra = self._node_extra.get(row)
+        if extra is None or key not in extra:
+            raise KeyError(key)
+        return extra[key]
+
+    def _set_node_attr(self, row: int, key: str, value):
+        if key in self._node_cols:
+            self._node_cols[key][row] = value
+        elif key in self._node_cats:
+            self._node_cats[key][row] = self._categories[key].encode(value)
+        elif key in self._node_strs:
+            self._node_strs[key][row] = value
+        elif key == "embedding":
+            self._set_embedding(row, value)
+        else:
+            self._node_extra.setdefault(row, {})[key] = value
+
+    def _set_embedding(self, row: int, value):
+        if value is None or len(value) == 0:
+            self._has_emb[row] = False
+            return
+        vector = np.asarray(value, dtype=np.float32)
+        if self._embedding_dim is None:
+            self._embedding_dim = len(vector)
+            self._emb = np.zeros((self._capacity, self._embedding_dim), dtype=np.float32)
+        if len(vector) != self._embedding_dim:
+            raise ValueError(f"Embedding dimension {len(vector)} does not match graph dimension {self._embedding_dim}")
+        self._emb[row] = vector
+        self._has_emb[row] = True
+        self._emb_norm[row] = np.linalg.norm(vector)
+
+    # --- edge rows --------------------------------------------------------------------
+
+    def _allocate_edge(self, u: int, v: int) -> int:
+        if self._free_edges:
+            edge = self._free_edges.pop()
+        else:
+            edge = self._edge_rows
+            if edge >= self._edge_capacity:
+                capacity = self._edge_capacity * 2
+                self._esrc = _grow(self._esrc, capacity)
+                self._edst = _grow(self._edst, capacity)
+                self._ealive = _grow(self._ealive, capacity)
+                self._edge_cols = {name: _grow(col, capacity) for name, col in self._edge_cols.items()}
+                self._edge_cats = {name: _grow(col, capacity) for name, col in self._edge_cats.items()}
+                self._edge_capacity = capacity
+            self._edge_rows += 1
+        self._esrc[edge] = u
+        self._edst[edge] = v
+        self._ealive[edge] = True
+        for column in self._edge_cols.values():
+            column[edge] = 0
+        for column in self._edge_cats.values():
+            column[edge] = 0
+        self._edge_count += 1
+        return edge
+
+    def _release_edge(self, edge: int):
+        if not self._ealive[edge]:
+            return
+        self._ealive[edge] = False
+        self._edge_extra.pop(edge, None)
+        self._free_edges.append(edge)
+        self._edge_count -= 1
+
+    def _edge_attrs(self, edge: int) -> Dict:
+        attrs = {name: col[edge].item() for name, col in self._edge_cols.items()}
+        for name, col in self._edge_cats.items():
+            attrs[name] = self._categories[name].decode(int(col[edge]))
+        extra = self._edge_extra.get(edge)
+        if extra:
+            attrs.update(extra)
+        return attrs
+
+    def _set_edge_attr(self, edge: int, key: str, value):
+        if key in self._edge_cols:
+            self._edge_cols[key][edge] = value
+        elif key in self._edge_cats:
+            self._edge_cats[key][edge] = self._categories[key].encode(value)
+        else:
+            self._edge_extra.setdefault(edge, {})[key] = value
+
+    # --- adjacency pool ---------------------------------------------------------------
+
+    def _segment(self, row: int) -> Tuple[np.ndarray, np.ndarray]:
+        start = int(self._adj_off[row])
+        end = start + int(self._adj_len[row])
+        return self._pool_nbr[start:end], self._pool_eid[start:end]
+
+    def _find_edge(self, u: int, v: int) -> int:
+        # Scan the shorter of the two segments; short ones are cheaper as Python lists
+        if self._adj_len[v] < self._adj_len[u]:
+            u, v = v, u
+        nbrs, eids = self._segment(u)
+        if len(nbrs) <= 64:
+            try:
+                return int(eids[nbrs.tolist().index(v)])
+            except ValueError:
+                return -1
+        hits = np.nonzero(nbrs == v)[0]
+        return int(eids[hits[0]]) if len(hits) else -1
+
+    def _segment_append(self, row: int, neighbor: int, edge: int):
+        length = int(self._adj_len[row])
+        if length == self._adj_cap[row]:
+            self._relocate_segment(row, max(_MIN_SEGMENT, length * 2))
+        slot = int(self._adj_off[row]) + length
+        self._pool_nbr[slot] = neighbor
+        self._pool_eid[slot] = edge
+        self._adj_len[row] = length + 1
+
+    def _segment_remove(self, row: int, neighbor: int):
+        start = int(self._adj_off[row])
+        length = int(self._adj_len[row])
+        hits = np.nonzero(self._pool_nbr[start:start + length] == neighbor)[0]
+        if not len(hits):
+            return
+        slot = start + int(hits[0])
+        last = start + length - 1
+        self._pool_nbr[slot] = self._pool_nbr[last]
+        self._pool_eid[slot] = self._pool_eid[last]
+        self._adj_len[row] = length - 1
+
+    def _relocate_segment(self, row: int, capacity: int):
+        if self._pool_garbage > self._pool_used // 2 and self._pool_garbage > 4096:
+            self._compact_pool()
+        if self._pool_used + capacity > len(self._pool_nbr):
+            size = max(len(self._pool_nbr) * 2, self._pool_used + capacity)
+            self._pool_nbr = _grow(self._pool_nbr, size)
+            self._pool_eid = _grow(self._pool_eid, size)
+        start = int(self._adj_off[row])
+        length = int(self._adj_len[row])
+        new_start = self._pool_used
+        self._pool_nbr[new_start:new_start + length] = self._pool_nbr[start:start + length]
+        self._pool_eid[new_start:new_start + length] = self._pool_eid[start:start + length]
+        self._pool_garbage += int(self._adj_cap[row])
+        self._adj_off[row] = new_start
+        self._adj_cap[row] = capacity
+        self._pool_used += capacity
+
+    def _compact_pool(self):
+        rows = len(self._ids)
+        caps = self._adj_cap[:rows].astype(np.int64)
+        offsets = np.concatenate(([0], np.cumsum(caps)[:-1])) if rows else np.zeros(0, dtype=np.int64)
+        total = int(caps.sum())
+        nbr = np.zeros(max(total, _MIN_SEGMENT), dtype=np.int32)
+        eid = np.zeros(max(total, _MIN_SEGMENT), dtype=np.int32)
+        for row in np.nonzero(self._adj_len[:rows])[0].tolist():
+            start = int(self._adj_off[row])
+            length = int(self._adj_len[row])
+            new_start = int(offsets[row])
+            nbr[new_start:new_start + length] = self._pool_nbr[start:start + length]
+            eid[new_start:new_start + length] = self._pool_eid[start:start + length]
+        self._adj_off[:rows] = offsets
+        self._pool_nbr = nbr
+        self._pool_eid = eid
+        self._pool_used = total
+        self._pool_garbage = 0
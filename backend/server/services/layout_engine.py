@@ -0,0 +1,296 @@
+from typing import Dict, List, Tuple
+from collections import deque
+from itertools import islice
+import asyncio
+import math
+import os
+import time
+
+import numpy as np
+
+from .graph_service import graph_service, GraphService
+
+LAYOUT_ENABLED = os.getenv("WITNESS_LAYOUT_ENABLED", "1") not in ("0", "false", "no")
+LAYOUT_BUDGET_MS = float(os.getenv("WITNESS_LAYOUT_BUDGET_MS", "8"))
+LAYOUT_TICK_SECONDS = float(os.getenv("WITNESS_LAYOUT_TICK_SECONDS", "0.1"))
+
+CANVAS_MIN = 2.0
+CANVAS_MAX = 98.0
+MAX_STEP = 2.0          # canvas units a fully "hot" node may move per iteration
+COOLING = 0.9           # heat multiplier per iteration
+MIN_HEAT = 0.05         # below this a node leaves the active set
+NEIGHBOR_HEAT = 0.5     # heat given to neighbours of a changed node
+GRAVITY = 0.02          # pull towards the node's cluster center
+MIN_MOVE = 0.01         # smaller moves are not written back or broadcast
+MIN_CHUNK = 16
+MAX_CHUNK = 512
+NEAR_SAMPLE_PER_CELL = 64  # dense cells are subsampled and the sample reweighted
+
+
+def compute_displacements(
+    positions: np.ndarray,
+    cells: np.ndarray,
+    heat: np.ndarray,
+    centers: np.ndarray,
+    near_positions: np.ndarray,
+    near_weights: np.ndarray,
+    far_cells: np.ndarray,
+    far_mass: np.ndarray,
+    far_centroids: np.ndarray,
+    spring_index: np.ndarray,
+    spring_positions: np.ndarray,
+    spring_weight: np.ndarray,
+    k: float
+) -> np.ndarray:
+    """
+    Fruchterman-Reingold step for a chunk of active nodes with grid-approximated repulsion.
+
+    Nodes in the same or an adjacent grid cell repel pairwise (dense cells contribute a
+    reweighted sample); every other cell acts as a single point mass at its centroid.
+    Springs pull along edges and a weak gravity term keeps nodes near their cluster center.
+    """
+    k2 = k * k
+    force = np.zeros_like(positions)
+    px = positions[:, 0:1]
+    py = positions[:, 1:2]
+
+    # Far field: one term per occupied cell that is not adjacent to the node's own cell.
+    # sum_j s_ij (p_i - c_j) = p_i * sum_j s_ij - S @ c keeps this to one matmul.
+    if len(far_cells):
+        far = (np.abs(cells[:, 0:1] - far_cells[:, 0]) > 1) | (np.abs(cells[:, 1:2] - far_cells[:, 1]) > 1)
+        dist2 = (px - far_centroids[:, 0]) ** 2 + (py - far_centroids[:, 1]) ** 2 + 1e-4
+        scale = np.where(far, far_mass * k2 / dist2, 0.0)
+        force += positions * scale.sum(axis=1)[:, None] - scale @ far_centroids
+
+    # Near field: pairwise repulsion against each node's padded 3x3 neighbourhood sample
+    # (near_positions is (A, W, 2), padding slots carry zero weight)
+    dist2 = (px - near_positions[:, :, 0]) ** 2 + (py - near_positions[:, :, 1]) ** 2
+    # Coincident points (including each node against itself) contribute nothing
+    scale = np.where(dist2 > 1e-9, near_weights * k2 / (dist2 + 1e-4), 0.0)
+    force += positions * scale.sum(axis=1)[:, None] - np.einsum("aw,awk->ak", scale, near_positions)
+
+    # Springs along edges: |f| = w * d^2 / k towards the neighbour
+    if len(spring_index):
+        delta = spring_positions - positions[spring_index]
+        dist = np.sqrt((delta ** 2).sum(axis=1)) + 1e-6
+        pull = delta * (spring_weight * dist / k)[:, None]
+        np.add.at(force, spring_index, pull)
+
+    force += (centers - positions) * GRAVITY
+
+    # Temperature-limited step: direction of the force, length capped by heat
+    magnitude = np.sqrt((force ** 2).sum(axis=1)) + 1e-9
+    step = np.minimum(magnitude, MAX_STEP * heat)
+    return force * (step / magnitude)[:, None]
+
+
+class LayoutEngine:
+    """
+    Incremental force-directed layout that runs in small time-boxed ticks on the event loop.
+
+    Only "hot" nodes move: new nodes, endpoints of new edges, and their neighbours. Heat
+    decays each iteration so the active set drains once the local layout settles.
+    """
+
+    def __init__(self, graph: GraphService, budget_ms: float = LAYOUT_BUDGET_MS, enabled: bool = LAYOUT_ENABLED):
+        self.graph = graph
+        self.budget = budget_ms / 1000.0
+        self.heat: Dict[str, float] = {}
+        self._queue: deque = deque()
+        self.pending_moves: Dict[str, Tuple[float, float]] = {}
+        self.iterations = 0
+        self.nodes_moved = 0
+        self.last_tick_ms = 0.0
+        self._node_cost = 1e-4  # seconds per node, refined after every chunk
+        self._reset_tick_cache()
+        if enabled:
+            graph.add_listener(self._on_mutation)
+
+    def _on_mutation(self, version: int, op: str, payload: Dict):
+        if op == "add_node" or (op == "update_node" and "cluster" in payload):
+            self._warm(payload["id"], 1.0)
+        elif op == "add_edge":
+            for node_id in (payload["source"], payload["target"]):
+                self._warm(node_id, 1.0)
+                if self.graph.graph.has_node(node_id):
+                    for neighbor in self.graph.graph.neighbors(node_id):
+                        self._warm(neighbor, NEIGHBOR_HEAT)
+        elif op == "remove_nodes":
+            # Queue entries for removed nodes are skipped lazily in tick()
+            for node_id in payload["ids"]:
+                self.heat.pop(node_id, None)
+                self.pending_moves.pop(node_id, None)
+
+    def _warm(self, node_id: str, heat: float):
+        current = self.heat.get(node_id)
+        if current is None:
+            self._queue.append(node_id)
+            self.heat[node_id] = heat
+        elif heat > current:
+            self.heat[node_id] = heat
+
+    @property
+    def active_count(self) -> int:
+        return len(self.heat)
+
+    def _spring_constant(self) -> float:
+        n = max(self.graph.graph.number_of_nodes(), 1)
+        area = (CANVAS_MAX - CANVAS_MIN) ** 2
+        return 0.5 * math.sqrt(area / n)
+
+    def _far_field(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        if self._far is None:
+            masses = list(self.graph.spatial_index.cell_mass.items())
+            self._far = (
+                np.array([cell for cell, _ in masses], dtype=np.int64).reshape(-1, 2),
+                np.array([mass[0] for _, mass in masses], dtype=np.float64),
+                np.array([(mass[1] / mass[0], mass[2] / mass[0]) for _, mass in masses], dtype=np.float64).reshape(-1, 2)
+            )
+        return self._far
+
+    def _cell_slot(self, cell: Tuple[int, int]) -> int:
+        # Samples are cached for the duration of a tick; moves made earlier in the tick are ignored
+        slot = self._slots.get(cell)
+        if slot is not None:
+            return slot
+        index = self.graph.spatial_index
+        members = index.cells.get(cell)
+        if not members:
+            self._slots[cell] = 0
+            return 0
+        picked = list(islice(members, NEAR_SAMPLE_PER_CELL))
+        positions = np.zeros((NEAR_SAMPLE_PER_CELL, 2), dtype=np.float64)
+        positions[:len(picked)] = [index.positions[n] for n in picked]
+        weights = np.zeros(NEAR_SAMPLE_PER_CELL, dtype=np.float64)
+        weights[:len(picked)] = len(members) / len(picked)
+        self._slot_positions.append(positions)
+        self._slot_weights.append(weights)
+        self._slot_table = None
+        slot = self._slots[cell] = len(self._slot_positions) - 1
+        return slot
+
+    def _reset_tick_cache(self):
+        self._far = None
+        self._slots: Dict[Tuple[int, int], int] = {}
+        # Slot 0 is the empty cell: zero weight, so it never contributes force
+        self._slot_positions = [np.zeros((NEAR_SAMPLE_PER_CELL, 2), dtype=np.float64)]
+        self._slot_weights = [np.zeros(NEAR_SAMPLE_PER_CELL, dtype=np.float64)]
+        self._slot_table = None
+
+    def tick(self) -> int:
+        """Runs chunks of active nodes until the CPU budget is spent. Returns nodes processed."""
+        start = time.perf_counter()
+        self._reset_tick_cache()
+        processed = 0
+        remaining = len(self._queue)
+        while remaining > 0:
+            left = self.budget - (time.perf_counter() - start)
+            if left <= 0:
+                break
+            # Size the chunk from the measured per-node cost so a tick stays within budget
+            chunk_size = int(min(MAX_CHUNK, max(MIN_CHUNK, left / self._node_cost)))
+            chunk = []
+            while self._queue and len(chunk) < chunk_size and remaining > 0:
+                node_id = self._queue.popleft()
+                remaining -= 1
+                if node_id in self.heat and node_id in self.graph.spatial_index:
+                    chunk.append(node_id)
+                else:
+                    self.heat.pop(node_id, None)
+            if chunk:
+                chunk_start = time.perf_counter()
+                self._step(chunk)
+                cost = (time.perf_counter() - chunk_start) / len(chunk)
+                self._node_cost = 0.8 * self._node_cost + 0.2 * cost
+                processed += len(chunk)
+        self.last_tick_ms = (time.perf_counter() - start) * 1000
+        return processed
+
+    def _step(self, chunk: List[str]):
+        index = self.graph.spatial_index
+        graph = self.graph.graph
+        cell_size = index.cell_size
+
+        positions = np.array([index.positions[n] for n in chunk], dtype=np.float64)
+        cells = np.floor(positions / cell_size).astype(np.int64)
+        heat = np.array([self.heat[n] for n in chunk])
+        centers = np.array([self.graph.node_center(graph.nodes[n]) for n in chunk], dtype=np.float64)
+
+        far_cells, far_mass, far_centroids = self._far_field()
+
+        neighborhoods: Dict[Tuple[int, int], List[int]] = {}
+        slots = []
+        for cx, cy in map(tuple, cells.tolist()):
+            cell_slots = neighborhoods.get((cx, cy))
+            if cell_slots is None:
+                cell_slots = neighborhoods[(cx, cy)] = [
+                    self._cell_slot((cx + dx, cy + dy)) for dx in (-1, 0, 1) for dy in (-1, 0, 1)
+                ]
+            slots.append(cell_slots)
+        if self._slot_table is None:
+            self._slot_table = (np.stack(self._slot_positions), np.stack(self._slot_weights))
+        table_positions, table_weights = self._slot_table
+        slots = np.array(slots, dtype=np.int64)
+        near_positions = table_positions[slots].reshape(len(chunk), -1, 2)
+        near_weights = table_weights[slots].reshape(len(chunk), -1)
+
+        spring_index, spring_positions, spring_weight = [], [], []
+        for i, node_id in enumerate(chunk):
+            for neighbor, data in graph[node_id].items():
+                if neighbor != node_id and neighbor in index.positions:
+                    spring_index.append(i)
+                    spring_positions.append(index.positions[neighbor])
+                    spring_weight.append(data.get("weight", 1.0))
+
+        displacement = compute_displacements(
+            positions, cells, heat, centers,
+            near_positions, near_weights, far_cells, far_mass, far_centroids,
+            np.array(spring_index, dtype=np.int64),
+            np.array(spring_positions, dtype=np.float64).reshape(-1, 2),
+            np.array(spring_weight, dtype=np.float64),
+            self._spring_constant()
+        )
+        new_positions = np.clip(positions + displacement, CANVAS_MIN, CANVAS_MAX)
+        moved = np.abs(new_positions - positions).max(axis=1) >= MIN_MOVE
+
+        updates = {}
+        for i, node_id in enumerate(chunk):
+            if moved[i]:
+                updates[node_id] = (float(new_positions[i, 0]), float(new_positions[i, 1]))
+            cooled = self.heat[node_id] * COOLING
+            if cooled < MIN_HEAT or not moved[i]:
+                del self.heat[node_id]
+            else:
+                self.heat[node_id] = cooled
+                self._queue.append(node_id)
+
+        if updates:
+            self.graph.move_nodes(updates)
+            self.pending_moves.update(updates)
+            self.nodes_moved += len(updates)
+        self.iterations += 1
+
+    def drain_moves(self) -> Dict[str, Tuple[float, float]]:
+        moves, self.pending_moves = self.pending_moves, {}
+        return moves
+
+    async def run(self, interval: float = LAYOUT_TICK_SECONDS):
+        while True:
+            await asyncio.sleep(interval)
+            if self._queue:
+                try:
+                    self.tick()
+                except Exception as e:
+                    print(f"Layout tick error: {e}")
+
+    def get_stats(self) -> Dict:
+        return {
+            "active_nodes": self.active_count,
+            "iterations": self.iterations,
+            "nodes_moved": self.nodes_moved,
+            "last_tick_ms": self.last_tick_ms,
+            "budget_ms": self.budget * 1000
+        }
+
+
+layout_engine = LayoutEngine(graph_service)
@@ -1,32 +1,214 @@
 import os
 import json
-from typing import Dict, Optional, List
+import time
+import copy
+import asyncio
+from typing import Dict, Optional, List, Tuple
+import groq
 from groq import AsyncGroq
 from dotenv import load_dotenv
 
+from .analysis_cache import analysis_cache, cache_key
+from ..utils.batching import BatchCoalescer
+from ..utils.rate_limit import TokenBucket, backoff_delay, parse_retry_after
+
 load_dotenv()
 
+LLM_MODEL = os.getenv("WITNESS_LLM_MODEL", "llama-3.3-70b-versatile")
+# Point at server.utils.fake_groq for load and backoff testing
+GROQ_BASE_URL = os.getenv("WITNESS_GROQ_BASE_URL") or None
+# Account limits to stay under; 0 disables a limit
+LLM_REQUESTS_PER_MINUTE = float(os.getenv("WITNESS_LLM_RPM", "30"))
+LLM_TOKENS_PER_MINUTE = float(os.getenv("WITNESS_LLM_TPM", "12000"))
+# Longest idle stretch whose unused budget may be spent at once
+LLM_BURST_SECONDS = float(os.getenv("WITNESS_LLM_BURST_SECONDS", "10"))
+LLM_MAX_IN_FLIGHT = int(os.getenv("WITNESS_LLM_MAX_IN_FLIGHT", "4"))
+LLM_MAX_RETRIES = int(os.getenv("WITNESS_LLM_MAX_RETRIES", "4"))
+LLM_RETRY_BASE_SECONDS = float(os.getenv("WITNESS_LLM_RETRY_BASE", "0.5"))
+LLM_RETRY_MAX_SECONDS = 30.0
+# Completion tokens budgeted per analysed item before the real usage is known
+OUTPUT_TOKENS_PER_ITEM = 120
+# Bump whenever the prompt or system message changes, so cached analyses are not reused
+PROMPT_VERSION = "1"
+# Items packed into one completion; 1 sends every item on its own
+LLM_BATCH_SIZE = int(os.getenv("WITNESS_LLM_BATCH_SIZE", "8"))
+# Longest an item waits for its batch to fill
+LLM_BATCH_WAIT_MS = float(os.getenv("WITNESS_LLM_BATCH_WAIT_MS", "50"))
+MAX_CONTENT_CHARS = 2000
+
+
+class LLMUnavailableError(Exception):
+    """The analysis could not be obtained, even after retries."""
+
+
+def estimate_tokens(text: str) -> int:
+    # ~4 characters per token for English; good enough for pacing
+    return len(text) // 4 + 1
+
+
+CLUSTERS = ("spiritual", "ai", "cultural", "political", "tech", "abstract")
+SYSTEM_PROMPT = "You are a Memetic Analyst AI. You act as an impartial observer of the Noosphere. Output JSON only."
+
+
+def validate_analysis(item) -> Optional[Dict]:
+    """A cleaned-up analysis, or None if the item is missing fields or has the wrong shape."""
+    if not isinstance(item, dict):
+        return None
+    summary = item.get("summary")
+    cluster = str(item.get("cluster", "")).strip().lower()
+    concepts = item.get("concepts")
+    try:
+        virality = int(round(float(item.get("virality"))))
+    except (TypeError, ValueError):
+        return None
+    if not isinstance(summary, str) or not summary.strip() or cluster not in CLUSTERS or not isinstance(concepts, list):
+        return None
+    return {
+        "summary": summary.strip(),
+        "cluster": cluster,
+        "virality": min(max(virality, 0), 100),
+        "concepts": [str(concept) for concept in concepts if concept][:5]
+    }
+
+
 class LLMService:
-    def __init__(self):
-        self.api_key = os.getenv("GROQ_API_KEY")
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        base_url: Optional[str] = GROQ_BASE_URL,
+        requests_per_minute: float = LLM_REQUESTS_PER_MINUTE,
+        tokens_per_minute: float = LLM_TOKENS_PER_MINUTE,
+        max_in_flight: int = LLM_MAX_IN_FLIGHT,
+        max_retries: int = LLM_MAX_RETRIES,
+        batch_size: int = LLM_BATCH_SIZE
+    ):
+        self.api_key = api_key or os.getenv("GROQ_API_KEY")
         self.client = None
+        self.calls = 0
+        self.errors = 0
+        self.failures = 0
+        self.retries = 0
+        self.rate_limited = 0
+        self.throttled_seconds = 0.0
+        self.call_ms = 0.0
+        self.batch_fallbacks = 0
+        self.coalesced = 0
+        self.max_retries = max_retries
+        self.requests = TokenBucket(requests_per_minute, LLM_BURST_SECONDS)
+        self.tokens = TokenBucket(tokens_per_minute, LLM_BURST_SECONDS)
+        self.max_in_flight = max_in_flight
+        self.in_flight = 0
+        self._slots = asyncio.Semaphore(max_in_flight)
+        self.batcher = BatchCoalescer(self._analyze_batch, batch_size, LLM_BATCH_WAIT_MS / 1000)
+        self._inflight: Dict[str, asyncio.Future] = {}
         if self.api_key:
-            self.client = AsyncGroq(api_key=self.api_key)
+            # Retries are ours (paced by the limiter), not the SDK's
+            self.client = AsyncGroq(api_key=self.api_key, base_url=base_url, max_retries=0)
         else:
             print("WARNING: GROQ_API_KEY not found. LLM features will be limited.")
 
     async def analyze_content(self, text: str, source: str) -> Dict:
         """
         Analyzes content to extract a meme summary, cluster, and virality score.
+        Results are cached on normalized content, source, prompt version and model.
+        Concurrent calls are packed into batched completions; identical in-flight
+        content shares one request. Raises LLMUnavailableError when no analysis could be
+        had, rather than inventing one.
         """
         if not self.client:
             return self._mock_analysis(text)
 
+        key = cache_key(text[:MAX_CONTENT_CHARS], source, PROMPT_VERSION, LLM_MODEL)
+        cached = await analysis_cache.get(key)
+        if cached is not None:
+            return cached
+
+        future = self._inflight.get(key)
+        if future is None:
+            if self.batcher.max_size > 1:
+                future = self.batcher.submit((text, source, key))
+            else:
+                future = asyncio.ensure_future(self._analyze_single(text, source, key))
+            self._inflight[key] = future
+            future.add_done_callback(lambda _: self._inflight.pop(key, None))
+        else:
+            self.coalesced += 1
+        # Callers may share one result; each gets its own copy
+        return copy.deepcopy(await asyncio.shield(future))
+
+    @staticmethod
+    def _retry_after(error: Exception) -> Optional[float]:
+        response = getattr(error, "response", None)
+        if response is None:
+            return None
+        retry_after_ms = parse_retry_after(response.headers.get("retry-after-ms"))
+        if retry_after_ms is not None:
+            return retry_after_ms / 1000
+        return parse_retry_after(response.headers.get("retry-after"))
+
+    @staticmethod
+    def _retryable(error: Exception) -> bool:
+        if isinstance(error, groq.APIStatusError):
+            return error.status_code == 429 or error.status_code >= 500
+        return isinstance(error, groq.APIConnectionError)
+
+    async def _complete(self, prompt: str, items: int = 1) -> Tuple[Dict, float]:
+        """
+        One chat completion, paced by the request and token buckets, with at most
+        max_in_flight running. 429s, 5xx and connection errors are retried with jittered
+        backoff (at least Retry-After); raises LLMUnavailableError once retries run out.
+        """
+        estimate = estimate_tokens(SYSTEM_PROMPT + prompt) + OUTPUT_TOKENS_PER_ITEM * items
+        for attempt in range(self.max_retries + 1):
+            waited, _ = await self.requests.acquire(1)
+            self.throttled_seconds += waited
+            waited, charged = await self.tokens.acquire(estimate)
+            self.throttled_seconds += waited
+            try:
+                async with self._slots:
+                    self.in_flight += 1
+                    start = time.perf_counter()
+                    try:
+                        completion = await self.client.chat.completions.create(
+                            messages=[
+                                {"role": "system", "content": SYSTEM_PROMPT},
+                                {"role": "user", "content": prompt}
+                            ],
+                            model=LLM_MODEL,
+                            temperature=0.5,
+                            response_format={"type": "json_object"}
+                        )
+                    finally:
+                        self.in_flight -= 1
+                    latency_ms = (time.perf_counter() - start) * 1000
+            except Exception as e:
+                if isinstance(e, groq.RateLimitError):
+                    self.rate_limited += 1
+                if not self._retryable(e):
+                    self.failures += 1
+                    raise LLMUnavailableError(str(e)) from e
+                if attempt == self.max_retries:
+                    self.failures += 1
+                    raise LLMUnavailableError(f"gave up after {attempt + 1} attempts: {e}") from e
+                self.retries += 1
+                await asyncio.sleep(backoff_delay(attempt, LLM_RETRY_BASE_SECONDS, LLM_RETRY_MAX_SECONDS, self._retry_after(e)))
+                continue
+
+            self.calls += 1
+            self.call_ms += latency_ms
+            usage = getattr(completion, "usage", None)
+            if usage is not None and getattr(usage, "total_tokens", None):
+                self.tokens.adjust(usage.total_tokens - charged)
+            else:
+                self.tokens.adjust(estimate - charged)
+            return json.loads(completion.choices[0].message.content), latency_ms
+
+    async def _analyze_single(self, text: str, source: str, key: str) -> Dict:
         prompt = f"""
         Analyze this {source} content for the "Noosphere": a map of human thought.
-        
-        Content: "{text[:2000]}"
-        
+
+        Content: "{text[:MAX_CONTENT_CHARS]}"
+
         Return JSON only:
         {{
             "summary": "1 sentence distinct meme/idea summary",
@@ -37,24 +219,80 @@ class LLMService:
         """
 
         try:
-            completion = await self.client.chat.completions.create(
-                messages=[
-                    {"role": "system", "content": "You are a Memetic Analyst AI. You act as an impartial observer of the Noosphere. Output JSON only."},
-                    {"role": "user", "content": prompt}
-                ],
-                model="llama-3.3-70b-versatile",
-                temperature=0.5,
-                response_format={"type": "json_object"}
-            )
-            
-            result = json.loads(completion.choices[0].message.content)
-            return result
+            result, latency_ms = await self._complete(prompt)
+        except LLMUnavailableError:
+            raise
         except Exception as e:
-            print(f"LLM Error: {e}")
-            return self._mock_analysis(text)
+            # A reply that is not JSON; the caller decides what to fall back to
+            self.errors += 1
+            raise LLMUnavailableError(f"unreadable analysis: {e}") from e
+
+        analysis = validate_analysis(result)
+        if analysis is None:
+            # Off-list cluster, missing fields or a non-numeric score; never cache it
+            self.errors += 1
+            raise LLMUnavailableError(f"invalid analysis: {json.dumps(result)[:200]}")
+        await analysis_cache.put(key, analysis, latency_ms)
+        return analysis
+
+    async def _analyze_batch(self, items: List[Tuple[str, str, str]]) -> List[Dict]:
+        """One completion for several (text, source, key) items; items it gets wrong are retried singly."""
+        if len(items) == 1:
+            return [await self._analyze_single(*items[0])]
+
+        contents = [
+            {"index": i, "source": source, "content": text[:MAX_CONTENT_CHARS]}
+            for i, (text, source, _) in enumerate(items)
+        ]
+        prompt = f"""
+        Analyze each of these {len(items)} items for the "Noosphere": a map of human thought.
+
+        Items: {json.dumps(contents, ensure_ascii=False)}
+
+        Return JSON only, with exactly one result per item, echoing its index:
+        {{
+            "results": [
+                {{
+                    "index": 0,
+                    "summary": "1 sentence distinct meme/idea summary",
+                    "cluster": "one of: {', '.join(CLUSTERS)}",
+                    "virality": (0-100 integer score based on provocative nature),
+                    "concepts": ["3", "key", "concepts"]
+                }}
+            ]
+        }}
+        """
+
+        results: List[Optional[Dict]] = [None] * len(items)
+        latency_ms = 0.0
+        try:
+            data, latency_ms = await self._complete(prompt, len(items))
+            entries = data.get("results") if isinstance(data, dict) else None
+            for entry in entries if isinstance(entries, list) else []:
+                index = entry.get("index") if isinstance(entry, dict) else None
+                if isinstance(index, int) and 0 <= index < len(items) and results[index] is None:
+                    results[index] = validate_analysis(entry)
+        except LLMUnavailableError:
+            # Retries already ran out; sending each item on its own would only add load
+            raise
+        except Exception as e:
+            self.errors += 1
+            print(f"LLM batch error: {e}")
+
+        for (_, _, key), result in zip(items, results):
+            if result is not None:
+                await analysis_cache.put(key, result, latency_ms / len(items))
+
+        failed = [i for i, result in enumerate(results) if result is None]
+        if failed:
+            self.batch_fallbacks += len(failed)
+            singles = await asyncio.gather(*(self._analyze_single(*items[i]) for i in failed), return_exceptions=True)
+            for i, result in zip(failed, singles):
+                results[i] = result
+        return results
 
     def _mock_analysis(self, text: str) -> Dict:
-        # Fallback if no API key or error
+        # Stand-in when no API key is configured
         return {
             "summary": text[:50] + "...",
             "cluster": "default",
@@ -62,4 +300,27 @@ class LLMService:
             "concepts": ["keyword"]
         }
 
+    def get_stats(self) -> Dict:
+        return {
+            "model": LLM_MODEL,
+            "prompt_version": PROMPT_VERSION,
+            "enabled": self.client is not None,
+            "calls": self.calls,
+            "errors": self.errors,
+            "failures": self.failures,
+            "retries": self.retries,
+            "rate_limited": self.rate_limited,
+            "throttled_seconds": round(self.throttled_seconds, 2),
+            "in_flight": self.in_flight,
+            "max_in_flight": self.max_in_flight,
+            "avg_call_ms": round(self.call_ms / self.calls, 1) if self.calls else 0.0,
+            "batch_size": self.batcher.max_size,
+            "batches": self.batcher.batches,
+            "batched_items": self.batcher.items,
+            "mean_batch_size": self.batcher.mean_batch_size,
+            "batch_fallbacks": self.batch_fallbacks,
+            "coalesced": self.coalesced,
+            "cache": analysis_cache.get_stats()
+        }
+
 llm_service = LLMService()
@@ -1,54 +1,253 @@
 from typing import Dict, List, Optional, Callable
+from collections import OrderedDict
 from datetime import datetime
 import uuid
 import asyncio
 import json
+import math
+import os
+import time
 
+from .cluster_cascade import cluster_cascade
 from .embedding_service import embedding_service
 from .graph_service import graph_service
-from .llm_service import llm_service
+from .llm_service import llm_service, LLMUnavailableError
+from .stream_clusterer import stream_clusterer
+from .system_monitor import system_monitor
+from .trending_service import trending_service
+from ..utils.pipeline import Pipeline, Stage
+
+# Items waiting to be embedded; past this POST /api/v1/ingest answers 429
+INGEST_QUEUE_SIZE = int(os.getenv("WITNESS_INGEST_QUEUE_SIZE", "1000"))
+# Embedding is CPU-bound: a few workers, each embedding a batch per model call
+EMBED_WORKERS = int(os.getenv("WITNESS_EMBED_WORKERS", "2"))
+EMBED_BATCH_SIZE = int(os.getenv("WITNESS_EMBED_BATCH_SIZE", "32"))
+# The LLM is I/O-bound: many calls waiting at once, so the client can batch and pace them
+ANALYZE_WORKERS = int(os.getenv("WITNESS_ANALYZE_WORKERS", "32"))
+# Placed items waiting for the LLM; past this placement waits, and ingest behind it
+MAX_PENDING_ENRICHMENTS = int(os.getenv("WITNESS_MAX_PENDING_ENRICHMENTS", "1000"))
+# Queues between the other stages
+STAGE_QUEUE_SIZE = int(os.getenv("WITNESS_STAGE_QUEUE_SIZE", "256"))
+# Finished jobs kept for GET /api/v1/ingest/{job_id}
+JOB_HISTORY = 10_000
+MAX_RETRY_AFTER_SECONDS = 60
+
+
+class IngestQueueFull(Exception):
+    """The ingest queue is at capacity; try again after `retry_after` seconds."""
+
+    def __init__(self, retry_after: float):
+        super().__init__(retry_after)
+        self.retry_after = retry_after
 
 
 class MemeProcessor:
-    def __init__(self):
+    """
+    Ingest runs as a pipeline of stages joined by bounded queues, each with its own
+    concurrency: "embed" (CPU, batched model calls), "place" (the single writer that
+    classifies, adds and links the node and broadcasts it), "analyze" (LLM calls, many
+    in flight) and "update" (the single writer applying analyses). A full queue holds
+    the stage before it, so a slow LLM backs up into the ingest queue and its 429s
+    rather than into memory.
+    """
+
+    def __init__(
+        self,
+        queue_size: int = INGEST_QUEUE_SIZE,
+        embed_workers: int = EMBED_WORKERS,
+        embed_batch_size: int = EMBED_BATCH_SIZE,
+        analyze_workers: int = ANALYZE_WORKERS,
+        max_pending_enrichments: int = MAX_PENDING_ENRICHMENTS
+    ):
         self.processed_count = 0
-        self.queue: List[Dict] = []
+        self.analysis_fallbacks = 0
+        self.enriched_count = 0
+        self.enrichment_ms = 0.0
+        self.bulk_items = 0
+        self.jobs: "OrderedDict[str, Dict]" = OrderedDict()
+        self.jobs_completed = 0
+        self.jobs_failed = 0
+        self.jobs_rejected = 0
         self.subscribers = set()
+        self.cascade = cluster_cascade
+        self.pipeline = Pipeline([
+            Stage("embed", self._embed_stage, embed_workers, queue_size, embed_batch_size),
+            Stage("place", self._place_stage, 1, STAGE_QUEUE_SIZE),
+            Stage("analyze", self._analyze_stage, analyze_workers, max_pending_enrichments),
+            Stage("update", self._update_stage, 1, STAGE_QUEUE_SIZE)
+        ], on_error=self._item_failed)
+    
+    def _new_job(self, source: str) -> Dict:
+        job = {
+            "job_id": uuid.uuid4().hex[:12],
+            "status": "queued",
+            "source": source,
+            "submitted_at": time.time(),
+            "started_at": None,
+            "finished_at": None,
+            "meme_id": None,
+            "error": None
+        }
+        self.jobs[job["job_id"]] = job
+        while len(self.jobs) > JOB_HISTORY:
+            self.jobs.popitem(last=False)
+        return job
+    
+    def _new_item(self, content: str, source: str, metadata: Optional[dict], job: Optional[Dict] = None, wait: bool = False) -> Dict:
+        return {
+            "content": content,
+            "source": source,
+            "metadata": metadata,
+            "job": job,
+            # Resolved with the meme event once the node is placed, for callers that wait
+            "future": asyncio.get_event_loop().create_future() if wait else None
+        }
+    
+    def submit(self, content: str, source: str, metadata: Optional[dict] = None) -> Dict:
+        """Queues an item without waiting. Raises IngestQueueFull when the queue is at capacity."""
+        if self.pipeline.head.queue.full():
+            self.jobs_rejected += 1
+            raise IngestQueueFull(self.retry_after())
+        job = self._new_job(source)
+        self.pipeline.head.put_nowait(self._new_item(content, source, metadata, job))
+        return dict(job, queue_depth=self.pipeline.head.depth)
+    
+    async def enqueue(self, content: str, source: str, metadata: Optional[dict] = None) -> Dict:
+        """Queues an item, waiting for room: backpressure for internal producers like the crawler."""
+        job = self._new_job(source)
+        await self.pipeline.head.put(self._new_item(content, source, metadata, job))
+        return dict(job)
+    
+    def get_job(self, job_id: str) -> Optional[Dict]:
+        job = self.jobs.get(job_id)
+        return dict(job) if job else None
+    
+    def retry_after(self) -> int:
+        """Seconds until the ingest queue has likely drained enough to take more, from recent throughput."""
+        rate = self.pipeline.head.throughput()
+        estimate = self.pipeline.head.depth / rate if rate else 1.0
+        return int(min(max(math.ceil(estimate), 1), MAX_RETRY_AFTER_SECONDS))
+    
+    def start_workers(self) -> List[asyncio.Task]:
+        return self.pipeline.start()
+    
+    def queue_stats(self) -> Dict:
+        head = self.pipeline.head
+        stages = self.pipeline.stages
+        return {
+            "queue_depth": head.depth,
+            "queue_capacity": head.queue.maxsize,
+            "ingest_workers": sum(stage.concurrency for stage in stages),
+            "workers_busy": sum(stage.busy for stage in stages),
+            # The busiest stage bounds the whole pipeline
+            "worker_utilisation": round(max(stage.utilisation() for stage in stages), 4),
+            "queue_wait_ms": head.wait.snapshot()["mean_ms"],
+            "queue_wait_p95_ms": head.wait.percentile(0.95),
+            "jobs_completed": self.jobs_completed,
+            "jobs_failed": self.jobs_failed,
+            "jobs_rejected": self.jobs_rejected
+        }
     
     async def process_raw_content(self, content: str, source: str, metadata: Optional[dict] = None) -> Dict:
-        meme_id = str(uuid.uuid4())[:8]
-        
-        # 1. Generate Embedding (still useful for graph topology)
+        """
+        Runs an item through the pipeline and returns its meme event once the node is added,
+        linked and broadcast, with a locally inferred cluster and the raw text as label. The
+        LLM summary, cluster, virality and concepts follow in the background as a
+        "meme_update" event, so callers never wait on the LLM. Items the cascade places
+        confidently from keywords or centroids skip the LLM, bar a sampled audit.
+        """
+        item = self._new_item(content, source, metadata, wait=True)
+        await self.pipeline.head.put(item)
+        return await item["future"]
+    
+    async def process_batch(self, items: List[Dict]) -> List[Dict]:
+        """
+        Bulk path for backfills: queues a batch of {"content", "source", "metadata"} items
+        (the embed stage batches them into model calls) and waits until each is placed.
+        Returns one {"id"} or {"error"} per item, in order, so one bad item does not fail
+        the batch.
+        """
+        queued = []
+        for item in items:
+            queued.append(self._new_item(item["content"], item.get("source", "Web"), item.get("metadata"), wait=True))
+            await self.pipeline.head.put(queued[-1])
+        events = await asyncio.gather(*(item["future"] for item in queued), return_exceptions=True)
+        self.bulk_items += len(items)
+        return [{"error": str(event)} if isinstance(event, Exception) else {"id": event["id"]} for event in events]
+    
+    def _item_failed(self, item: Dict, error: Exception):
+        if item.get("future") is not None and not item["future"].done():
+            item["future"].set_exception(error)
+        job = item.get("job")
+        if job is not None and job["status"] != "done":
+            job["status"] = "failed"
+            job["error"] = str(error)
+            job["finished_at"] = time.time()
+            self.jobs_failed += 1
+    
+    async def _embed_stage(self, items: List[Dict]) -> List[Dict]:
+        started = time.time()
+        for item in items:
+            if item["job"] is not None:
+                item["job"]["status"] = "processing"
+                item["job"]["started_at"] = started
         loop = asyncio.get_event_loop()
-        embedding = await loop.run_in_executor(None, embedding_service.generate_embedding, content)
-        
-        # 2. LLM Analysis (The Brain)
-        analysis = await llm_service.analyze_content(content, source)
-        
-        # Extract fields from LLM result
-        summary = analysis.get("summary", content[:100])
-        cluster = analysis.get("cluster", "default")
-        virality = analysis.get("virality", 50)
-        tags = analysis.get("concepts", [])
+        embeddings = await loop.run_in_executor(
+            None, embedding_service.generate_embeddings, [item["content"] for item in items]
+        )
+        for item, embedding in zip(items, embeddings):
+            item["embedding"] = embedding
+        return items
+    
+    async def _place_stage(self, items: List[Dict]) -> List[Optional[Dict]]:
+        outputs = []
+        for item in items:
+            try:
+                outputs.append(await self._place(item))
+            except Exception as e:
+                outputs.append(e)
+        return outputs
+    
+    async def _place(self, item: Dict) -> Optional[Dict]:
+        """Adds, links and broadcasts the node; passes the item on to the LLM stages if it needs analysis."""
+        content, source, metadata, embedding = item["content"], item["source"], item["metadata"], item["embedding"]
+        meme_id = str(uuid.uuid4())[:8]
+        label = content[:100]
+        decision = await self.cascade.classify(content, embedding)
+        cluster = decision["cluster"]
+        virality = 50
+        audit = decision["resolved"] and self.cascade.should_audit()
+        enrich = llm_service.client is not None and (not decision["resolved"] or audit)
+        if decision["resolved"]:
+            self.cascade.resolved[decision["stage"]] += 1
+        elif not enrich:
+            self.cascade.resolved["unanalysed"] += 1
         
         meme_event = {
             "id": meme_id,
             "source": source,
-            "content": summary, # Use the intelligent summary
+            "content": label, # Replaced by the LLM summary in the update event
+            "cluster": cluster,
             "timestamp": datetime.utcnow().isoformat() + "Z",
             "virality": virality,
             "url": metadata.get("url") if metadata else None,
-            "tags": tags,
+            "tags": [],
             "embedding": embedding,
-            "full_text": content # Keep original text in case needed
+            "full_text": content, # Keep original text in case needed
+            "enrichment": "pending" if enrich else "local",
+            "cluster_stage": decision["stage"] if decision["resolved"] else "local"
         }
         
-        # 3. Update Graph
+        # 2. Update Graph (topic placement from the streaming clusterer, O(k*D))
+        topic = stream_clusterer.observe(embedding)
         graph_service.add_node(
             node_id=meme_id,
-            label=summary,
+            label=label,
             cluster=cluster,
-            embedding=embedding
+            embedding=embedding,
+            virality=virality,
+            source=source,
+            topic=topic
         )
         
         similar_nodes = graph_service.find_similar_nodes(meme_id, threshold=0.5)
@@ -60,74 +259,90 @@ class MemeProcessor:
         
         self.processed_count += 1
         
-        # 4. Broadcast
-        await self._broadcast_meme(meme_event)
-        
-        return meme_event
-    
-    # _infer_cluster_semantic is arguably obsolete with LLM, but keeping as fallback or removing?
-    # For now, we can remove it or just leave it unused. I'll remove it to clean up.
-
-        # Define anchor texts for each cluster
-        anchors = {
-            "spiritual": "soul spirit consciousness awakening meditation divine sacred mystical enlightenment god non-duality",
-            "ai": "artificial intelligence machine learning neural networks algorithm singularity automation llm gpt",
-            "cultural": "meme viral trend culture society generation zeitgeist social media internet",
-            "political": "politics government democracy policy election voting law rights"
-        }
-        
-        best_cluster = "default"
-        max_score = -1.0
-        
-        # We can cache these anchor embeddings, but for now generating them on fly (or lazy loading) is okay 
-        # as this is per-item processing. Optimization: Cache anchor embeddings in __init__.
-        
-        loop = asyncio.get_event_loop()
-        
-        for cluster, anchor_text in anchors.items():
-            # In a real app, cache these!
-            anchor_emb = await loop.run_in_executor(None, embedding_service.generate_embedding, anchor_text)
-            score = embedding_service.cosine_similarity(embedding, anchor_emb)
-            
-            if score > max_score:
-                max_score = score
-                best_cluster = cluster
-        
-        # Fallback to keyword matching if confidence is low
-        if max_score < 0.2:
-            return self._infer_cluster_keyword(content)
-            
-        return best_cluster
-
-    def _infer_cluster_keyword(self, content: str) -> str:
-        content_lower = content.lower()
+        # 3. Broadcast
+        self._broadcast_meme(meme_event)
         
-        spiritual_keywords = ["soul", "spirit", "consciousness", "awakening", "meditation", "divine", "sacred", "mystical", "enlightenment"]
-        ai_keywords = ["ai", "artificial intelligence", "machine learning", "gpt", "neural", "algorithm", "automation", "singularity"]
-        cultural_keywords = ["meme", "viral", "trend", "culture", "society", "generation", "zeitgeist"]
-        political_keywords = ["politics", "government", "election", "democracy", "policy", "vote"]
+        if item["future"] is not None and not item["future"].done():
+            item["future"].set_result(meme_event)
+        job = item["job"]
+        if job is not None:
+            job["status"] = "done"
+            job["meme_id"] = meme_id
+            job["finished_at"] = time.time()
+            self.jobs_completed += 1
         
-        scores = {
-            "spiritual": sum(1 for k in spiritual_keywords if k in content_lower),
-            "ai": sum(1 for k in ai_keywords if k in content_lower),
-            "cultural": sum(1 for k in cultural_keywords if k in content_lower),
-            "political": sum(1 for k in political_keywords if k in content_lower)
+        # 4. LLM Analysis (The Brain), in the stages after this one
+        if not enrich:
+            trending_service.record([], cluster, topic, source)
+            return None
+        return {
+            "meme_id": meme_id,
+            "content": content,
+            "source": source,
+            "embedding": embedding,
+            "decision": decision,
+            "topic": topic,
+            "enrich_started": time.perf_counter()
         }
+    
+    async def _analyze_stage(self, items: List[Dict]) -> List[Dict]:
+        for item in items:
+            try:
+                item["analysis"] = await llm_service.analyze_content(item["content"], item["source"])
+            except LLMUnavailableError:
+                # The node keeps its local cluster rather than a made-up analysis
+                item["analysis"] = None
+        return items
+    
+    async def _update_stage(self, items: List[Dict]) -> List[None]:
+        for item in items:
+            await self._apply_analysis(item)
+        return [None] * len(items)
+    
+    async def _apply_analysis(self, item: Dict):
+        meme_id, content, source, decision, topic = item["meme_id"], item["content"], item["source"], item["decision"], item["topic"]
+        cluster = decision["cluster"]
+        analysis = item["analysis"]
+        if analysis is None:
+            self.analysis_fallbacks += 1
+            if not decision["resolved"]:
+                self.cascade.resolved["fallback"] += 1
+            trending_service.record([], cluster, topic, source)
+            self._broadcast_meme({"id": meme_id, "enrichment": "failed"}, "meme_update")
+            return
         
-        max_score = max(scores.values())
-        if max_score > 0:
-            for cluster, score in scores.items():
-                if score == max_score:
-                    return cluster
+        summary = analysis.get("summary", content[:100])
+        cluster = analysis.get("cluster", cluster)
+        if decision["resolved"]:
+            self.cascade.record_audit(decision["stage"], decision["cluster"], cluster)
+        else:
+            self.cascade.resolved["llm"] += 1
+        self.cascade.learn(item["embedding"], cluster)
+        virality = analysis.get("virality", 50)
+        tags = analysis.get("concepts", [])
+        
+        graph_service.update_node(meme_id, label=summary, cluster=cluster, virality=virality)
+        trending_service.record(tags, cluster, topic, source)
+        self.enriched_count += 1
+        self.enrichment_ms += (time.perf_counter() - item["enrich_started"]) * 1000
         
-        return "default"
+        self._broadcast_meme({
+            "id": meme_id,
+            "content": summary,
+            "cluster": cluster,
+            "virality": virality,
+            "tags": tags,
+            "enrichment": "done"
+        }, "meme_update")
     
-    async def _broadcast_meme(self, meme_event: Dict):
+    def _broadcast_meme(self, meme_event: Dict, kind: str = "meme"):
+        # Subscribers only queue the event (see Fanout); nothing here waits on a client.
+        # They are long-lived services, so a failure skips this event, not the subscriber.
         for subscriber in list(self.subscribers):
             try:
-                await subscriber(meme_event)
-            except Exception:
-                self.subscribers.discard(subscriber)
+                subscriber(meme_event, kind)
+            except Exception as e:
+                system_monitor.log("MEME-PROCESSOR", "WARN", f"{kind} subscriber failed: {e}")
     
     def subscribe(self, callback):
         self.subscribers.add(callback)
@@ -138,7 +353,16 @@ class MemeProcessor:
     def get_stats(self) -> Dict:
         return {
             "processed_count": self.processed_count,
-            "queue_depth": len(self.queue),
+            "analysis_fallbacks": self.analysis_fallbacks,
+            "enrichment_pending": sum(
+                self.pipeline.by_name[name].depth + self.pipeline.by_name[name].busy for name in ("analyze", "update")
+            ),
+            "enriched_count": self.enriched_count,
+            "bulk_items": self.bulk_items,
+            "avg_enrichment_ms": round(self.enrichment_ms / self.enriched_count, 1) if self.enriched_count else 0.0,
+            "cascade": self.cascade.get_stats(),
+            **self.queue_stats(),
+            "pipeline": self.pipeline.get_stats(),
             "graph_nodes": graph_service.graph.number_of_nodes(),
             "graph_edges": graph_service.graph.number_of_edges()
         }
@@ -0,0 +1,188 @@
+from typing import Dict, List, Optional
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+import asyncio
+import multiprocessing
+import os
+import shutil
+import tempfile
+import time
+import uuid
+
+import numpy as np
+
+from .graph_algorithms import similarity_topk_block
+from .graph_service import graph_service, GraphService
+from .shared_embeddings import shared_embeddings
+from .system_monitor import system_monitor
+
+RELINK_WORKERS = int(os.getenv("WITNESS_RELINK_WORKERS", "1"))
+RELINK_BLOCK_ROWS = int(os.getenv("WITNESS_RELINK_BLOCK_ROWS", "2048"))
+# Defaults match the links MemeProcessor makes at insert time
+RELINK_DEFAULT_K = 3
+RELINK_DEFAULT_THRESHOLD = 0.5
+MAX_JOBS_KEPT = 20
+
+
+class RelinkService:
+    """
+    Rebuilds the semantic edge set from scratch: top-k cosine neighbours for every node
+    via a blocked matrix multiply, then one atomic swap through GraphService.replace_edges.
+    Blocks run in a thread (workers=1) or a spawned process pool that memory-maps the
+    shared embedding matrix when it is enabled, else a temporary copy of it.
+    """
+
+    def __init__(self, graph: GraphService):
+        self.graph = graph
+        self.jobs: Dict[str, Dict] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(
+        self,
+        k: int = RELINK_DEFAULT_K,
+        threshold: float = RELINK_DEFAULT_THRESHOLD,
+        workers: int = RELINK_WORKERS,
+        block_rows: int = RELINK_BLOCK_ROWS
+    ) -> Optional[Dict]:
+        """Starts a job and returns it, or None if one is already running."""
+        if self.running:
+            return None
+        job = {
+            "id": str(uuid.uuid4())[:8],
+            "status": "queued",
+            "k": k,
+            "threshold": threshold,
+            "workers": workers,
+            "nodes": 0,
+            "blocks_total": 0,
+            "blocks_done": 0,
+            "rows_done": 0,
+            "rows_per_second": 0.0,
+            "progress": 0.0,
+            "edges_removed": None,
+            "edges_added": None,
+            "started_at": datetime.utcnow().isoformat() + "Z",
+            "finished_at": None,
+            "duration_seconds": None,
+            "error": None
+        }
+        self.jobs[job["id"]] = job
+        while len(self.jobs) > MAX_JOBS_KEPT:
+            del self.jobs[next(iter(self.jobs))]
+        self._task = asyncio.create_task(self._run(job, block_rows))
+        return job
+
+    def get_job(self, job_id: str) -> Optional[Dict]:
+        return self.jobs.get(job_id)
+
+    async def _run(self, job: Dict, block_rows: int):
+        start = time.perf_counter()
+        job["status"] = "running"
+        workdir = None
+        executor = None
+        handle = None
+        try:
+            shared = shared_embeddings.writer is not None
+            if shared:
+                # Rows appended after this point are simply not part of the job; growth or
+                # compaction meanwhile moves the writer on but leaves this generation in place
+                handle = shared_embeddings.pin()
+                ids, _, alive = shared_embeddings.view()
+                live = int(np.count_nonzero(alive))
+            else:
+                ids, matrix = self.graph.export_embeddings()
+                norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+                matrix = np.divide(matrix, norms, out=np.zeros_like(matrix), where=norms > 0)
+                live = len(ids)
+            n = len(ids)
+            blocks = [(s, min(n, s + block_rows)) for s in range(0, n, block_rows)]
+            job.update(nodes=live, blocks_total=len(blocks))
+
+            loop = asyncio.get_event_loop()
+            pooled = job["workers"] > 1 and len(blocks) > 1
+            if shared:
+                source = handle
+            elif pooled:
+                workdir = tempfile.mkdtemp(prefix="witness-relink-")
+                source = os.path.join(workdir, "embeddings.npy")
+                await loop.run_in_executor(None, np.save, source, matrix)
+            else:
+                source = matrix
+            if pooled:
+                executor = ProcessPoolExecutor(
+                    max_workers=job["workers"], mp_context=multiprocessing.get_context("spawn")
+                )
+
+            async def run_block(block_start: int, block_end: int):
+                result = await loop.run_in_executor(
+                    executor, similarity_topk_block, source, block_start, block_end, job["k"], job["threshold"]
+                )
+                job["blocks_done"] += 1
+                job["rows_done"] += block_end - block_start
+                job["progress"] = job["rows_done"] / n
+                job["rows_per_second"] = job["rows_done"] / max(time.perf_counter() - start, 1e-9)
+                return result
+
+            # Threads share the GIL-free matmul; processes get one block in flight each
+            parallel = job["workers"] if executor else 1
+            results = []
+            for i in range(0, len(blocks), parallel):
+                results += await asyncio.gather(*(run_block(s, e) for s, e in blocks[i:i + parallel]))
+
+            if results:
+                src = np.concatenate([r[0] for r in results])
+                dst = np.concatenate([r[1] for r in results])
+                scores = np.concatenate([r[2] for r in results])
+            else:
+                src = dst = np.zeros(0, dtype=np.int64)
+                scores = np.zeros(0, dtype=np.float32)
+
+            # Undirected: keep each pair once, with its best score
+            lo, hi = np.minimum(src, dst), np.maximum(src, dst)
+            order = np.lexsort((-scores, hi, lo))
+            lo, hi, scores = lo[order], hi[order], scores[order]
+            first = np.ones(len(lo), dtype=np.bool_)
+            first[1:] = (lo[1:] != lo[:-1]) | (hi[1:] != hi[:-1])
+            lo, hi, scores = lo[first], hi[first], scores[first]
+
+            swap = self.graph.replace_edges(
+                ids,
+                [ids[i] for i in lo.tolist()],
+                [ids[i] for i in hi.tolist()],
+                scores.astype(np.float64).tolist()
+            )
+            job.update(status="completed", edges_removed=swap["removed"], edges_added=swap["added"], progress=1.0)
+            system_monitor.log(
+                "RELINK", "SUCCESS",
+                f"Re-linked {live} nodes: {swap['removed']} edges replaced by {swap['added']} "
+                f"({job['rows_per_second']:.0f} rows/s)"
+            )
+        except asyncio.CancelledError:
+            job["status"] = "cancelled"
+            raise
+        except Exception as e:
+            job.update(status="failed", error=str(e))
+            system_monitor.log("RELINK", "WARN", f"Re-link job {job['id']} failed: {e}")
+        finally:
+            job["finished_at"] = datetime.utcnow().isoformat() + "Z"
+            job["duration_seconds"] = time.perf_counter() - start
+            if executor:
+                executor.shutdown(wait=False, cancel_futures=True)
+            if workdir:
+                shutil.rmtree(workdir, ignore_errors=True)
+            if handle:
+                shared_embeddings.release(handle)
+
+    def shutdown(self):
+        if self._task:
+            self._task.cancel()
+
+    def list_jobs(self) -> List[Dict]:
+        return list(self.jobs.values())
+
+
+relink_service = RelinkService(graph_service)
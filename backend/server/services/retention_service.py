@@ -0,0 +1,219 @@
+from typing import Dict, List, Optional
+from datetime import datetime
+import asyncio
+import json
+import os
+import time
+
+import numpy as np
+
+from .graph_persistence import DATA_DIR
+from .graph_service import graph_service, GraphService
+from .system_monitor import system_monitor
+
+# 0 disables a limit; with every limit at 0 the graph grows without bound as before
+MAX_NODES = int(os.getenv("WITNESS_MAX_NODES", "0"))
+MAX_GRAPH_BYTES = int(os.getenv("WITNESS_MAX_GRAPH_BYTES", "0"))
+NODE_TTL_SECONDS = float(os.getenv("WITNESS_NODE_TTL", "0"))
+# Which nodes go first once over budget: "least_recently_linked", "virality_decay" or "oldest"
+EVICTION_POLICY = os.getenv("WITNESS_EVICTION_POLICY", "least_recently_linked")
+VIRALITY_HALF_LIFE_SECONDS = float(os.getenv("WITNESS_VIRALITY_HALF_LIFE", "86400"))
+ARCHIVE_EVICTED = os.getenv("WITNESS_ARCHIVE_EVICTED", "0") not in ("0", "false", "no")
+RETENTION_INTERVAL_SECONDS = float(os.getenv("WITNESS_RETENTION_INTERVAL", "10"))
+
+EVICTION_POLICIES = ("least_recently_linked", "virality_decay", "oldest")
+# Evict down to this fraction of the budget so a full graph is not trimmed on every pass
+LOW_WATER_MARK = 0.9
+MAX_EVICTIONS_PER_PASS = 50_000
+
+
+def eviction_scores(
+    policy: str,
+    now: float,
+    created_at: np.ndarray,
+    last_linked: np.ndarray,
+    virality: np.ndarray,
+    half_life: float = VIRALITY_HALF_LIFE_SECONDS
+) -> np.ndarray:
+    """Lower score = evicted sooner."""
+    if policy == "oldest":
+        return created_at
+    if policy == "virality_decay":
+        # Virality halves every half-life since the node last gained an edge; +1 keeps
+        # zero-virality nodes ordered by recency instead of all tying at 0
+        age = np.maximum(now - last_linked, 0.0)
+        return (virality.astype(np.float64) + 1.0) * np.exp2(-age / half_life)
+    return last_linked
+
+
+class RetentionService:
+    """
+    Keeps the in-memory graph within a node-count / byte budget and drops nodes past their
+    TTL. Evictions go through GraphService.remove_nodes, so the spatial index, layout,
+    persistence log and stats all see them; removed ids are queued for loom clients.
+    """
+
+    def __init__(
+        self,
+        graph: GraphService,
+        max_nodes: int = MAX_NODES,
+        max_bytes: int = MAX_GRAPH_BYTES,
+        ttl: float = NODE_TTL_SECONDS,
+        policy: str = EVICTION_POLICY,
+        archive: bool = ARCHIVE_EVICTED,
+        data_dir: str = DATA_DIR
+    ):
+        if policy not in EVICTION_POLICIES:
+            raise ValueError(f"Unknown eviction policy: {policy}")
+        self.graph = graph
+        self.max_nodes = max_nodes
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.policy = policy
+        self.archive = archive
+        self.archive_dir = os.path.join(data_dir, "archive")
+        # Nodes restored from checkpoints that predate timestamps count as created now
+        self.started_at = time.time()
+        self.pending_removals: Dict[str, tuple] = {}
+        self.evicted = {"ttl": 0, "budget": 0}
+        self.archived = 0
+        self.passes = 0
+        self.last_pass_ms = 0.0
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.max_nodes or self.max_bytes or self.ttl)
+
+    def target_nodes(self) -> Optional[int]:
+        targets = []
+        if self.max_nodes:
+            targets.append(self.max_nodes)
+        if self.max_bytes:
+            targets.append(int(self.max_bytes / max(self.graph.bytes_per_node(), 1.0)))
+        return min(targets) if targets else None
+
+    def select_evictions(self, now: Optional[float] = None) -> Dict[str, List[str]]:
+        """Ids to evict, grouped by reason. Pure selection; the graph is not touched."""
+        now = time.time() if now is None else now
+        ids, columns = self.graph.node_columns(["created_at", "last_linked", "virality"])
+        n = len(ids)
+        selected = {"ttl": [], "budget": []}
+        if n == 0:
+            return selected
+
+        created = columns["created_at"].astype(np.float64)
+        created[created <= 0] = self.started_at
+        linked = columns["last_linked"].astype(np.float64)
+        linked = np.where(linked <= 0, created, linked)
+
+        expired = created < now - self.ttl if self.ttl else np.zeros(n, dtype=np.bool_)
+        survivors = np.nonzero(~expired)[0]
+        selected["ttl"] = [ids[i] for i in np.nonzero(expired)[0].tolist()]
+
+        target = self.target_nodes()
+        if target is not None and len(survivors) > target:
+            excess = len(survivors) - int(target * LOW_WATER_MARK)
+            scores = eviction_scores(self.policy, now, created[survivors], linked[survivors], columns["virality"][survivors])
+            if excess < len(survivors):
+                victims = np.argpartition(scores, excess)[:excess]
+            else:
+                victims = np.arange(len(survivors))
+            selected["budget"] = [ids[i] for i in survivors[victims].tolist()]
+        return selected
+
+    async def enforce(self) -> int:
+        """One retention pass. Returns the number of nodes evicted."""
+        if not self.enabled:
+            return 0
+        start = time.perf_counter()
+        now = time.time()
+        selected = self.select_evictions(now)
+        budget = MAX_EVICTIONS_PER_PASS
+        total = 0
+        for reason, ids in selected.items():
+            ids = ids[:budget]
+            budget -= len(ids)
+            if not ids:
+                continue
+            records = self._archive_records(ids, reason, now) if self.archive else None
+            positions = {node_id: self.graph.spatial_index.positions.get(node_id) for node_id in ids}
+            removed = self.graph.remove_nodes(ids)
+            for node_id in removed:
+                self.pending_removals[node_id] = positions[node_id]
+            self.evicted[reason] += len(removed)
+            total += len(removed)
+            if records:
+                loop = asyncio.get_event_loop()
+                await loop.run_in_executor(None, self._write_archive, records, now)
+                self.archived += len(records)
+
+        self.passes += 1
+        self.last_pass_ms = (time.perf_counter() - start) * 1000
+        if total:
+            system_monitor.log(
+                "RETENTION", "INFO",
+                f"Evicted {total} nodes (policy={self.policy}); {self.graph.graph.number_of_nodes()} remain"
+            )
+        return total
+
+    def _archive_records(self, ids: List[str], reason: str, now: float) -> List[Dict]:
+        graph = self.graph.graph
+        records = []
+        for node_id in ids:
+            if not graph.has_node(node_id):
+                continue
+            data = graph.nodes[node_id]
+            embedding = data.get("embedding") or []
+            records.append({
+                "id": node_id,
+                "label": data.get("label", ""),
+                "cluster": data.get("cluster", "default"),
+                "x": float(data.get("x", 50)),
+                "y": float(data.get("y", 50)),
+                "virality": float(data.get("virality", 0)),
+                "created_at": float(data.get("created_at", 0)),
+                "last_linked": float(data.get("last_linked", 0)),
+                "embedding": [float(v) for v in embedding],
+                "edges": [[neighbor, float(attrs.get("weight", 1.0))] for neighbor, attrs in graph[node_id].items()],
+                "evicted_at": now,
+                "reason": reason
+            })
+        return records
+
+    def _write_archive(self, records: List[Dict], now: float):
+        os.makedirs(self.archive_dir, exist_ok=True)
+        day = datetime.utcfromtimestamp(now).strftime("%Y%m%d")
+        with open(os.path.join(self.archive_dir, f"evicted-{day}.jsonl"), "a") as f:
+            for record in records:
+                f.write(json.dumps(record, separators=(",", ":")) + "\n")
+
+    def drain_removals(self) -> Dict[str, tuple]:
+        removals, self.pending_removals = self.pending_removals, {}
+        return removals
+
+    async def run(self, interval: float = RETENTION_INTERVAL_SECONDS):
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.enforce()
+            except Exception as e:
+                system_monitor.log("RETENTION", "WARN", f"Retention pass failed: {e}")
+
+    def get_stats(self) -> Dict:
+        return {
+            "enabled": self.enabled,
+            "policy": self.policy,
+            "max_nodes": self.max_nodes,
+            "max_bytes": self.max_bytes,
+            "ttl_seconds": self.ttl,
+            "target_nodes": self.target_nodes(),
+            "node_count": self.graph.graph.number_of_nodes(),
+            "memory_bytes": self.graph.memory_bytes(),
+            "evicted": dict(self.evicted),
+            "archived": self.archived,
+            "passes": self.passes,
+            "last_pass_ms": self.last_pass_ms
+        }
+
+
+retention_service = RetentionService(graph_service)
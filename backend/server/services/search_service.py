@@ -0,0 +1,97 @@
+from typing import Dict, Optional, Tuple
+from collections import OrderedDict
+import asyncio
+import os
+import time
+
+import numpy as np
+
+from .embedding_service import embedding_service
+from .graph_service import graph_service, GraphService
+
+QUERY_CACHE_SIZE = int(os.getenv("WITNESS_SEARCH_CACHE_SIZE", "1024"))
+
+
+class SearchService:
+    """Top-k semantic search over node embeddings, with an LRU cache of query embeddings."""
+
+    def __init__(self, graph: GraphService, cache_size: int = QUERY_CACHE_SIZE):
+        self.graph = graph
+        self.cache_size = cache_size
+        self._query_cache: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.searches = 0
+
+    @staticmethod
+    def _cache_key(query: str) -> str:
+        return " ".join(query.lower().split())
+
+    async def embed_query(self, query: str) -> Tuple[np.ndarray, bool]:
+        key = self._cache_key(query)
+        vector = self._query_cache.get(key)
+        if vector is not None:
+            self._query_cache.move_to_end(key)
+            self.cache_hits += 1
+            return vector, True
+
+        self.cache_misses += 1
+        loop = asyncio.get_event_loop()
+        embedding = await loop.run_in_executor(None, embedding_service.generate_embedding, query)
+        vector = np.asarray(embedding, dtype=np.float32)
+        self._query_cache[key] = vector
+        while len(self._query_cache) > self.cache_size:
+            self._query_cache.popitem(last=False)
+        return vector, False
+
+    async def search(
+        self,
+        query: str,
+        k: int = 10,
+        cluster: Optional[str] = None,
+        source: Optional[str] = None,
+        since: Optional[float] = None,
+        until: Optional[float] = None,
+        min_score: float = 0.0
+    ) -> Dict:
+        start = time.perf_counter()
+        vector, cached = await self.embed_query(query)
+        embed_ms = (time.perf_counter() - start) * 1000
+
+        matches, candidates = self.graph.search_embeddings(vector, k, cluster, source, since, until, min_score)
+        results = []
+        for rank, (node_id, score) in enumerate(matches, start=1):
+            node = self.graph.get_node(node_id)
+            data = self.graph.graph.nodes[node_id]
+            results.append({
+                "rank": rank,
+                "score": score,
+                "id": node_id,
+                "label": node["metadata"]["label"],
+                "cluster": node["metadata"]["cluster"],
+                "source": node["metadata"]["source"],
+                "created_at": data.get("created_at", 0),
+                "x": node["x"],
+                "y": node["y"]
+            })
+        self.searches += 1
+
+        return {
+            "query": query,
+            "results": results,
+            "candidates": candidates,
+            "query_cached": cached,
+            "embed_ms": embed_ms,
+            "took_ms": (time.perf_counter() - start) * 1000
+        }
+
+    def get_stats(self) -> Dict:
+        return {
+            "searches": self.searches,
+            "query_cache_size": len(self._query_cache),
+            "query_cache_hits": self.cache_hits,
+            "query_cache_misses": self.cache_misses
+        }
+
+
+search_service = SearchService(graph_service)
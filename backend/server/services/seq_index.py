@@ -0,0 +1,61 @@
+from typing import Dict, Iterable, Iterator, List, Tuple
+import bisect
+
+
+class SeqIndex:
+    """
+    Node ids in insertion-sequence order, so cursor pagination starts with a bisect
+    instead of scanning the graph. Sequences only grow, so adds are appends; removals
+    are lazy (an entry counts while `seq_of[id]` still equals its seq) and the dead
+    entries are dropped in one rebuild once they outnumber the live ones. Readers on
+    another thread see a consistent list while the event loop appends.
+    """
+
+    def __init__(self):
+        self.seq_of: Dict[str, int] = {}
+        # (seqs, ids), swapped as one tuple on rebuild
+        self._entries: Tuple[List[int], List[str]] = ([], [])
+        self._dead = 0
+
+    def __len__(self) -> int:
+        return len(self.seq_of)
+
+    def add(self, node_id: str, seq: int):
+        if node_id in self.seq_of:
+            self._dead += 1
+        self.seq_of[node_id] = seq
+        seqs, ids = self._entries
+        if not seqs or seq > seqs[-1]:
+            seqs.append(seq)
+            ids.append(node_id)
+        else:
+            # Only explicit sequences (log replay) can arrive out of order
+            i = bisect.bisect_right(seqs, seq)
+            seqs.insert(i, seq)
+            ids.insert(i, node_id)
+
+    def discard(self, node_id: str):
+        if self.seq_of.pop(node_id, None) is None:
+            return
+        self._dead += 1
+        if self._dead > max(1024, len(self.seq_of)):
+            self.rebuild(self.seq_of.items())
+
+    def rebuild(self, pairs: Iterable[Tuple[str, int]]):
+        """Replaces the index with (id, seq) pairs."""
+        entries = sorted((seq, node_id) for node_id, seq in pairs)
+        self.seq_of = {node_id: seq for seq, node_id in entries}
+        self._entries = ([seq for seq, _ in entries], [node_id for _, node_id in entries])
+        self._dead = 0
+
+    def after(self, cursor: int) -> Iterator[Tuple[int, str]]:
+        """Live (seq, id) with seq > cursor, in seq order."""
+        seqs, ids = self._entries
+        seq_of = self.seq_of
+        i = bisect.bisect_right(seqs, cursor)
+        # Lengths are re-read each step: the loop may append while a thread iterates
+        while i < len(ids):
+            seq, node_id = seqs[i], ids[i]
+            if seq_of.get(node_id) == seq:
+                yield seq, node_id
+            i += 1
@@ -0,0 +1,113 @@
+from typing import Dict, List, Optional, Tuple
+import os
+
+import numpy as np
+
+from .graph_persistence import DATA_DIR
+from .graph_service import graph_service, GraphService
+from .shared_matrix import SharedMatrixWriter
+from .system_monitor import system_monitor
+
+SHARED_EMBEDDINGS_ENABLED = os.getenv("WITNESS_SHARED_EMBEDDINGS", "0") not in ("0", "false", "no")
+# tmpfs when available, so the "files" are plain shared memory pages
+SHARED_EMBEDDINGS_DIR = os.getenv(
+    "WITNESS_SHARED_EMBEDDINGS_DIR",
+    "/dev/shm/witness-embeddings" if os.path.isdir("/dev/shm") else os.path.join(DATA_DIR, "shm")
+)
+# Rewrite without deleted rows once they make up this share of the matrix
+COMPACT_DELETED_FRACTION = 0.5
+
+
+class SharedEmbeddings:
+    """
+    Mirrors node embeddings, L2-normalised, into a SharedMatrixWriter so other processes
+    (re-link workers, anything holding a SharedMatrixReader on the directory) get them
+    without a copy. Follows the graph through its mutation listener; a restored graph is
+    loaded in one rebuild.
+    """
+
+    def __init__(self, graph: GraphService, directory: str = SHARED_EMBEDDINGS_DIR, enabled: bool = SHARED_EMBEDDINGS_ENABLED):
+        self.graph = graph
+        self.directory = directory
+        self.enabled = enabled
+        self.writer: Optional[SharedMatrixWriter] = None
+        self.rows: Dict[str, int] = {}
+        self.compactions = 0
+
+    @staticmethod
+    def _normalise(matrix: np.ndarray) -> np.ndarray:
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        return np.divide(matrix, norms, out=np.zeros_like(matrix), where=norms > 0)
+
+    def start(self):
+        if not self.enabled or self.writer is not None:
+            return
+        self.writer = SharedMatrixWriter(self.directory)
+        self.rebuild()
+        self.graph.add_listener(self._on_mutation)
+        system_monitor.log("SHARED-EMBEDDINGS", "INFO", f"Embedding matrix shared at {self.directory} ({len(self.rows)} rows)")
+
+    def rebuild(self):
+        ids, matrix = self.graph.export_embeddings()
+        self.writer.rebuild(ids, self._normalise(matrix))
+        self.rows = {node_id: row for row, node_id in enumerate(ids)}
+
+    def _on_mutation(self, version: int, op: str, payload: Dict):
+        if op == "add_node" and payload.get("embedding"):
+            vector = self._normalise(np.asarray(payload["embedding"], dtype=np.float32)[None, :])[0]
+            row = self.writer.append(payload["id"], vector)
+            if row is not None:
+                self.rows[payload["id"]] = row
+        elif op == "remove_nodes":
+            self.writer.delete([self.rows.pop(node_id) for node_id in payload["ids"] if node_id in self.rows])
+            if self.writer.deleted > COMPACT_DELETED_FRACTION * max(self.writer.rows, 1):
+                self.writer.compact()
+                self.rows = {node_id: row for row, node_id in enumerate(self.writer.ids)}
+                self.compactions += 1
+
+    def view(self) -> Tuple[List[str], np.ndarray, np.ndarray]:
+        """(row ids, normalised matrix, alive mask), all zero-copy, as of now."""
+        return self.writer.view()
+
+    @property
+    def handle(self) -> Dict:
+        """What a reader in another process needs to open exactly the current rows."""
+        return {
+            "directory": self.directory,
+            "generation": self.writer.generation,
+            "rows": self.writer.rows,
+            "dim": self.writer.dim
+        }
+
+    def pin(self) -> Dict:
+        """handle, with its generation kept on disk until release(handle)."""
+        handle = self.handle
+        self.writer.pin(handle["generation"])
+        return handle
+
+    def release(self, handle: Dict):
+        if self.writer is not None:
+            self.writer.release(handle["generation"])
+
+    def close(self):
+        if self.writer is not None:
+            self.graph.remove_listener(self._on_mutation)
+            self.writer.close()
+            self.writer = None
+
+    def get_stats(self) -> Dict:
+        if self.writer is None:
+            return {"enabled": self.enabled}
+        return {
+            "enabled": True,
+            "directory": self.directory,
+            "generation": self.writer.generation,
+            "rows": self.writer.rows,
+            "deleted": self.writer.deleted,
+            "capacity": self.writer.capacity,
+            "dim": self.writer.dim,
+            "compactions": self.compactions
+        }
+
+
+shared_embeddings = SharedEmbeddings(graph_service)
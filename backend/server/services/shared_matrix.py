@@ -0,0 +1,277 @@
+"""
+Append-only float32 matrix in memory-mapped files that other processes map read-only.
+
+Files in the matrix directory:
+    header          int64[8], guarded by a sequence lock (odd while the writer updates it)
+    matrix-<g>.f32  (capacity, dim) float32 rows of generation g
+    alive-<g>.u8    (capacity,) uint8, cleared when a row is deleted
+    ids-<g>.txt     one row id per line, in row order
+
+A generation is a fixed-capacity set of files. Appends fill the current generation and
+become visible once the header row count passes them; growing or compacting writes a
+whole new generation and then flips the header to it. Readers therefore only ever see
+fully written rows, and a mapping they already hold stays valid after the flip.
+
+Only NumPy and the standard library are imported, so worker processes can use this
+without loading the service layer.
+"""
+from typing import Dict, Iterable, List, Optional, Tuple
+import os
+import time
+
+import numpy as np
+
+HEADER_FIELDS = ("lock", "generation", "rows", "capacity", "dim", "deleted")
+_LOCK, _GENERATION, _ROWS, _CAPACITY, _DIM, _DELETED = range(len(HEADER_FIELDS))
+HEADER_SIZE = 8
+# Superseded generations kept on disk so a reader that is about to open one still can
+KEEP_GENERATIONS = 2
+# What close() removes; the directory may be shared with other files
+_OWN_FILE_PREFIXES = ("matrix-", "alive-", "ids-")
+
+
+def _paths(directory: str, generation: int) -> Dict[str, str]:
+    return {
+        "matrix": os.path.join(directory, f"matrix-{generation}.f32"),
+        "alive": os.path.join(directory, f"alive-{generation}.u8"),
+        "ids": os.path.join(directory, f"ids-{generation}.txt"),
+    }
+
+
+def _map(path: str, dtype, shape, mode: str) -> np.ndarray:
+    # mmap cannot map an empty file (e.g. a matrix whose width is not known yet)
+    if 0 in shape:
+        return np.zeros(shape, dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode=mode, shape=shape)
+
+
+def read_header(header: np.ndarray) -> Dict[str, int]:
+    """A consistent copy of the header (spins while the writer is mid-update)."""
+    while True:
+        before = int(header[_LOCK])
+        if before % 2 == 0:
+            values = header.copy()
+            if int(header[_LOCK]) == before:
+                return dict(zip(HEADER_FIELDS, (int(v) for v in values[:len(HEADER_FIELDS)])))
+        time.sleep(0)
+
+
+def open_generation(directory: str, generation: int, rows: int, dim: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Read-only (matrix, alive) views of the first `rows` rows of one generation."""
+    paths = _paths(directory, generation)
+    capacity = os.path.getsize(paths["alive"])
+    matrix = _map(paths["matrix"], np.float32, (capacity, dim), "r")
+    alive = _map(paths["alive"], np.uint8, (capacity,), "r")
+    return matrix[:rows], alive[:rows]
+
+
+class SharedMatrixWriter:
+    """The single writer. Not thread-safe; call it from one thread (the event loop)."""
+
+    def __init__(self, directory: str, initial_capacity: int = 1024):
+        self.directory = directory
+        self.initial_capacity = initial_capacity
+        os.makedirs(directory, exist_ok=True)
+        header_path = os.path.join(directory, "header")
+        with open(header_path, "wb") as f:
+            f.write(b"\0" * (8 * HEADER_SIZE))
+        self.header = np.memmap(header_path, dtype=np.int64, mode="r+", shape=(HEADER_SIZE,))
+        self.generation = 0
+        self.rows = 0
+        self.capacity = 0
+        self.dim = 0
+        self.deleted = 0
+        self.ids: List[str] = []
+        self._matrix: Optional[np.ndarray] = None
+        self._alive: Optional[np.ndarray] = None
+        self._ids_file = None
+        # generation -> holders that must keep it on disk (e.g. a running re-link job)
+        self._pins: Dict[int, int] = {}
+        # Superseded generations whose files are still on disk
+        self._retired: List[int] = []
+
+    def pin(self, generation: int):
+        """Keeps a generation's files on disk, however many newer ones follow, until released."""
+        self._pins[generation] = self._pins.get(generation, 0) + 1
+
+    def release(self, generation: int):
+        remaining = self._pins.get(generation, 0) - 1
+        if remaining > 0:
+            self._pins[generation] = remaining
+        else:
+            self._pins.pop(generation, None)
+        self._collect()
+
+    def _collect(self):
+        for generation in list(self._retired):
+            if generation <= self.generation - KEEP_GENERATIONS and generation not in self._pins:
+                for path in _paths(self.directory, generation).values():
+                    if os.path.exists(path):
+                        os.unlink(path)
+                self._retired.remove(generation)
+
+    def _publish(self):
+        header = self.header
+        header[_LOCK] += 1
+        header[_GENERATION] = self.generation
+        header[_ROWS] = self.rows
+        header[_CAPACITY] = self.capacity
+        header[_DIM] = self.dim
+        header[_DELETED] = self.deleted
+        header[_LOCK] += 1
+
+    def _new_generation(self, ids: List[str], matrix: np.ndarray, alive: np.ndarray, capacity: int):
+        generation = self.generation + 1
+        paths = _paths(self.directory, generation)
+        dim = matrix.shape[1]
+        for name, itemsize in (("matrix", 4 * dim), ("alive", 1)):
+            with open(paths[name], "wb") as f:
+                f.truncate(capacity * itemsize)
+        new_matrix = _map(paths["matrix"], np.float32, (capacity, dim), "r+")
+        new_alive = _map(paths["alive"], np.uint8, (capacity,), "r+")
+        new_matrix[:len(ids)] = matrix
+        new_alive[:len(ids)] = alive
+        ids_file = open(paths["ids"], "w", encoding="utf-8")
+        ids_file.write("".join(row_id + "\n" for row_id in ids))
+        ids_file.flush()
+
+        if self._ids_file:
+            self._ids_file.close()
+        if self.generation >= 1:
+            self._retired.append(self.generation)
+        self._matrix, self._alive, self._ids_file = new_matrix, new_alive, ids_file
+        self.ids = list(ids)
+        self.generation, self.rows, self.capacity, self.dim = generation, len(ids), capacity, dim
+        self.deleted = int(len(ids) - np.count_nonzero(alive))
+        self._publish()
+        self._collect()
+
+    def rebuild(self, ids: List[str], matrix: np.ndarray):
+        """Replaces the whole matrix with `matrix` (one row per id) as a new generation."""
+        matrix = np.asarray(matrix, dtype=np.float32)
+        if matrix.ndim != 2:
+            matrix = matrix.reshape(len(ids), -1)
+        capacity = max(self.initial_capacity, 2 * len(ids))
+        self._new_generation(ids, matrix, np.ones(len(ids), dtype=np.uint8), capacity)
+
+    def append(self, row_id: str, vector) -> Optional[int]:
+        """Adds a row and returns its index, or None if it does not match the matrix width."""
+        vector = np.asarray(vector, dtype=np.float32).ravel()
+        if self._matrix is None or (self.rows == 0 and len(vector) != self.dim):
+            self.rebuild([], np.zeros((0, len(vector)), dtype=np.float32))
+        if len(vector) != self.dim:
+            return None
+        if self.rows == self.capacity:
+            self._new_generation(self.ids, self._matrix[:self.rows], self._alive[:self.rows], 2 * self.capacity)
+        row = self.rows
+        self._matrix[row] = vector
+        self._alive[row] = 1
+        self._ids_file.write(row_id + "\n")
+        self._ids_file.flush()
+        self.ids.append(row_id)
+        # The row count goes up last: that is what makes the row visible
+        self.rows += 1
+        self._publish()
+        return row
+
+    def delete(self, rows: Iterable[int]):
+        rows = [row for row in rows if 0 <= row < self.rows and self._alive[row]]
+        if not rows:
+            return
+        self._alive[rows] = 0
+        self.deleted += len(rows)
+        self._publish()
+
+    def compact(self) -> Dict[int, int]:
+        """Drops deleted rows into a fresh generation. Returns old row -> new row for survivors."""
+        keep = np.nonzero(self._alive[:self.rows])[0]
+        remap = {int(old): new for new, old in enumerate(keep.tolist())}
+        ids = [self.ids[i] for i in keep.tolist()]
+        capacity = max(self.initial_capacity, 2 * len(ids))
+        self._new_generation(ids, self._matrix[keep], np.ones(len(ids), dtype=np.uint8), capacity)
+        return remap
+
+    def view(self) -> Tuple[List[str], np.ndarray, np.ndarray]:
+        if self._matrix is None:
+            return [], np.zeros((0, 0), dtype=np.float32), np.zeros(0, dtype=np.uint8)
+        return self.ids[:self.rows], self._matrix[:self.rows], self._alive[:self.rows]
+
+    def close(self, remove: bool = True):
+        if self._ids_file:
+            self._ids_file.close()
+            self._ids_file = None
+        self._matrix = self._alive = self.header = None
+        if remove:
+            for name in os.listdir(self.directory):
+                if name == "header" or name.startswith(_OWN_FILE_PREFIXES):
+                    os.unlink(os.path.join(self.directory, name))
+            try:
+                os.rmdir(self.directory)
+            except OSError:
+                # Not ours alone (or not empty): leave it
+                pass
+
+
+class SharedMatrixReader:
+    """
+    Read-only view for any process. refresh() picks up appended rows, deletions and new
+    generations; the arrays returned by view() are the mapped pages themselves.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.header = np.memmap(os.path.join(directory, "header"), dtype=np.int64, mode="r", shape=(HEADER_SIZE,))
+        self.state: Dict[str, int] = {}
+        self.generation = 0
+        self.ids: List[str] = []
+        self._matrix: Optional[np.ndarray] = None
+        self._alive: Optional[np.ndarray] = None
+        self._ids_offset = 0
+        self.refresh()
+
+    def refresh(self):
+        while True:
+            state = read_header(self.header)
+            if state["generation"] == self.generation:
+                break
+            paths = _paths(self.directory, state["generation"])
+            try:
+                self._matrix = _map(paths["matrix"], np.float32, (state["capacity"], state["dim"]), "r")
+                self._alive = _map(paths["alive"], np.uint8, (state["capacity"],), "r")
+            except FileNotFoundError:
+                # Superseded while we were catching up; the header has a newer generation
+                continue
+            self.generation = state["generation"]
+            self.ids = []
+            self._ids_offset = 0
+            break
+        self.state = state
+        if len(self.ids) < state["rows"]:
+            with open(_paths(self.directory, self.generation)["ids"], "rb") as f:
+                f.seek(self._ids_offset)
+                # Only whole lines; the writer may be partway through the next one
+                chunk = f.read()
+                complete = chunk[:chunk.rfind(b"\n") + 1]
+                self._ids_offset += len(complete)
+                self.ids.extend(complete.decode("utf-8").splitlines())
+
+    def view(self) -> Tuple[List[str], np.ndarray, np.ndarray]:
+        rows = min(self.state.get("rows", 0), len(self.ids))
+        if self._matrix is None or rows == 0:
+            return [], np.zeros((0, self.state.get("dim", 0)), dtype=np.float32), np.zeros(0, dtype=np.uint8)
+        return self.ids[:rows], self._matrix[:rows], self._alive[:rows]
+
+    def top_k(self, query, k: int = 10) -> List[Tuple[str, float]]:
+        """Highest dot products against live rows (cosine, for unit-normalised rows)."""
+        self.refresh()
+        ids, matrix, alive = self.view()
+        if not ids:
+            return []
+        scores = matrix @ np.asarray(query, dtype=np.float32)
+        scores[alive == 0] = -np.inf
+        k = min(k, int(np.count_nonzero(alive)))
+        if k <= 0:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return [(ids[i], float(scores[i])) for i in top.tolist()]
@@ -0,0 +1,104 @@
+from typing import Dict, Iterator, List, Set, Tuple
+import math
+
+
+class SpatialGrid:
+    """Uniform grid over the 0-100 loom canvas, keyed by integer cell coordinates."""
+
+    def __init__(self, cell_size: float = 5.0):
+        self.cell_size = cell_size
+        self.cells: Dict[Tuple[int, int], Set[str]] = {}
+        self.positions: Dict[str, Tuple[float, float]] = {}
+        # Per-cell [count, sum_x, sum_y] so callers can treat a cell as one point mass
+        self.cell_mass: Dict[Tuple[int, int], List[float]] = {}
+
+    def __len__(self) -> int:
+        return len(self.positions)
+
+    def __contains__(self, node_id: str) -> bool:
+        return node_id in self.positions
+
+    def _cell(self, x: float, y: float) -> Tuple[int, int]:
+        return (int(math.floor(x / self.cell_size)), int(math.floor(y / self.cell_size)))
+
+    def insert(self, node_id: str, x: float, y: float):
+        if node_id in self.positions:
+            self.move(node_id, x, y)
+            return
+        self.positions[node_id] = (x, y)
+        cell = self._cell(x, y)
+        self.cells.setdefault(cell, set()).add(node_id)
+        self._add_mass(cell, x, y, 1)
+
+    def move(self, node_id: str, x: float, y: float):
+        old = self.positions.get(node_id)
+        if old is None:
+            self.insert(node_id, x, y)
+            return
+        old_cell = self._cell(*old)
+        new_cell = self._cell(x, y)
+        self.positions[node_id] = (x, y)
+        if old_cell != new_cell:
+            self._discard_from_cell(old_cell, node_id)
+            self.cells.setdefault(new_cell, set()).add(node_id)
+        self._add_mass(old_cell, old[0], old[1], -1)
+        self._add_mass(new_cell, x, y, 1)
+
+    def remove(self, node_id: str):
+        old = self.positions.pop(node_id, None)
+        if old is not None:
+            cell = self._cell(*old)
+            self._discard_from_cell(cell, node_id)
+            self._add_mass(cell, old[0], old[1], -1)
+
+    def _add_mass(self, cell: Tuple[int, int], x: float, y: float, sign: int):
+        mass = self.cell_mass.get(cell)
+        if mass is None:
+            mass = self.cell_mass[cell] = [0, 0.0, 0.0]
+        mass[0] += sign
+        mass[1] += sign * x
+        mass[2] += sign * y
+        if mass[0] <= 0:
+            del self.cell_mass[cell]
+
+    def _discard_from_cell(self, cell: Tuple[int, int], node_id: str):
+        members = self.cells.get(cell)
+        if members is None:
+            return
+        members.discard(node_id)
+        if not members:
+            del self.cells[cell]
+
+    def cell_of(self, x: float, y: float) -> Tuple[int, int]:
+        return self._cell(x, y)
+
+    def _cells_in(self, x_min: float, y_min: float, x_max: float, y_max: float) -> Iterator[Tuple[int, int]]:
+        cx0, cy0 = self._cell(x_min, y_min)
+        cx1, cy1 = self._cell(x_max, y_max)
+        # Walk whichever is smaller: the covered cell range or the occupied cells
+        if (cx1 - cx0 + 1) * (cy1 - cy0 + 1) <= len(self.cells):
+            for cx in range(cx0, cx1 + 1):
+                for cy in range(cy0, cy1 + 1):
+                    if (cx, cy) in self.cells:
+                        yield (cx, cy)
+        else:
+            for cell in list(self.cells):
+                if cx0 <= cell[0] <= cx1 and cy0 <= cell[1] <= cy1:
+                    yield cell
+
+    def query(self, x_min: float, y_min: float, x_max: float, y_max: float) -> List[str]:
+        result = []
+        for cell in self._cells_in(x_min, y_min, x_max, y_max):
+            for node_id in self.cells[cell]:
+                x, y = self.positions[node_id]
+                if x_min <= x <= x_max and y_min <= y <= y_max:
+                    result.append(node_id)
+        return result
+
+    def nearby(self, x: float, y: float, radius: float) -> List[str]:
+        candidates = self.query(x - radius, y - radius, x + radius, y + radius)
+        r2 = radius * radius
+        return [
+            node_id for node_id in candidates
+            if (self.positions[node_id][0] - x) ** 2 + (self.positions[node_id][1] - y) ** 2 <= r2
+        ]
@@ -0,0 +1,225 @@
+from typing import Dict, List, Optional, Tuple
+import asyncio
+import math
+import os
+import time
+
+import numpy as np
+
+from .graph_persistence import DATA_DIR, graph_persistence
+from .graph_service import graph_service, GraphService
+from .system_monitor import system_monitor
+
+STREAM_CLUSTERS = int(os.getenv("WITNESS_STREAM_CLUSTERS", "8"))
+# An item less similar than this to every centroid opens a new cluster while slots remain
+NEW_CLUSTER_SIMILARITY = float(os.getenv("WITNESS_NEW_CLUSTER_SIMILARITY", "0.35"))
+CLUSTER_BATCH_SIZE = int(os.getenv("WITNESS_CLUSTER_BATCH_SIZE", "32"))
+CLUSTER_SNAPSHOT_INTERVAL_SECONDS = float(os.getenv("WITNESS_CLUSTER_SNAPSHOT_INTERVAL", "60"))
+
+# Discovered topics are laid out on a ring around the canvas centre
+TOPIC_RING_CENTER = (50.0, 50.0)
+TOPIC_RING_RADIUS = 30.0
+
+
+class StreamClusterer:
+    """
+    Online spherical mini-batch k-means over the embedding stream.
+
+    observe() assigns an item to its nearest centroid (one k x D mat-vec) and buffers it;
+    every CLUSTER_BATCH_SIZE items the centroids move towards the batch means with
+    per-centroid 1/count learning rates. Clusters are discovered on the fly up to k, and
+    centroids are snapshotted to disk so a restart never needs a pass over the graph.
+    """
+
+    def __init__(
+        self,
+        graph: GraphService,
+        k: int = STREAM_CLUSTERS,
+        batch_size: int = CLUSTER_BATCH_SIZE,
+        new_cluster_similarity: float = NEW_CLUSTER_SIMILARITY,
+        data_dir: str = DATA_DIR
+    ):
+        self.graph = graph
+        self.k = k
+        self.batch_size = batch_size
+        self.new_cluster_similarity = new_cluster_similarity
+        self.path = os.path.join(data_dir, "clusters", "centroids.npz")
+        self.centroids: Optional[np.ndarray] = None  # (active, D), unit rows
+        self.counts = np.zeros(0, dtype=np.int64)
+        self._buffer: List[np.ndarray] = []
+        self.items_seen = 0
+        self.batches = 0
+        self.snapshot_version = 0
+        self.last_snapshot_at: Optional[float] = None
+
+    @property
+    def active(self) -> int:
+        return 0 if self.centroids is None else len(self.centroids)
+
+    def center_of(self, topic: int) -> Tuple[float, float]:
+        angle = 2 * math.pi * (topic - 1) / max(self.k, 1)
+        return (
+            TOPIC_RING_CENTER[0] + TOPIC_RING_RADIUS * math.cos(angle),
+            TOPIC_RING_CENTER[1] + TOPIC_RING_RADIUS * math.sin(angle)
+        )
+
+    def _publish_centers(self):
+        self.graph.topic_centers = {topic: self.center_of(topic) for topic in range(1, self.active + 1)}
+
+    @staticmethod
+    def _unit(vector) -> Optional[np.ndarray]:
+        vector = np.asarray(vector, dtype=np.float32)
+        norm = float(np.linalg.norm(vector))
+        return vector / norm if norm > 0 else None
+
+    def assign(self, embedding) -> Tuple[int, float]:
+        """Nearest topic (1-based, 0 if none yet) and its cosine similarity; no learning."""
+        vector = self._unit(embedding)
+        if vector is None or self.centroids is None or len(vector) != self.centroids.shape[1]:
+            return 0, 0.0
+        scores = self.centroids @ vector
+        best = int(np.argmax(scores))
+        return best + 1, float(scores[best])
+
+    def observe(self, embedding) -> int:
+        """Assigns a new item to a topic and queues it for the next mini-batch update."""
+        vector = self._unit(embedding)
+        if vector is None:
+            return 0
+        if self.centroids is not None and len(vector) != self.centroids.shape[1]:
+            return 0
+        self.items_seen += 1
+
+        topic, similarity = self.assign(vector)
+        if topic == 0 or (similarity < self.new_cluster_similarity and self.active < self.k):
+            self._open_cluster(vector)
+            return self.active
+
+        self._buffer.append(vector)
+        if len(self._buffer) >= self.batch_size:
+            self.partial_fit()
+        return topic
+
+    def _open_cluster(self, vector: np.ndarray):
+        row = vector[None, :]
+        self.centroids = row.copy() if self.centroids is None else np.vstack([self.centroids, row])
+        self.counts = np.append(self.counts, 1)
+        self._publish_centers()
+
+    def partial_fit(self, batch: Optional[np.ndarray] = None):
+        """One mini-batch k-means step over `batch` (or the buffered items)."""
+        if batch is None:
+            if not self._buffer:
+                return
+            batch, self._buffer = np.vstack(self._buffer), []
+        if self.centroids is None or len(batch) == 0:
+            return
+        labels = np.argmax(batch @ self.centroids.T, axis=1)
+        k = len(self.centroids)
+        batch_counts = np.bincount(labels, minlength=k)
+        sums = np.zeros_like(self.centroids)
+        np.add.at(sums, labels, batch)
+
+        touched = batch_counts > 0
+        self.counts[touched] += batch_counts[touched]
+        # Per-centroid step size n_batch / n_total, i.e. a running mean of everything assigned
+        rate = (batch_counts[touched] / self.counts[touched])[:, None].astype(np.float32)
+        means = sums[touched] / batch_counts[touched][:, None]
+        updated = (1 - rate) * self.centroids[touched] + rate * means
+        norms = np.linalg.norm(updated, axis=1, keepdims=True)
+        self.centroids[touched] = np.divide(updated, norms, out=updated, where=norms > 0)
+        self.batches += 1
+
+    # --- snapshots --------------------------------------------------------------------
+
+    def snapshot(self):
+        """Writes the current centroids synchronously (used on shutdown)."""
+        self.partial_fit()
+        if self.centroids is not None:
+            self._write_snapshot(*self._snapshot_state())
+
+    def _snapshot_state(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        self.snapshot_version += 1
+        meta = np.array([self.snapshot_version, self.items_seen, self.batches], dtype=np.int64)
+        return self.centroids.copy(), self.counts.copy(), meta
+
+    def _write_snapshot(self, centroids: np.ndarray, counts: np.ndarray, meta: np.ndarray):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp = self.path + ".tmp.npz"
+        np.savez(tmp, centroids=centroids, counts=counts, meta=meta)
+        os.replace(tmp, self.path)
+        self.last_snapshot_at = time.time()
+
+    def restore(self) -> bool:
+        if not os.path.exists(self.path):
+            return False
+        with np.load(self.path) as data:
+            centroids = data["centroids"].astype(np.float32)
+            self.counts = data["counts"].astype(np.int64)
+            self.snapshot_version, self.items_seen, self.batches = (int(v) for v in data["meta"])
+        # k may have been lowered since the snapshot; keep the most populated clusters and
+        # renumber node topics to match (dropped topics become unassigned)
+        snapshot_clusters = len(centroids)
+        shrunk = snapshot_clusters > self.k
+        if shrunk:
+            keep = np.sort(np.argsort(-self.counts)[:self.k])
+            centroids, self.counts = centroids[keep], self.counts[keep]
+            mapping = {int(old) + 1: new + 1 for new, old in enumerate(keep.tolist())}
+            changed = self.graph.remap_topics(mapping)
+            system_monitor.log(
+                "STREAM-CLUSTER", "INFO",
+                f"Kept {self.k} of {snapshot_clusters} snapshot clusters; {changed} node topics remapped"
+            )
+        self.centroids = centroids
+        self._publish_centers()
+        if shrunk:
+            # The remap is logged; make it durable before the trimmed snapshot replaces the
+            # old one, so a restart does not apply it a second time
+            graph_persistence.flush()
+            self._write_snapshot(*self._snapshot_state())
+        return True
+
+    async def run(self, interval: float = CLUSTER_SNAPSHOT_INTERVAL_SECONDS):
+        loop = asyncio.get_event_loop()
+        while True:
+            await asyncio.sleep(interval)
+            self.partial_fit()
+            if self.centroids is None:
+                continue
+            # Copy on the loop, write in a thread
+            state = self._snapshot_state()
+            try:
+                await loop.run_in_executor(None, self._write_snapshot, *state)
+            except Exception as e:
+                system_monitor.log("STREAM-CLUSTER", "WARN", f"Centroid snapshot failed: {e}")
+
+    # --- reporting --------------------------------------------------------------------
+
+    def summary(self, members: int = 5) -> List[Dict]:
+        clusters = []
+        for i in range(self.active):
+            nearest, _ = self.graph.search_embeddings(self.centroids[i], members)
+            clusters.append({
+                "topic": i + 1,
+                "size": int(self.counts[i]),
+                "center": dict(zip(("x", "y"), self.center_of(i + 1))),
+                "members": [
+                    {"id": node_id, "label": self.graph.graph.nodes[node_id].get("label", ""), "score": score}
+                    for node_id, score in nearest
+                ]
+            })
+        return clusters
+
+    def get_stats(self) -> Dict:
+        return {
+            "k": self.k,
+            "active_clusters": self.active,
+            "items_seen": self.items_seen,
+            "batches": self.batches,
+            "buffered": len(self._buffer),
+            "snapshot_version": self.snapshot_version,
+            "last_snapshot_at": self.last_snapshot_at
+        }
+
+
+stream_clusterer = StreamClusterer(graph_service)
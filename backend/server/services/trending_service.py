@@ -0,0 +1,177 @@
+from typing import Dict, Iterable, List, Optional
+import math
+import os
+import time
+
+import numpy as np
+
+TRENDING_CAPACITY = int(os.getenv("WITNESS_TRENDING_CAPACITY", "512"))
+TRENDING_BUCKET_SECONDS = float(os.getenv("WITNESS_TRENDING_BUCKET_SECONDS", "60"))
+TRENDING_BUCKETS = int(os.getenv("WITNESS_TRENDING_BUCKETS", "60"))
+# Short and long decay horizons; "rising" compares the two rates
+FAST_HALF_LIFE_SECONDS = float(os.getenv("WITNESS_TRENDING_FAST_HALF_LIFE", "300"))
+SLOW_HALF_LIFE_SECONDS = float(os.getenv("WITNESS_TRENDING_SLOW_HALF_LIFE", "3600"))
+
+TRENDING_DIMENSIONS = ("concept", "cluster", "topic", "source")
+# Rebase forward-decay weights before exp() gets anywhere near float overflow
+_MAX_EXPONENT = 50.0
+
+
+class TrendSketch:
+    """
+    Space-Saving heavy hitters over a fixed number of slots. Each slot carries two
+    exponentially decayed counts (forward decay against a landmark, so an update touches
+    one slot) plus a ring of time buckets for an exact sliding-window count. Memory is
+    O(capacity * buckets) no matter how many distinct items stream through.
+    """
+
+    def __init__(
+        self,
+        capacity: int = TRENDING_CAPACITY,
+        buckets: int = TRENDING_BUCKETS,
+        bucket_seconds: float = TRENDING_BUCKET_SECONDS,
+        fast_half_life: float = FAST_HALF_LIFE_SECONDS,
+        slow_half_life: float = SLOW_HALF_LIFE_SECONDS
+    ):
+        self.capacity = capacity
+        self.buckets = buckets
+        self.bucket_seconds = bucket_seconds
+        self.fast_tau = fast_half_life / math.log(2)
+        self.slow_tau = slow_half_life / math.log(2)
+        self.items: List[Optional[str]] = [None] * capacity
+        self.index: Dict[str, int] = {}
+        self.fast = np.zeros(capacity)
+        self.slow = np.zeros(capacity)
+        self.error = np.zeros(capacity)
+        self.window = np.zeros((capacity, buckets), dtype=np.int32)
+        self.totals = np.zeros(buckets, dtype=np.int64)
+        self.landmark: Optional[float] = None
+        self.bucket: Optional[int] = None
+        self.updates = 0
+
+    def _advance(self, now: float):
+        if self.landmark is None:
+            self.landmark = now
+        elif (now - self.landmark) / self.fast_tau > _MAX_EXPONENT:
+            self.fast *= math.exp(-(now - self.landmark) / self.fast_tau)
+            self.slow *= math.exp(-(now - self.landmark) / self.slow_tau)
+            self.error *= math.exp(-(now - self.landmark) / self.slow_tau)
+            self.landmark = now
+
+        bucket = int(now // self.bucket_seconds)
+        if self.bucket is None:
+            self.bucket = bucket
+        elif bucket > self.bucket:
+            # Clear every bucket we skipped over (all of them after a long idle gap)
+            stale = [b % self.buckets for b in range(self.bucket + 1, min(bucket, self.bucket + self.buckets) + 1)]
+            self.window[:, stale] = 0
+            self.totals[stale] = 0
+            self.bucket = bucket
+
+    def add(self, item: str, now: float, weight: float = 1.0):
+        self._advance(now)
+        slot = self.index.get(item)
+        if slot is None:
+            if len(self.index) < self.capacity:
+                slot = len(self.index)
+            else:
+                # Space-Saving: the newcomer takes over the smallest counter and inherits
+                # its count as an over-estimate bound
+                slot = int(np.argmin(self.slow))
+                del self.index[self.items[slot]]
+                self.error[slot] = self.slow[slot]
+                self.fast[slot] = 0.0
+                self.window[slot] = 0
+            self.items[slot] = item
+            self.index[item] = slot
+
+        self.fast[slot] += weight * math.exp((now - self.landmark) / self.fast_tau)
+        self.slow[slot] += weight * math.exp((now - self.landmark) / self.slow_tau)
+        ring = self.bucket % self.buckets
+        self.window[slot, ring] += 1
+        self.totals[ring] += 1
+        self.updates += 1
+
+    def top(self, now: float, limit: int = 20, sort: str = "rising") -> List[Dict]:
+        n = len(self.index)
+        if n == 0:
+            return []
+        self._advance(now)
+        fast = self.fast[:n] * math.exp(-(now - self.landmark) / self.fast_tau)
+        slow = self.slow[:n] * math.exp(-(now - self.landmark) / self.slow_tau)
+        error = self.error[:n] * math.exp(-(now - self.landmark) / self.slow_tau)
+        # Short-horizon rate over long-horizon rate, damped so one-off mentions don't top it
+        rising = (fast / self.fast_tau) / (slow / self.slow_tau + 1e-9) * np.log1p(fast)
+        window = self.window[:n].sum(axis=1)
+        key = {"rising": rising, "volume": window, "decayed": slow}.get(sort, rising)
+
+        limit = min(limit, n)
+        order = np.argpartition(-key, limit - 1)[:limit] if limit < n else np.arange(n)
+        order = order[np.argsort(-key[order], kind="stable")]
+        return [
+            {
+                "item": self.items[i],
+                "rising": float(rising[i]),
+                "window_count": int(window[i]),
+                "decayed_count": float(slow[i]),
+                "recent_count": float(fast[i]),
+                "error": float(error[i])
+            }
+            for i in order.tolist()
+        ]
+
+    def window_totals(self) -> List[int]:
+        """Events per bucket, oldest first, ending with the current bucket."""
+        if self.bucket is None:
+            return []
+        current = self.bucket % self.buckets
+        return np.roll(self.totals, -(current + 1)).tolist()
+
+
+class TrendingService:
+    """Per-dimension trend sketches fed by MemeProcessor; queries never touch the graph."""
+
+    def __init__(self, capacity: int = TRENDING_CAPACITY):
+        self.sketches = {dimension: TrendSketch(capacity) for dimension in TRENDING_DIMENSIONS}
+
+    def record(
+        self,
+        concepts: Iterable[str] = (),
+        cluster: Optional[str] = None,
+        topic: Optional[int] = None,
+        source: Optional[str] = None,
+        now: Optional[float] = None
+    ):
+        now = time.time() if now is None else now
+        for concept in {str(c).strip().lower() for c in concepts if c and str(c).strip()}:
+            self.sketches["concept"].add(concept, now)
+        if cluster:
+            self.sketches["cluster"].add(cluster, now)
+        if topic:
+            self.sketches["topic"].add(str(topic), now)
+        if source:
+            self.sketches["source"].add(source, now)
+
+    def get_trending(self, dimension: str = "concept", limit: int = 20, sort: str = "rising") -> Dict:
+        sketch = self.sketches[dimension]
+        now = time.time()
+        return {
+            "dimension": dimension,
+            "sort": sort,
+            "items": sketch.top(now, limit, sort),
+            "window_seconds": sketch.buckets * sketch.bucket_seconds,
+            "window_totals": sketch.window_totals(),
+            "generated_at": now
+        }
+
+    def snapshot(self, limit: int = 10) -> Dict:
+        return {dimension: self.get_trending(dimension, limit)["items"] for dimension in TRENDING_DIMENSIONS}
+
+    def get_stats(self) -> Dict:
+        return {
+            dimension: {"tracked": len(sketch.index), "capacity": sketch.capacity, "updates": sketch.updates}
+            for dimension, sketch in self.sketches.items()
+        }
+
+
+trending_service = TrendingService()
@@ -0,0 +1,70 @@
+from typing import Any, Awaitable, Callable, List, Optional, Tuple
+import asyncio
+
+
+class BatchCoalescer:
+    """
+    Gathers items submitted by concurrent callers into batches for one handler call.
+    A batch is sent as soon as it holds `max_size` items, or `max_wait` seconds after
+    its first item arrived, whichever comes first. `handler(items)` returns one result
+    per item, in order; an exception it raises fails every item of that batch, and an
+    exception returned in place of a result fails just that item.
+    """
+
+    def __init__(self, handler: Callable[[List[Any]], Awaitable[List[Any]]], max_size: int = 8, max_wait: float = 0.05):
+        self.handler = handler
+        self.max_size = max_size
+        self.max_wait = max_wait
+        self._pending: List[Tuple[Any, asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._tasks = set()
+        self.batches = 0
+        self.items = 0
+
+    def submit(self, item: Any) -> asyncio.Future:
+        loop = asyncio.get_event_loop()
+        future = loop.create_future()
+        self._pending.append((item, future))
+        if len(self._pending) >= self.max_size:
+            self.flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait, self.flush)
+        return future
+
+    def flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not self._pending:
+            return
+        batch, self._pending = self._pending, []
+        task = asyncio.ensure_future(self._run(batch))
+        # Keep a reference until done so the task is not collected mid-flight
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, batch: List[Tuple[Any, asyncio.Future]]):
+        self.batches += 1
+        self.items += len(batch)
+        try:
+            results = await self.handler([item for item, _ in batch])
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for (_, future), result in zip(batch, results):
+            if future.done():
+                continue
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+    @property
+    def pending(self) -> int:
+        return len(self._pending)
+
+    @property
+    def mean_batch_size(self) -> float:
+        return round(self.items / self.batches, 2) if self.batches else 0.0
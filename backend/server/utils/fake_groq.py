@@ -0,0 +1,134 @@
+"""
+A local stand-in for the Groq chat completions API, for load and backoff testing.
+
+    python -m server.utils.fake_groq --port 8089 --rpm 60 --error-rate 0.05
+    WITNESS_GROQ_BASE_URL=http://127.0.0.1:8089 GROQ_API_KEY=fake uvicorn main:app
+
+It answers the analysis prompts LLMService sends (single and batched) with well-formed
+JSON after a configurable latency, enforces a requests-per-minute window with 429s and
+Retry-After, and fails a share of requests with 500/503. GET /stats shows what it saw.
+"""
+from typing import Dict, List
+from collections import deque
+import argparse
+import asyncio
+import json
+import random
+import re
+import time
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+CLUSTERS = ("spiritual", "ai", "cultural", "political", "tech", "abstract")
+_ITEMS = re.compile(r"Items: (\[.*\])\s*$", re.MULTILINE)
+_CONTENT = re.compile(r'Content: "(.*?)"\s*Return JSON', re.DOTALL)
+
+
+def _analysis(text: str) -> Dict:
+    words = [word.strip(".,!?\"'").lower() for word in text.split()]
+    concepts = [word for word in words if len(word) > 4][:3] or ["noise"]
+    return {
+        "summary": " ".join(text.split()[:12]),
+        "cluster": CLUSTERS[sum(map(ord, text)) % len(CLUSTERS)],
+        "virality": len(text) % 101,
+        "concepts": concepts
+    }
+
+
+def _reply(prompt: str) -> Dict:
+    batch = _ITEMS.search(prompt)
+    if batch:
+        items = json.loads(batch.group(1))
+        return {"results": [{"index": item["index"], **_analysis(item["content"])} for item in items]}
+    content = _CONTENT.search(prompt)
+    return _analysis(content.group(1) if content else prompt)
+
+
+def create_app(
+    latency: float = 0.2,
+    jitter: float = 0.1,
+    rpm: int = 0,
+    error_rate: float = 0.0,
+    retry_after: float = 1.0,
+    window_seconds: float = 60.0
+) -> FastAPI:
+    app = FastAPI(title="Fake Groq")
+    window: deque = deque()
+    # rpm is enforced over a sliding window; a short window keeps backoff tests quick
+    limit = max(1, int(rpm * window_seconds / 60)) if rpm else 0
+    stats = {"requests": 0, "completed": 0, "rate_limited": 0, "errors": 0, "items": 0, "in_flight": 0, "peak_in_flight": 0}
+
+    @app.post("/openai/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        stats["requests"] += 1
+        now = time.monotonic()
+        while window and now - window[0] > window_seconds:
+            window.popleft()
+        if limit and len(window) >= limit:
+            stats["rate_limited"] += 1
+            wait = max(retry_after, window_seconds - (now - window[0]))
+            return JSONResponse(
+                {"error": {"message": "Rate limit reached", "type": "tokens", "code": "rate_limit_exceeded"}},
+                status_code=429,
+                headers={"retry-after": f"{wait:.2f}"}
+            )
+        window.append(now)
+        if random.random() < error_rate:
+            stats["errors"] += 1
+            return JSONResponse({"error": {"message": "Service unavailable"}}, status_code=random.choice((500, 503)))
+
+        stats["in_flight"] += 1
+        stats["peak_in_flight"] = max(stats["peak_in_flight"], stats["in_flight"])
+        try:
+            await asyncio.sleep(max(0.0, latency + random.uniform(-jitter, jitter)))
+        finally:
+            stats["in_flight"] -= 1
+
+        prompt = body["messages"][-1]["content"]
+        reply = _reply(prompt)
+        stats["completed"] += 1
+        stats["items"] += len(reply.get("results", [None]))
+        content = json.dumps(reply)
+        prompt_tokens = sum(len(message["content"]) for message in body["messages"]) // 4
+        completion_tokens = len(content) // 4
+        return {
+            "id": f"chatcmpl-fake-{stats['requests']}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "fake"),
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens
+            }
+        }
+
+    @app.get("/stats")
+    async def get_stats():
+        return stats
+
+    return app
+
+
+def main(argv: List[str] = None):
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--latency", type=float, default=0.2, help="Seconds per completion")
+    parser.add_argument("--jitter", type=float, default=0.1)
+    parser.add_argument("--rpm", type=int, default=0, help="Requests per minute before 429s (0: unlimited)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of requests failed with a 5xx")
+    parser.add_argument("--retry-after", type=float, default=1.0, help="Minimum Retry-After on 429s, in seconds")
+    parser.add_argument("--window", type=float, default=60.0, help="Sliding window the rpm limit is counted over, in seconds")
+    args = parser.parse_args(argv)
+    app = create_app(args.latency, args.jitter, args.rpm, args.error_rate, args.retry_after, args.window)
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+from collections import deque
+import asyncio
+
+OVERFLOW_POLICIES = ("drop_oldest", "disconnect")
+
+
+class _Subscriber:
+    def __init__(self, send: Callable[[str], Awaitable[Any]], max_queue: int):
+        self.send = send
+        self.queue: deque = deque()
+        self.max_queue = max_queue
+        self.ready = asyncio.Event()
+        self.task: Optional[asyncio.Task] = None
+        self.sent = 0
+        self.dropped = 0
+
+
+class Fanout:
+    """
+    Delivers pre-serialized messages to many subscribers without waiting on any of them.
+    Each subscriber has a bounded outbound queue drained by its own sender task, so a
+    slow client only ever delays itself. publish() never awaits: when a queue is full the
+    overflow policy either drops that subscriber's oldest message ("drop_oldest") or
+    removes the subscriber ("disconnect"). A subscriber whose send fails is removed too;
+    `on_remove(key, reason)` hears about every removal so the owner can close and forget it.
+    """
+
+    def __init__(
+        self,
+        max_queue: int = 256,
+        overflow: str = "drop_oldest",
+        on_remove: Optional[Callable[[Hashable, str], Any]] = None
+    ):
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"overflow must be one of {', '.join(OVERFLOW_POLICIES)}")
+        self.max_queue = max(1, max_queue)
+        self.overflow = overflow
+        self.on_remove = on_remove
+        self._subscribers: Dict[Hashable, _Subscriber] = {}
+        self.published = 0
+        self.dropped = 0
+        self.disconnected = 0
+
+    def __len__(self) -> int:
+        return len(self._subscribers)
+
+    def add(self, key: Hashable, send: Callable[[str], Awaitable[Any]]):
+        self.remove(key)
+        subscriber = _Subscriber(send, self.max_queue)
+        subscriber.task = asyncio.create_task(self._drain(key, subscriber))
+        self._subscribers[key] = subscriber
+
+    def remove(self, key: Hashable, reason: Optional[str] = None):
+        subscriber = self._subscribers.pop(key, None)
+        if subscriber is None:
+            return
+        # Called from the sender task itself when its send fails; it is finishing anyway
+        if subscriber.task is not None and subscriber.task is not asyncio.current_task():
+            subscriber.task.cancel()
+        if reason is not None and self.on_remove is not None:
+            self.on_remove(key, reason)
+
+    def send(self, key: Hashable, message: str) -> bool:
+        """Queues a message for one subscriber; False if it is gone (or was just removed for overflowing)."""
+        subscriber = self._subscribers.get(key)
+        if subscriber is None:
+            return False
+        if len(subscriber.queue) >= subscriber.max_queue:
+            if self.overflow == "disconnect":
+                self.disconnected += 1
+                self.remove(key, "overflow")
+                return False
+            subscriber.queue.popleft()
+            subscriber.dropped += 1
+            self.dropped += 1
+        subscriber.queue.append(message)
+        subscriber.ready.set()
+        return True
+
+    def publish(self, message: str) -> int:
+        """Queues a message for every subscriber; returns how many took it."""
+        self.published += 1
+        return sum(self.send(key, message) for key in list(self._subscribers))
+
+    async def _drain(self, key: Hashable, subscriber: _Subscriber):
+        while True:
+            while not subscriber.queue:
+                subscriber.ready.clear()
+                await subscriber.ready.wait()
+            message = subscriber.queue.popleft()
+            try:
+                await subscriber.send(message)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                self.remove(key, "send_failed")
+                return
+            subscriber.sent += 1
+
+    def get_stats(self) -> Dict:
+        depths = [len(subscriber.queue) for subscriber in self._subscribers.values()]
+        return {
+            "subscribers": len(self._subscribers),
+            "queue_capacity": self.max_queue,
+            "overflow": self.overflow,
+            "queued": sum(depths),
+            "max_queue_depth": max(depths, default=0),
+            "published": self.published,
+            "dropped": self.dropped,
+            "disconnected": self.disconnected
+        }
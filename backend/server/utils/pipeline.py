@@ -0,0 +1,221 @@
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence
+from collections import deque
+import asyncio
+import bisect
+import time
+
+# Upper bounds, in milliseconds, of the latency histogram buckets (plus one overflow bucket)
+LATENCY_BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+# Window for stage throughput and utilisation
+THROUGHPUT_WINDOW_SECONDS = 60.0
+
+
+class LatencyHistogram:
+    """Cumulative counts of latencies in fixed buckets; percentiles are read off bucket bounds."""
+
+    def __init__(self, bounds_ms: Sequence[float] = LATENCY_BUCKETS_MS):
+        self.bounds = tuple(bounds_ms)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def observe(self, seconds: float, n: int = 1):
+        ms = seconds * 1000
+        self.counts[bisect.bisect_left(self.bounds, ms)] += n
+        self.count += n
+        self.total_ms += ms * n
+        self.max_ms = max(self.max_ms, ms)
+
+    def percentile(self, q: float) -> float:
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            seen += n
+            if seen >= rank and n:
+                return float(self.bounds[i]) if i < len(self.bounds) else round(self.max_ms, 1)
+        return round(self.max_ms, 1)
+
+    def snapshot(self) -> Dict:
+        labels = [f"le_{bound}" for bound in self.bounds] + ["inf"]
+        return {
+            "count": self.count,
+            "mean_ms": round(self.total_ms / self.count, 2) if self.count else 0.0,
+            "p50_ms": self.percentile(0.5),
+            "p95_ms": self.percentile(0.95),
+            "p99_ms": self.percentile(0.99),
+            "max_ms": round(self.max_ms, 1),
+            "buckets": dict(zip(labels, self.counts))
+        }
+
+
+class Stage:
+    """
+    One step of a Pipeline: a bounded input queue drained by `concurrency` workers. Each
+    worker takes up to `batch_size` queued items at once (never waiting to fill a batch)
+    and calls `handler(items)`, which returns one output per item, in order: None ends
+    that item's trip, an Exception fails just that item, anything else goes on to the
+    next stage, waiting for room there. An exception raised by the handler fails the
+    whole batch. Queue wait and per-item service time go into latency histograms.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        handler: Callable[[List[Any]], Awaitable[List[Any]]],
+        concurrency: int = 1,
+        queue_size: int = 1000,
+        batch_size: int = 1
+    ):
+        self.name = name
+        self.handler = handler
+        self.concurrency = max(1, concurrency)
+        self.batch_size = max(1, batch_size)
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.next: Optional["Stage"] = None
+        self.on_error: Optional[Callable[[Any, Exception], None]] = None
+        self.wait = LatencyHistogram()
+        self.service = LatencyHistogram()
+        self.processed = 0
+        self.failed = 0
+        self.forwarded = 0
+        self.batches = 0
+        # (finished_at, items, busy seconds) of recent batches
+        self._recent: deque = deque()
+        # worker index -> start of the batch it is running
+        self._busy: Dict[int, float] = {}
+        self._started: Optional[float] = None
+
+    async def put(self, item: Any):
+        await self.queue.put((time.monotonic(), item))
+
+    def put_nowait(self, item: Any):
+        """Raises asyncio.QueueFull when the stage is at capacity."""
+        self.queue.put_nowait((time.monotonic(), item))
+
+    def start(self) -> List[asyncio.Task]:
+        self._started = time.monotonic()
+        return [asyncio.create_task(self._worker(index)) for index in range(self.concurrency)]
+
+    async def _worker(self, index: int):
+        while True:
+            batch = [await self.queue.get()]
+            while len(batch) < self.batch_size and not self.queue.empty():
+                batch.append(self.queue.get_nowait())
+            started = time.monotonic()
+            for enqueued, _ in batch:
+                self.wait.observe(started - enqueued)
+            items = [item for _, item in batch]
+            self._busy[index] = started
+            try:
+                outputs = await self.handler(items)
+            except Exception as e:
+                outputs = [e] * len(items)
+            finally:
+                finished = time.monotonic()
+                self._busy.pop(index, None)
+                self.batches += 1
+                self.service.observe((finished - started) / len(items), len(items))
+                self._recent.append((finished, len(items), finished - started))
+                self._trim(finished)
+                for _ in batch:
+                    self.queue.task_done()
+
+            for item, output in zip(items, outputs):
+                if isinstance(output, Exception):
+                    self.failed += 1
+                    if self.on_error is not None:
+                        self.on_error(item, output)
+                    continue
+                self.processed += 1
+                if output is not None and self.next is not None:
+                    # Backpressure: a full downstream queue holds this worker here
+                    await self.next.put(output)
+                    self.forwarded += 1
+
+    def _trim(self, now: float):
+        while self._recent and now - self._recent[0][0] > THROUGHPUT_WINDOW_SECONDS:
+            self._recent.popleft()
+
+    @property
+    def depth(self) -> int:
+        return self.queue.qsize()
+
+    @property
+    def busy(self) -> int:
+        return len(self._busy)
+
+    def utilisation(self) -> float:
+        now = time.monotonic()
+        self._trim(now)
+        if self._started is None:
+            return 0.0
+        window_start = max(now - THROUGHPUT_WINDOW_SECONDS, self._started)
+        # Busy time inside the window: finished batches plus the running part of current ones
+        busy = sum(min(seconds, finished - window_start) for finished, _, seconds in self._recent)
+        busy += sum(now - max(started, window_start) for started in self._busy.values())
+        return min(busy / (max(now - window_start, 1e-3) * self.concurrency), 1.0)
+
+    def throughput(self) -> float:
+        """Items finished per second over the window (or since the first batch, if sooner)."""
+        now = time.monotonic()
+        self._trim(now)
+        if not self._recent:
+            return 0.0
+        items = sum(n for _, n, _ in self._recent)
+        span = min(THROUGHPUT_WINDOW_SECONDS, max(now - (self._recent[0][0] - self._recent[0][2]), 1e-3))
+        return items / span
+
+    def get_stats(self) -> Dict:
+        return {
+            "concurrency": self.concurrency,
+            "batch_size": self.batch_size,
+            "queue_depth": self.depth,
+            "queue_capacity": self.queue.maxsize,
+            "busy": self.busy,
+            "utilisation": round(self.utilisation(), 4),
+            "throughput_per_s": round(self.throughput(), 2),
+            "processed": self.processed,
+            "failed": self.failed,
+            "forwarded": self.forwarded,
+            "mean_batch_size": round((self.processed + self.failed) / self.batches, 2) if self.batches else 0.0,
+            "queue_wait": self.wait.snapshot(),
+            "service": self.service.snapshot()
+        }
+
+
+class Pipeline:
+    """Stages chained in order; items enter at the first and flow on as each handler passes them."""
+
+    def __init__(self, stages: List[Stage], on_error: Optional[Callable[[Any, Exception], None]] = None):
+        self.stages = stages
+        self.by_name = {stage.name: stage for stage in stages}
+        for stage, following in zip(stages, stages[1:]):
+            stage.next = following
+        for stage in stages:
+            stage.on_error = on_error
+        self.tasks: List[asyncio.Task] = []
+
+    @property
+    def head(self) -> Stage:
+        return self.stages[0]
+
+    def start(self) -> List[asyncio.Task]:
+        if not self.tasks:
+            for stage in self.stages:
+                self.tasks.extend(stage.start())
+        return self.tasks
+
+    def bottleneck(self) -> Optional[str]:
+        """The stage with the highest utilisation, the one to give more concurrency first."""
+        if not any(stage.batches or stage.busy for stage in self.stages):
+            return None
+        return max(self.stages, key=lambda stage: stage.utilisation()).name
+
+    def get_stats(self) -> Dict:
+        return {
+            "bottleneck": self.bottleneck(),
+            "stages": {stage.name: stage.get_stats() for stage in self.stages}
+        }
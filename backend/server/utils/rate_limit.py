@@ -0,0 +1,66 @@
+from typing import Optional, Tuple
+import asyncio
+import random
+import time
+
+
+class TokenBucket:
+    """
+    Refills `rate_per_minute` tokens a minute, holding at most `burst_seconds` worth so an
+    idle client cannot fire a whole minute's budget at once. acquire() waits until
+    enough tokens are available and reports what it charged; adjust() settles the real
+    cost of a request against that charge, and may leave the bucket in debt. A rate of 0
+    means unlimited.
+    """
+
+    def __init__(self, rate_per_minute: float, burst_seconds: float = 10.0):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = max(1.0, self.rate * burst_seconds)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self, amount: float = 1.0) -> Tuple[float, float]:
+        """Takes `amount` tokens; returns (seconds spent waiting, tokens charged)."""
+        if self.rate <= 0:
+            return 0.0, 0.0
+        # A request larger than the bucket would never fit; charge a full bucket and let
+        # adjust() put the rest on the debt
+        amount = min(amount, self.capacity)
+        waited = 0.0
+        # The lock keeps waiters in arrival order
+        async with self._lock:
+            self._refill()
+            while self.tokens < amount:
+                delay = (amount - self.tokens) / self.rate
+                await asyncio.sleep(delay)
+                waited += delay
+                self._refill()
+            self.tokens -= amount
+        return waited, amount
+
+    def adjust(self, amount: float):
+        if self.rate > 0:
+            self._refill()
+            self.tokens = min(self.capacity, self.tokens - amount)
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Seconds from a Retry-After header (delta-seconds form), or None."""
+    try:
+        return max(float(value), 0.0) if value is not None else None
+    except ValueError:
+        return None
+
+
+def backoff_delay(attempt: int, base: float = 0.5, cap: float = 30.0, retry_after: Optional[float] = None) -> float:
+    """Full-jitter exponential backoff, never shorter than what the server asked for."""
+    delay = random.uniform(0, min(cap, base * (2 ** attempt)))
+    if retry_after is not None:
+        delay = max(delay, retry_after + random.uniform(0, base))
+    return delay